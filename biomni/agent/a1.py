@@ -1,22 +1,40 @@
-import glob
+import asyncio
+import copy
+import hashlib
+import importlib.util
 import inspect
+import json
 import os
 import re
-from collections.abc import Generator
+import threading
+import uuid
+from collections.abc import AsyncGenerator, Generator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Literal, TypedDict
 
-import pandas as pd
 from dotenv import load_dotenv
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages.ai import add_usage
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, StateGraph
 
+from biomni.agent.context import ContextPolicy, get_context_policy
+from biomni.agent.output_store import OutputStore
+from biomni.agent.streaming import TagStreamParser, chunk_text
+from biomni.checkpoint import get_checkpointer
 from biomni.config import default_config
-from biomni.llm import SourceType, get_llm
-from biomni.model.retriever import ToolRetriever
+from biomni.data_sync import LazyDataLake, load_local_manifest
+from biomni.datalake import DataLake
+from biomni.env_snapshot import get_environment_snapshot
+from biomni.llm import SourceType, build_cached_prompt, get_llm, record_token_usage, token_usage_summary
+from biomni.llm_cache import get_llm_cache, llm_cache_key
+from biomni.model.retriever import ToolRetriever, get_retrieval_cache
+from biomni.namespace_snapshot import MANIFEST, prune_snapshots, restore_namespace
+from biomni.repl_pool import get_execution_executor, get_repl_pool, new_session_id
 from biomni.tool.support_tools import run_python_repl
 from biomni.tool.tool_registry import ToolRegistry
 from biomni.utils import (
@@ -34,7 +52,6 @@ from biomni.utils import (
     parse_tool_calls_from_code,
     parse_tool_calls_with_modules,
     pretty_print,
-    read_module2api,
     run_bash_script,
     run_r_code,
     run_with_timeout,
@@ -64,6 +81,11 @@ class A1:
         api_key: str | None = None,
         commercial_mode: bool | None = None,
         expected_data_lake_files: list | None = None,
+        repl_mode: str | None = None,
+        lazy_data_lake: bool | None = None,
+        speculative_execution: bool | None = None,
+        context_policy: ContextPolicy | str | None = None,
+        temperature: float | None = None,
     ):
         """Initialize the biomni agent.
 
@@ -76,6 +98,13 @@ class A1:
             base_url: Base URL for custom model serving (e.g., "http://localhost:8000/v1")
             api_key: API key for the custom LLM
             commercial_mode: If True, excludes datasets that require commercial licenses or are non-commercial only
+            repl_mode: "thread" to run Python code in-process, or "process" to run it in an isolated worker process
+            lazy_data_lake: If True, data-lake files are downloaded when first used instead of at startup
+            speculative_execution: If True, stream each response and start running its <execute> block
+                as soon as the block is complete, instead of after the whole response has arrived
+            context_policy: ContextPolicy instance, or "compact"/"full", deciding which part of the
+                conversation is sent to the LLM at each step
+            temperature: Temperature of the LLM (defaults to default_config.temperature)
 
         """
         # Use default_config values for unspecified parameters
@@ -95,20 +124,19 @@ class A1:
             api_key = default_config.api_key if default_config.api_key else "EMPTY"
         if commercial_mode is None:
             commercial_mode = default_config.commercial_mode
-
-        # Import appropriate env_desc based on commercial_mode
+        if repl_mode is None:
+            repl_mode = default_config.repl_mode
+        if lazy_data_lake is None:
+            lazy_data_lake = default_config.lazy_data_lake
+        if speculative_execution is None:
+            speculative_execution = default_config.speculative_execution
+
+        # Resource descriptions come from env_desc or env_desc_cm depending on commercial_mode
         if commercial_mode:
-            from biomni.env_desc_cm import data_lake_dict, library_content_dict
-
             print("🏢 Commercial mode: Using commercial-licensed datasets only")
         else:
-            from biomni.env_desc import data_lake_dict, library_content_dict
-
             print("🎓 Academic mode: Using all datasets (including non-commercial)")
 
-        # Store as instance attributes for later use
-        self.data_lake_dict = data_lake_dict
-        self.library_content_dict = library_content_dict
         self.commercial_mode = commercial_mode
 
         # Display configuration in a nice, readable format
@@ -159,17 +187,45 @@ class A1:
         os.makedirs(benchmark_dir, exist_ok=True)
         os.makedirs(data_lake_dir, exist_ok=True)
 
+        # Shared snapshot of tool schemas, data-lake listing and resource descriptions
+        environment = get_environment_snapshot(data_lake_dir, commercial_mode)
+
         if expected_data_lake_files is None:
-            expected_data_lake_files = list(self.data_lake_dict.keys())
-
-        # Check and download missing data lake files
-        print("Checking and downloading missing data lake files...")
-        check_and_download_s3_files(
-            s3_bucket_url="https://biomni-release.s3.amazonaws.com",
-            local_data_lake_path=data_lake_dir,
-            expected_files=expected_data_lake_files,
-            folder="data_lake",
-        )
+            expected_data_lake_files = list(environment.data_lake_dict.keys())
+
+        # Check and download missing data lake files, and files that changed since they were verified
+        verified_files = load_local_manifest(data_lake_dir)
+        missing_data_lake_files = [
+            f
+            for f in expected_data_lake_files
+            if f not in environment.data_lake_manifest
+            or (f in verified_files and verified_files[f]["size"] != environment.data_lake_manifest[f]["size"])
+        ]
+        self._lazy_data_lake = None
+        if lazy_data_lake:
+            # Nothing is downloaded up front; files are fetched when code first opens them
+            print("Lazy data lake: files will be downloaded on first use")
+            self._lazy_data_lake = LazyDataLake(
+                data_lake_dir,
+                catalog=expected_data_lake_files,
+                cache_dir=default_config.data_lake_cache_dir,
+            )
+            self._lazy_data_lake.install()
+        elif missing_data_lake_files:
+            print("Checking and downloading missing data lake files...")
+            check_and_download_s3_files(
+                s3_bucket_url="https://biomni-release.s3.amazonaws.com",
+                local_data_lake_path=data_lake_dir,
+                expected_files=missing_data_lake_files,
+                folder="data_lake",
+            )
+            environment = get_environment_snapshot(data_lake_dir, commercial_mode)
+
+        # Agents mutate these when custom resources are added, so keep private copies
+        self.environment = environment
+        self.data_lake_dict = dict(environment.data_lake_dict)
+        self.library_content_dict = dict(environment.library_content_dict)
+        self._environment_modified = False
 
         # Check if benchmark directory structure is complete
         benchmark_ok = False
@@ -188,7 +244,12 @@ class A1:
             )
 
         self.path = os.path.join(path, "biomni_data")
-        module2api = read_module2api()
+        module2api = copy.deepcopy(environment.module2api)
+
+        # Columnar query access to the data lake, exposed in the REPL as `datalake`
+        self.datalake = None
+        if default_config.datalake_query_api and importlib.util.find_spec("pyarrow") is not None:
+            self.datalake = DataLake(data_lake_dir)
 
         self.llm = get_llm(
             llm,
@@ -196,6 +257,7 @@ class A1:
             source=source,
             base_url=base_url,
             api_key=api_key,
+            temperature=temperature,
             config=default_config,
         )
         self.module2api = module2api
@@ -203,10 +265,57 @@ class A1:
 
         if self.use_tool_retriever:
             self.tool_registry = ToolRegistry(module2api)
-            self.retriever = ToolRetriever()
+            self.retriever = ToolRetriever(index_dir=os.path.join(self.path, ".cache"))
+            self.retriever_mode = default_config.tool_retriever_mode
+            self.retrieval_cache = None
+            if default_config.retrieval_cache:
+                self.retrieval_cache = get_retrieval_cache(
+                    os.path.join(self.path, ".cache", "retrieval_cache.sqlite"),
+                    ttl_seconds=default_config.retrieval_cache_ttl,
+                    similarity_threshold=default_config.retrieval_cache_similarity,
+                )
 
         # Add timeout parameter
         self.timeout_seconds = timeout_seconds  # 10 minutes default timeout
+
+        # Python execution backend; in process mode this agent owns one worker of the shared pool
+        self.repl_mode = repl_mode
+        self.session_id = new_session_id()
+        self._repl_pool = get_repl_pool() if repl_mode == "process" else None
+        # Thread id of the latest run in the checkpointer; pass it to resume() after an interruption
+        self.thread_id = None
+        self._namespace_snapshot_stats = None
+
+        # Tools of MCP servers discovered in the background, registered at the start of the next query
+        self._pending_mcp_tools = []
+        self._mcp_lock = threading.Lock()
+
+        # Pipelined generation/execution: see _generate_speculative
+        self.speculative_execution = speculative_execution
+        self._speculation_executor = None
+        self._speculative_execution = None
+
+        # Prompt caching: send the system prompt as cacheable blocks and track cached input tokens
+        self.prompt_caching = default_config.prompt_caching
+        self.token_usage = {}
+
+        # Outputs longer than this are stored and previewed (see OutputStore) instead of truncated
+        self.output_spill_chars = default_config.output_spill_chars
+        self._output_store = None
+
+        # Context window: which part of the conversation is sent to the LLM at each step
+        if context_policy is None:
+            context_policy = default_config.context_policy
+        if isinstance(context_policy, str):
+            kwargs = {}
+            if context_policy == "compact":
+                kwargs = {
+                    "output_store": self._get_output_store,
+                    "summarize": default_config.context_summarize,
+                }
+            context_policy = get_context_policy(context_policy, max_tokens=default_config.context_max_tokens, **kwargs)
+        self.context_policy = context_policy
+        self._system_prompt_tokens = None
         self.configure()
 
     def add_tool(self, api):
@@ -284,22 +393,6 @@ class A1:
                 self.module2api[module_name].append(schema)
                 print(f"Added new tool '{schema['name']}' to module '{module_name}'")
 
-            # Update the tool registry's document dataframe if it exists
-            if hasattr(self, "tool_registry") and self.tool_registry is not None:
-                try:
-                    # Rebuild the document dataframe
-                    docs = []
-                    for tool_id in range(len(self.tool_registry.tools)):
-                        docs.append(
-                            [
-                                int(tool_id),
-                                self.tool_registry.get_tool_by_id(int(tool_id)),
-                            ]
-                        )
-                    self.tool_registry.document_df = pd.DataFrame(docs, columns=["docid", "document_content"])
-                except Exception as e:
-                    print(f"Warning: Failed to update tool registry document dataframe: {e}")
-
             # Store the original function for potential future use
             if not hasattr(self, "_custom_functions"):
                 self._custom_functions = {}
@@ -340,9 +433,16 @@ class A1:
 
         This method dynamically registers MCP server tools as callable functions within
         the biomni agent system. Each MCP server is loaded as an independent module
-        with its tools exposed as synchronous wrapper functions.
+        with its tools exposed as synchronous wrapper functions. Server sessions are
+        started once and reused by every call (see ``biomni.mcp_client``).
 
         Supports both manual tool definitions and automatic tool discovery from MCP servers.
+        Servers are discovered concurrently, and discovered tool schemas are cached on disk
+        (keyed by command, arguments and version), so startup is not bound by the servers'
+        cold starts. A server that does not answer within its discovery timeout does not
+        block the agent: its tools are registered before the next query once it answers.
+        Servers served from the cache are re-listed in the background, which also warms
+        their sessions, and their tools are updated if the listing changed.
 
         Args:
             config_path: Path to the MCP configuration YAML file containing server
@@ -353,82 +453,18 @@ class A1:
             yaml.YAMLError: If the config file is malformed
             RuntimeError: If MCP server initialization fails
         """
-        import asyncio
+        import concurrent.futures
         import os
-        import sys
-        import types
+        import time
         from pathlib import Path
 
-        import nest_asyncio
         import yaml
-        from mcp import ClientSession
-        from mcp.client.stdio import StdioServerParameters, stdio_client
-
-        nest_asyncio.apply()
-
-        def discover_mcp_tools_sync(server_params: StdioServerParameters) -> list[dict]:
-            """Discover available tools from MCP server synchronously."""
-            try:
-
-                async def _discover_async():
-                    async with stdio_client(server_params) as (reader, writer):
-                        async with ClientSession(reader, writer) as session:
-                            await session.initialize()
-
-                            # Get available tools
-                            tools_result = await session.list_tools()
-                            tools = tools_result.tools if hasattr(tools_result, "tools") else tools_result
-
-                            discovered_tools = []
-                            for tool in tools:
-                                if hasattr(tool, "name"):
-                                    discovered_tools.append(
-                                        {
-                                            "name": tool.name,
-                                            "description": tool.description,
-                                            "inputSchema": tool.inputSchema,
-                                        }
-                                    )
-                                else:
-                                    print(f"Warning: Skipping tool with no name attribute: {tool}")
 
-                            return discovered_tools
+        from biomni.mcp_client import ToolSchemaCache, get_mcp_manager, server_fingerprint
 
-                return asyncio.run(_discover_async())
-            except Exception as e:
-                print(f"Failed to discover tools: {e}")
-                return []
-
-        def make_mcp_wrapper(cmd: str, args: list[str], tool_name: str, doc: str, env_vars: dict = None):
-            """Create a synchronous wrapper for an async MCP tool call."""
-
-            def sync_tool_wrapper(**kwargs):
-                """Synchronous wrapper for MCP tool execution."""
-                try:
-                    server_params = StdioServerParameters(command=cmd, args=args, env=env_vars)
-
-                    async def async_tool_call():
-                        async with stdio_client(server_params) as (reader, writer):
-                            async with ClientSession(reader, writer) as session:
-                                await session.initialize()
-                                result = await session.call_tool(tool_name, kwargs)
-                                content = result.content[0]
-                                if hasattr(content, "json"):
-                                    return content.json()
-                                return content.text
-
-                    try:
-                        loop = asyncio.get_running_loop()
-                        return loop.create_task(async_tool_call())
-                    except RuntimeError:
-                        return asyncio.run(async_tool_call())
-
-                except Exception as e:
-                    raise RuntimeError(f"MCP tool execution failed for '{tool_name}': {e}") from e
-
-            sync_tool_wrapper.__name__ = tool_name
-            sync_tool_wrapper.__doc__ = doc
-            return sync_tool_wrapper
+        # Servers are started once and their sessions reused by every tool call
+        manager = get_mcp_manager()
+        schema_cache = ToolSchemaCache(os.path.join(self.path, ".cache", "mcp_tools"))
 
         # Initialize registries if they don't exist
         self._custom_functions = getattr(self, "_custom_functions", {})
@@ -448,7 +484,8 @@ class A1:
             print("Warning: No MCP servers found in configuration")
             return
 
-        # Process each MCP server configuration
+        # Process each MCP server configuration; start discovering every server that needs it
+        discoveries = {}
         for server_name, server_meta in mcp_servers.items():
             if not server_meta.get("enabled", True):
                 continue
@@ -473,105 +510,171 @@ class A1:
                         processed_env[key] = value
                 env_vars = processed_env
 
-            # Create module namespace for this MCP server
-            mcp_module_name = f"mcp_servers.{server_name}"
-            if mcp_module_name not in sys.modules:
-                sys.modules[mcp_module_name] = types.ModuleType(mcp_module_name)
-            server_module = sys.modules[mcp_module_name]
-
+            server_spec = {"command": cmd, "args": args, "env": env_vars or None}
             tools_config = server_meta.get("tools", [])
+            if tools_config:
+                self._register_mcp_tools(server_name, server_spec, tools_config)
+                continue
 
-            if not tools_config:
-                try:
-                    server_params = StdioServerParameters(command=cmd, args=args, env=env_vars)
-                    tools_config = discover_mcp_tools_sync(server_params)
-
-                    if tools_config:
-                        print(f"Discovered {len(tools_config)} tools from {server_name} MCP server")
-                    else:
-                        print(f"Warning: No tools discovered from {server_name} MCP server")
-                        continue
+            fingerprint = server_fingerprint(server_spec, server_meta.get("version"))
+            cached = schema_cache.get(fingerprint)
+            if cached:
+                print(f"Loaded {len(cached)} cached tool schemas for {server_name} MCP server")
+                self._register_mcp_tools(server_name, server_spec, cached)
+            timeout = server_meta.get("discovery_timeout", default_config.mcp_discovery_timeout)
+            discoveries[server_name] = (server_spec, fingerprint, cached, timeout, manager.discover(server_spec))
+
+        # Wait for the uncached servers, each up to its own timeout, while they start concurrently
+        started = time.monotonic()
+        for server_name, (server_spec, fingerprint, cached, timeout, future) in discoveries.items():
+            if cached:
+                # Served from the cache; the background listing updates the tools if they changed
+                future.add_done_callback(
+                    lambda f, args=(server_name, server_spec, fingerprint, cached): self._on_mcp_discovered(
+                        *args, schema_cache, f
+                    )
+                )
+                continue
+            try:
+                tools_config = future.result(timeout=max(timeout - (time.monotonic() - started), 0))
+            except concurrent.futures.TimeoutError:
+                print(f"MCP server {server_name} is still starting; its tools will be added when it is ready")
+                future.add_done_callback(
+                    lambda f, args=(server_name, server_spec, fingerprint, None): self._on_mcp_discovered(
+                        *args, schema_cache, f
+                    )
+                )
+                continue
+            except Exception as e:
+                print(f"Failed to discover tools for {server_name}: {e}")
+                continue
 
-                except Exception as e:
-                    print(f"Failed to discover tools for {server_name}: {e}")
-                    continue
+            if tools_config:
+                print(f"Discovered {len(tools_config)} tools from {server_name} MCP server")
+                schema_cache.put(fingerprint, tools_config)
+                self._register_mcp_tools(server_name, server_spec, tools_config)
+            else:
+                print(f"Warning: No tools discovered from {server_name} MCP server")
 
-            # Register each tool
-            for tool_meta in tools_config:
-                if isinstance(tool_meta, dict) and "biomni_name" in tool_meta:
-                    # Manual tool definition
-                    tool_name = tool_meta.get("biomni_name")
-                    description = tool_meta.get("description", f"MCP tool: {tool_name}")
-                    parameters = tool_meta.get("parameters", {})
-                    # For manual tools, check if each parameter has a "required" field
-                    required_param_names = []
-                    for param_name, param_spec in parameters.items():
-                        if param_spec.get("required", False):
-                            required_param_names.append(param_name)
-                else:
-                    # Auto-discovered tool
-                    tool_name = tool_meta.get("name")
-                    description = tool_meta.get("description", f"MCP tool: {tool_name}")
-                    input_schema = tool_meta.get("inputSchema", {})
-                    parameters = input_schema.get("properties", {})
-                    # For auto-discovered tools, get required list from inputSchema top level
-                    required_param_names = input_schema.get("required", [])
-
-                if not tool_name:
-                    print(f"Warning: Skipping tool with no name in {server_name}")
-                    continue
+        # Update agent configuration
+        self.configure()
 
-                # Create wrapper function
-                wrapper_function = make_mcp_wrapper(cmd, args, tool_name, description, env_vars)
+    def _on_mcp_discovered(self, server_name, server_spec, fingerprint, cached, schema_cache, future):
+        """Completion of a background MCP discovery: cache the tools and queue their registration."""
+        try:
+            tools_config = future.result()
+        except Exception as e:
+            if cached is None:
+                print(f"Failed to discover tools for {server_name}: {e}")
+            return
+        if not tools_config or tools_config == cached:
+            return
+        schema_cache.put(fingerprint, tools_config)
+        # Registering changes the prompt and graph, so it waits for the start of the next query
+        with self._mcp_lock:
+            self._pending_mcp_tools.append((server_name, server_spec, tools_config))
+
+    def _apply_pending_mcp_tools(self):
+        """Register the tools of MCP servers discovered in the background since the last query."""
+        with self._mcp_lock:
+            pending, self._pending_mcp_tools = self._pending_mcp_tools, []
+        if not pending:
+            return
+        for server_name, server_spec, tools_config in pending:
+            print(f"Adding {len(tools_config)} tools from {server_name} MCP server")
+            self._register_mcp_tools(server_name, server_spec, tools_config)
+        self.configure(self_critic=getattr(self, "self_critic", False))
 
-                # Add to module namespace
-                setattr(server_module, tool_name, wrapper_function)
+    def _register_mcp_tools(self, server_name: str, server_spec: dict, tools_config: list[dict]):
+        """Expose the tools of one MCP server as the module ``mcp_servers.<server_name>``."""
+        import sys
+        import types
 
-                # Build parameter lists
-                required_params, optional_params = [], []
+        from biomni.mcp_client import MCPTool
+
+        # Create module namespace for this MCP server
+        mcp_module_name = f"mcp_servers.{server_name}"
+        if mcp_module_name not in sys.modules:
+            sys.modules[mcp_module_name] = types.ModuleType(mcp_module_name)
+        server_module = sys.modules[mcp_module_name]
+
+        # Register each tool
+        server_tool_schemas = []
+        for tool_meta in tools_config:
+            if isinstance(tool_meta, dict) and "biomni_name" in tool_meta:
+                # Manual tool definition
+                tool_name = tool_meta.get("biomni_name")
+                description = tool_meta.get("description", f"MCP tool: {tool_name}")
+                parameters = tool_meta.get("parameters", {})
+                # For manual tools, check if each parameter has a "required" field
+                required_param_names = []
                 for param_name, param_spec in parameters.items():
-                    param_info = {
-                        "name": param_name,
-                        "type": str(param_spec.get("type", "string")),
-                        "description": param_spec.get("description", ""),
-                        "default": param_spec.get("default", None),
-                    }
+                    if param_spec.get("required", False):
+                        required_param_names.append(param_name)
+            else:
+                # Auto-discovered tool
+                tool_name = tool_meta.get("name")
+                description = tool_meta.get("description", f"MCP tool: {tool_name}")
+                input_schema = tool_meta.get("inputSchema", {})
+                parameters = input_schema.get("properties", {})
+                # For auto-discovered tools, get required list from inputSchema top level
+                required_param_names = input_schema.get("required", [])
+
+            if not tool_name:
+                print(f"Warning: Skipping tool with no name in {server_name}")
+                continue
 
-                    # Check if parameter is required based on the required_param_names list
-                    if param_name in required_param_names:
-                        required_params.append(param_info)
-                    else:
-                        optional_params.append(param_info)
+            # Create wrapper function
+            wrapper_function = MCPTool(server_spec, tool_name, description)
 
-                # Create tool schema
-                tool_schema = {
-                    "name": tool_name,
-                    "description": description,
-                    "parameters": parameters,
-                    "required_parameters": required_params,
-                    "optional_parameters": optional_params,
-                    "module": mcp_module_name,
-                    "fn": wrapper_function,
+            # Add to module namespace
+            setattr(server_module, tool_name, wrapper_function)
+
+            # Build parameter lists
+            required_params, optional_params = [], []
+            for param_name, param_spec in parameters.items():
+                param_info = {
+                    "name": param_name,
+                    "type": str(param_spec.get("type", "string")),
+                    "description": param_spec.get("description", ""),
+                    "default": param_spec.get("default", None),
                 }
 
-                # Register in tool registry
-                self.tool_registry.register_tool(tool_schema)
+                # Check if parameter is required based on the required_param_names list
+                if param_name in required_param_names:
+                    required_params.append(param_info)
+                else:
+                    optional_params.append(param_info)
+
+            # Create tool schema
+            tool_schema = {
+                "name": tool_name,
+                "description": description,
+                "parameters": parameters,
+                "required_parameters": required_params,
+                "optional_parameters": optional_params,
+                "module": mcp_module_name,
+                "fn": wrapper_function,
+            }
 
-                # Add to module2api mapping
-                if mcp_module_name not in self.module2api:
-                    self.module2api[mcp_module_name] = []
-                self.module2api[mcp_module_name].append(tool_schema)
+            server_tool_schemas.append(tool_schema)
 
-                # Add to instance registries
-                self._custom_functions[tool_name] = wrapper_function
-                self._custom_tools[tool_name] = {
-                    "name": tool_name,
-                    "description": description,
-                    "module": mcp_module_name,
-                }
+            # Add to instance registries
+            self._custom_functions[tool_name] = wrapper_function
+            self._custom_tools[tool_name] = {
+                "name": tool_name,
+                "description": description,
+                "module": mcp_module_name,
+            }
 
-        # Update agent configuration
-        self.configure()
+        # Add to module2api mapping, replacing an earlier listing of the same tools
+        new_names = {schema["name"] for schema in server_tool_schemas}
+        existing = [t for t in self.module2api.get(mcp_module_name, []) if t["name"] not in new_names]
+        self.module2api[mcp_module_name] = existing + server_tool_schemas
+
+        # Register the server's tools in one batch
+        if hasattr(self, "tool_registry") and self.tool_registry is not None:
+            self.tool_registry.register_tools(server_tool_schemas, module=mcp_module_name)
 
     def get_custom_tool(self, name):
         """Get a custom tool by name.
@@ -630,19 +733,6 @@ class A1:
         if hasattr(self, "tool_registry") and self.tool_registry is not None:
             if self.tool_registry.remove_tool_by_name(name):
                 removed = True
-                # Rebuild the document dataframe
-                try:
-                    docs = []
-                    for tool_id in range(len(self.tool_registry.tools)):
-                        docs.append(
-                            [
-                                int(tool_id),
-                                self.tool_registry.get_tool_by_id(int(tool_id)),
-                            ]
-                        )
-                    self.tool_registry.document_df = pd.DataFrame(docs, columns=["docid", "document_content"])
-                except Exception as e:
-                    print(f"Warning: Failed to update tool registry document dataframe: {e}")
 
         # Remove from module2api
         if hasattr(self, "module2api"):
@@ -651,6 +741,7 @@ class A1:
                     if tool.get("name") == name:
                         del tools[i]
                         removed = True
+                        self._environment_modified = True
                         break
 
         if removed:
@@ -753,6 +844,7 @@ class A1:
         if hasattr(self, "data_lake_dict") and name in self.data_lake_dict:
             del self.data_lake_dict[name]
             removed = True
+            self._environment_modified = True
 
         if removed:
             print(f"Custom data item '{name}' has been removed")
@@ -852,6 +944,7 @@ class A1:
         if hasattr(self, "library_content_dict") and name in self.library_content_dict:
             del self.library_content_dict[name]
             removed = True
+            self._environment_modified = True
 
         if removed:
             print(f"Custom software item '{name}' has been removed")
@@ -1159,6 +1252,7 @@ Each item is listed with its description to help you understand its contents.
 ----
 {data_lake_content}
 ----
+{data_lake_query_instruction}
 
 - Software Library:
 {library_intro}
@@ -1198,6 +1292,7 @@ Each library is listed with its description to help you understand its functiona
             "data_lake_path": self.path + "/data_lake",
             "data_lake_intro": data_lake_intro,
             "data_lake_content": data_lake_content_formatted,
+            "data_lake_query_instruction": self._data_lake_query_instruction(),
             "library_intro": library_intro,
             "library_content_formatted": library_content_formatted,
         }
@@ -1214,6 +1309,17 @@ Each library is listed with its description to help you understand its functiona
 
         return formatted_prompt
 
+    def _data_lake_query_instruction(self):
+        """Describe the ``datalake`` query object when it is available in the REPL."""
+        if getattr(self, "datalake", None) is None:
+            return ""
+        return """For tabular files (parquet, csv, tsv, txt), prefer the preloaded `datalake` object over loading whole files with pandas.
+It reads only the requested columns and matching rows and returns a pandas DataFrame:
+  datalake.query("kg.csv", columns=["x_name", "relation", "y_name"], filter={"x_name": ["TP53", "BRCA1"]}, limit=1000)
+Filters map a column to a value, a list of values, or an (operator, value) tuple such as (">", 0.5).
+Use datalake.schema(name) to list a file's columns and types, and datalake.count(name, filter) to count rows.
+"""
+
     def configure(self, self_critic=False, test_time_scale_round=0):
         """Configure the agent with the initial system prompt and workflow.
 
@@ -1226,9 +1332,8 @@ Each library is listed with its description to help you understand its functiona
         self.self_critic = self_critic
 
         # Get data lake content
-        data_lake_path = self.path + "/data_lake"
-        data_lake_content = glob.glob(data_lake_path + "/*")
-        data_lake_items = [x.split("/")[-1] for x in data_lake_content]
+        environment = self._get_environment()
+        data_lake_items = self._list_data_lake_items()
 
         # data_lake_dict and library_content_dict are already set in __init__
 
@@ -1276,25 +1381,69 @@ Each library is listed with its description to help you understand its functiona
             for name, info in self._custom_software.items():
                 custom_software.append({"name": name, "description": info["description"]})
 
-        self.system_prompt = self._generate_system_prompt(
-            tool_desc=tool_desc,
-            data_lake_content=data_lake_with_desc,
-            library_content_list=library_content_list,
-            self_critic=self_critic,
-            is_retrieval=False,
-            custom_tools=custom_tools if custom_tools else None,
-            custom_data=custom_data if custom_data else None,
-            custom_software=custom_software if custom_software else None,
+        # The prompt of an agent without custom resources is identical for every agent
+        # sharing this environment and data-lake listing (which depends on the expected files
+        # of a lazy data lake), so it is rendered once and cached in the snapshot
+        prompt_key = (
+            "initial",
+            f"{type(self).__module__}.{type(self).__qualname__}",
+            self_critic,
+            self.path,
+            self.datalake is not None,
+            hashlib.sha256("\x00".join(data_lake_items).encode()).hexdigest()[:16],
         )
+        uses_shared_prompt = (
+            not custom_tools
+            and not custom_data
+            and not custom_software
+            and not getattr(self, "_environment_modified", False)
+            and self.environment.code_fingerprint == environment.code_fingerprint
+        )
+        cached_prompt = environment.get_prompt(prompt_key) if uses_shared_prompt else None
 
-        # Define the nodes
-        def generate(state: AgentState) -> AgentState:
-            messages = [SystemMessage(content=self.system_prompt)] + state["messages"]
-            response = self.llm.invoke(messages)
+        if cached_prompt is not None:
+            self.system_prompt = cached_prompt
+        else:
+            self.system_prompt = self._generate_system_prompt(
+                tool_desc=tool_desc,
+                data_lake_content=data_lake_with_desc,
+                library_content_list=library_content_list,
+                self_critic=self_critic,
+                is_retrieval=False,
+                custom_tools=custom_tools if custom_tools else None,
+                custom_data=custom_data if custom_data else None,
+                custom_software=custom_software if custom_software else None,
+            )
+            if uses_shared_prompt:
+                environment.set_prompt(prompt_key, self.system_prompt)
 
-            # Parse the response
-            msg = str(response.content)
+        # Define the nodes. Each node has a synchronous version used by go/go_stream and an
+        # asynchronous one used by ago/astream, sharing the state handling around the LLM call
+        # or the code execution.
+        def generate(state: AgentState) -> AgentState:
+            messages = self._build_llm_messages(state["messages"])
+            if self.speculative_execution:
+                msg = self._generate_speculative(messages)
+            else:
+                response = self.llm.invoke(messages)
+                record_token_usage(response, self.token_usage)
+
+                # Parse the response
+                msg = str(response.content)
+            return handle_response(state, msg)
+
+        async def agenerate(state: AgentState) -> AgentState:
+            # The context policy may call the LLM to summarize, so it runs off the event loop
+            messages = await asyncio.to_thread(self._build_llm_messages, state["messages"])
+            if self.speculative_execution:
+                msg = await asyncio.to_thread(self._generate_speculative, messages)
+            else:
+                response = await self.llm.ainvoke(messages)
+                record_token_usage(response, self.token_usage)
+                msg = str(response.content)
+            return handle_response(state, msg)
 
+        def handle_response(state: AgentState, msg: str) -> AgentState:
             # Check for incomplete tags and fix them
             if "<execute>" in msg and "</execute>" not in msg:
                 msg += "</execute>"
@@ -1343,7 +1492,7 @@ Each library is listed with its description to help you understand its functiona
                     state["next_step"] = "generate"
             return state
 
-        def execute(state: AgentState) -> AgentState:
+        def pending_code(state: AgentState):
             last_message = state["messages"][-1].content
             # Only add the closing tag if it's not already there
             if "<execute>" in last_message and "</execute>" not in last_message:
@@ -1351,81 +1500,54 @@ Each library is listed with its description to help you understand its functiona
 
             execute_match = re.search(r"<execute>(.*?)</execute>", last_message, re.DOTALL)
             if execute_match:
-                code = execute_match.group(1)
-
-                # Set timeout duration (10 minutes = 600 seconds)
-                timeout = self.timeout_seconds
-
-                # Check if the code is R code
-                if (
-                    code.strip().startswith("#!R")
-                    or code.strip().startswith("# R code")
-                    or code.strip().startswith("# R script")
-                ):
-                    # Remove the R marker and run as R code
-                    r_code = re.sub(r"^#!R|^# R code|^# R script", "", code, count=1).strip()
-                    result = run_with_timeout(run_r_code, [r_code], timeout=timeout)
-                # Check if the code is a Bash script or CLI command
-                elif (
-                    code.strip().startswith("#!BASH")
-                    or code.strip().startswith("# Bash script")
-                    or code.strip().startswith("#!CLI")
-                ):
-                    # Handle both Bash scripts and CLI commands with the same function
-                    if code.strip().startswith("#!CLI"):
-                        # For CLI commands, extract the command and run it as a simple bash script
-                        cli_command = re.sub(r"^#!CLI", "", code, count=1).strip()
-                        # Remove any newlines to ensure it's a single command
-                        cli_command = cli_command.replace("\n", " ")
-                        result = run_with_timeout(run_bash_script, [cli_command], timeout=timeout)
-                    else:
-                        # For Bash scripts, remove the marker and run as a bash script
-                        bash_script = re.sub(r"^#!BASH|^# Bash script", "", code, count=1).strip()
-                        result = run_with_timeout(run_bash_script, [bash_script], timeout=timeout)
-                # Otherwise, run as Python code
-                else:
-                    # Clear any previous plots before execution
-                    self._clear_execution_plots()
-
-                    # Inject custom functions into the Python execution environment
-                    self._inject_custom_functions_to_repl()
-                    result = run_with_timeout(run_python_repl, [code], timeout=timeout)
+                return last_message, execute_match.group(1)
+            return None
 
-                    # Plots are now captured directly in the execution entry above
+        def execute(state: AgentState) -> AgentState:
+            pending = pending_code(state)
+            if pending is not None:
+                last_message, code = pending
+                record_execution(state, last_message, self._execute_code(code))
+            return state
 
-                if len(result) > 10000:
-                    result = (
-                        "The output is too long to be added to context. Here are the first 10K characters...\n"
-                        + result[:10000]
-                    )
+        async def aexecute(state: AgentState) -> AgentState:
+            pending = pending_code(state)
+            if pending is not None:
+                last_message, code = pending
+                # Code runs on the execution pool so the event loop keeps serving other sessions
+                outcome = await asyncio.get_running_loop().run_in_executor(
+                    get_execution_executor(), self._execute_code, code
+                )
+                record_execution(state, last_message, outcome)
+            return state
 
-                # Store the execution result with the triggering message
-                if not hasattr(self, "_execution_results"):
-                    self._execution_results = []
+        def record_execution(state: AgentState, last_message: str, outcome) -> None:
+            result, execution_metrics, worker_plots = outcome
+            if len(result) > self.output_spill_chars:
+                # Keep the full output addressable instead of making the agent re-run the code
+                result = self._get_output_store().preview(
+                    result, head_chars=self.output_spill_chars * 3 // 5, tail_chars=self.output_spill_chars // 5
+                )
 
-                # Get any plots that were generated during this execution
-                execution_plots = []
-                try:
-                    from biomni.tool.support_tools import get_captured_plots
+            # Store the execution result with the triggering message
+            if not hasattr(self, "_execution_results"):
+                self._execution_results = []
 
-                    current_plots = get_captured_plots()
-                    execution_plots = current_plots.copy()
-                except Exception as e:
-                    print(f"Warning: Could not capture plots from execution: {e}")
-                    execution_plots = []
-
-                # Store the execution result with metadata
-                execution_entry = {
-                    "triggering_message": last_message,  # The AI message that contained <execute>
-                    "images": execution_plots,  # Base64 encoded images from this execution
-                    "timestamp": datetime.now().isoformat(),
-                }
-                self._execution_results.append(execution_entry)
+            # Get any plots that were generated during this execution
+            execution_plots = list(worker_plots)
 
-                observation = f"\n<observation>{result}</observation>"
-                state["messages"].append(AIMessage(content=observation.strip()))
+            # Store the execution result with metadata
+            execution_entry = {
+                "triggering_message": last_message,  # The AI message that contained <execute>
+                "images": execution_plots,  # Base64 encoded images from this execution
+                "timestamp": datetime.now().isoformat(),
+            }
+            if execution_metrics is not None:
+                execution_entry["metrics"] = execution_metrics
+            self._execution_results.append(execution_entry)
 
-            return state
+            observation = f"\n<observation>{result}</observation>"
+            state["messages"].append(AIMessage(content=observation.strip()))
 
         def routing_function(
             state: AgentState,
@@ -1451,11 +1573,10 @@ Each library is listed with its description to help you understand its functiona
             else:
                 raise ValueError(f"Unexpected next_step: {next_step}")
 
-        def execute_self_critic(state: AgentState) -> AgentState:
-            if self.critic_count < test_time_scale_round:
-                # Generate feedback based on message history
-                messages = state["messages"]
-                feedback_prompt = f"""
+        def critic_messages(state: AgentState):
+            # Generate feedback based on message history
+            messages = state["messages"]
+            feedback_prompt = f"""
                 Here is a reminder of what is the user requested: {self.user_task}
                 Examine the previous executions, reaosning, and solutions.
                 Critic harshly on what could be improved?
@@ -1463,30 +1584,46 @@ Each library is listed with its description to help you understand its functiona
                 Think hard what are missing to solve the task.
                 No question asked, just feedbacks.
                 """
-                feedback = self.llm.invoke(messages + [HumanMessage(content=feedback_prompt)])
+            # Sent after the system prompt so the call reuses the cached prefix of the generate steps
+            return self._build_llm_messages(messages + [HumanMessage(content=feedback_prompt)])
 
-                # Add feedback as a new message
-                state["messages"].append(
-                    HumanMessage(
-                        content=f"Wait... this is not enough to solve the task. Here are some feedbacks for improvement:\n{feedback.content}"
-                    )
+        def add_feedback(state: AgentState, feedback) -> AgentState:
+            record_token_usage(feedback, self.token_usage)
+
+            # Add feedback as a new message
+            state["messages"].append(
+                HumanMessage(
+                    content=f"Wait... this is not enough to solve the task. Here are some feedbacks for improvement:\n{feedback.content}"
                 )
-                self.critic_count += 1
-                state["next_step"] = "generate"
-            else:
-                state["next_step"] = "end"
+            )
+            self.critic_count += 1
+            state["next_step"] = "generate"
+            return state
 
+        def execute_self_critic(state: AgentState) -> AgentState:
+            if self.critic_count < test_time_scale_round:
+                return add_feedback(state, self.llm.invoke(critic_messages(state)))
+            state["next_step"] = "end"
+            return state
+
+        async def aexecute_self_critic(state: AgentState) -> AgentState:
+            if self.critic_count < test_time_scale_round:
+                messages = await asyncio.to_thread(critic_messages, state)
+                return add_feedback(state, await self.llm.ainvoke(messages))
+            state["next_step"] = "end"
             return state
 
         # Create the workflow
         workflow = StateGraph(AgentState)
 
         # Add nodes
-        workflow.add_node("generate", generate)
-        workflow.add_node("execute", execute)
+        workflow.add_node("generate", RunnableLambda(generate, afunc=agenerate, name="generate"))
+        workflow.add_node("execute", RunnableLambda(execute, afunc=aexecute, name="execute"))
 
         if self_critic:
-            workflow.add_node("self_critic", execute_self_critic)
+            workflow.add_node(
+                "self_critic", RunnableLambda(execute_self_critic, afunc=aexecute_self_critic, name="self_critic")
+            )
             # Add conditional edges
             workflow.add_conditional_edges(
                 "generate",
@@ -1514,10 +1651,249 @@ Each library is listed with its description to help you understand its functiona
 
         # Compile the workflow
         self.app = workflow.compile()
-        self.checkpointer = MemorySaver()
+        self.checkpointer = get_checkpointer(
+            default_config.checkpoint_path or os.path.join(self.path, ".cache", "checkpoints.sqlite")
+        )
         self.app.checkpointer = self.checkpointer
         # display(Image(self.app.get_graph().draw_mermaid_png()))
 
+    def _system_prompt_blocks(self):
+        """Split the system prompt into its static instructions and the resource listing.
+
+        The instructions are identical for every agent and query, so they form the most
+        reusable cache prefix; the resources (custom and environment) follow.
+        """
+        prompt = self.system_prompt
+        for header in ("PRIORITY CUSTOM RESOURCES", "Environment Resources:"):
+            idx = prompt.find(header)
+            if idx != -1:
+                idx = prompt.rfind("\n", 0, idx) + 1
+                return [prompt[:idx], prompt[idx:]]
+        return [prompt]
+
+    def _build_llm_messages(self, history):
+        """Prepend the system prompt to ``history``, with prompt-cache breakpoints when enabled.
+
+        The history first goes through the context policy, with the tokens of the system
+        prompt subtracted from its budget.
+        """
+        policy = self.context_policy
+        if policy is not None:
+            budget = None
+            if policy.max_tokens is not None:
+                if self._system_prompt_tokens is None or self._system_prompt_tokens[0] is not self.system_prompt:
+                    self._system_prompt_tokens = (self.system_prompt, policy.count_tokens(self.system_prompt))
+                budget = max(policy.max_tokens - self._system_prompt_tokens[1], 0)
+            history = policy.apply(history, budget=budget, llm=self.llm, conversation=self.thread_id)
+        if not self.prompt_caching:
+            return [SystemMessage(content=self.system_prompt)] + list(history)
+        return build_cached_prompt(self.llm, self._system_prompt_blocks(), history)
+
+    def get_token_usage(self):
+        """Return this agent's LLM token usage, including input tokens served from the prompt cache.
+
+        Returns:
+            dict: Calls, input/output tokens, cache read/creation tokens and the cached input ratio
+        """
+        return token_usage_summary(
+            {
+                "calls": 0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "cache_read_tokens": 0,
+                "cache_creation_tokens": 0,
+                **self.token_usage,
+            }
+        )
+
+    def _generate_speculative(self, messages):
+        """Stream a response and start executing its <execute> block as soon as the block is complete.
+
+        The REPL is warmed up (worker acquired, custom functions injected) when the
+        block opens, and the code is submitted for execution when it closes. Anything
+        the model emits after the block is discarded, as the </execute> stop sequence
+        would. The execute node then collects the result instead of running the code.
+        A block that follows a <solution> tag is never run speculatively.
+
+        Returns:
+            str: The response text, truncated after the first complete <execute> block
+        """
+        parser = TagStreamParser()
+        text = ""
+        code_parts = []
+        state = {"allowed": True}
+        # Providers spread the usage of a response over several chunks; it is recorded once
+        usage = None
+        stream = self.llm.stream(messages)
+        try:
+            for chunk in stream:
+                if chunk.usage_metadata:
+                    usage = add_usage(usage, chunk.usage_metadata)
+                delta = chunk_text(chunk.content)
+                text += delta
+                if self._handle_speculative_events(parser.feed(delta), code_parts, state):
+                    # Stop generating; the rest of the response would be discarded anyway
+                    end = text.find("</execute>")
+                    return text[: end + len("</execute>")] if end != -1 else text
+        finally:
+            stream.close()
+            if usage is not None:
+                record_token_usage(AIMessageChunk(content="", usage_metadata=usage), self.token_usage)
+        # The stream ended inside the block (typically at the </execute> stop sequence)
+        self._handle_speculative_events(parser.flush(), code_parts, state)
+        return text
+
+    def _handle_speculative_events(self, events, code_parts, state):
+        """Act on streamed tag events; returns True once the <execute> block was submitted."""
+        for event in events:
+            if event["event"] == "start" and event["tag"] == "solution":
+                state["allowed"] = False
+            if event["tag"] != "execute" or not state["allowed"]:
+                continue
+            if event["event"] == "start":
+                code_parts.clear()
+                self._speculation_pool().submit(self._warm_up_execution)
+            elif event["event"] == "delta":
+                code_parts.append(event["text"])
+            elif event["event"] == "end":
+                code = "".join(code_parts)
+                # A single worker thread guarantees the warm-up finishes before the code runs
+                future = self._speculation_pool().submit(self._run_code_block, code)
+                self._speculative_execution = (code, future)
+                return True
+        return False
+
+    def _speculation_pool(self):
+        if self._speculation_executor is None:
+            self._speculation_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="a1-speculative")
+        return self._speculation_executor
+
+    def _warm_up_execution(self):
+        """Prepare the Python backend for the next execution."""
+        if self._repl_pool is not None:
+            self._repl_pool.warm(self.session_id)
+        self._inject_custom_functions_to_repl()
+
+    def _take_speculative_execution(self, code):
+        """Return the future of a speculatively started execution, if there is one.
+
+        Returns:
+            tuple: (future or None, the code the future runs)
+        """
+        pending, self._speculative_execution = self._speculative_execution, None
+        if pending is None:
+            return None, code
+        speculative_code, future = pending
+        if speculative_code != code and future.cancel():
+            # It had not started yet; run the final block instead
+            return None, code
+        return future, speculative_code
+
+    def _execute_code(self, code):
+        """Run an <execute> block, or collect its result if it already started speculatively."""
+        speculative, speculative_code = self._take_speculative_execution(code)
+        if speculative is None:
+            return self._run_code_block(code)
+        # The block already started running while the response was still streaming
+        output, execution_metrics, plots = speculative.result()
+        if speculative_code != code:
+            # Should not happen; never run a block twice, report what actually ran instead
+            print("Warning: speculatively executed code differs from the final <execute> block")
+            output = f"Warning: only the following code was executed:\n{speculative_code}\n\n{output}"
+        return output, execution_metrics, plots
+
+    def _run_code_block(self, code):
+        """Run the code of an <execute> block with the backend matching its language marker.
+
+        Returns:
+            tuple: (output, resource metrics or None, list of captured plots)
+        """
+        execution_metrics = None
+        worker_plots = []
+
+        # Set timeout duration (10 minutes = 600 seconds)
+        timeout = self.timeout_seconds
+
+        # Check if the code is R code
+        if (
+            code.strip().startswith("#!R")
+            or code.strip().startswith("# R code")
+            or code.strip().startswith("# R script")
+        ):
+            # Remove the R marker and run as R code
+            r_code = re.sub(r"^#!R|^# R code|^# R script", "", code, count=1).strip()
+            result = run_with_timeout(run_r_code, [r_code], timeout=timeout)
+        # Check if the code is a Bash script or CLI command
+        elif (
+            code.strip().startswith("#!BASH")
+            or code.strip().startswith("# Bash script")
+            or code.strip().startswith("#!CLI")
+        ):
+            # Handle both Bash scripts and CLI commands with the same function
+            if code.strip().startswith("#!CLI"):
+                # For CLI commands, extract the command and run it as a simple bash script
+                cli_command = re.sub(r"^#!CLI", "", code, count=1).strip()
+                # Remove any newlines to ensure it's a single command
+                cli_command = cli_command.replace("\n", " ")
+                result = run_with_timeout(run_bash_script, [cli_command], timeout=timeout)
+            else:
+                # For Bash scripts, remove the marker and run as a bash script
+                bash_script = re.sub(r"^#!BASH|^# Bash script", "", code, count=1).strip()
+                result = run_with_timeout(run_bash_script, [bash_script], timeout=timeout)
+        # Otherwise, run as Python code
+        elif self._repl_pool is not None:
+            # Run in the isolated worker process owned by this agent's session
+            self._inject_custom_functions_to_repl()
+            exec_result = self._repl_pool.execute(code, session_id=self.session_id, timeout=timeout)
+            result = exec_result.output
+            execution_metrics = exec_result.metrics()
+            worker_plots = exec_result.plots
+            if exec_result.status in ("timeout", "crashed"):
+                # The worker was replaced; bring back the variables of the last completed step
+                if self._has_namespace_snapshot() and self.restore_namespace(self._snapshot_dir()):
+                    result += "\nVariables saved after the last completed step have been restored."
+            else:
+                self._snapshot_namespace()
+        else:
+            # Clear any previous plots before execution
+            self._clear_execution_plots()
+
+            # Inject custom functions into the Python execution environment
+            self._inject_custom_functions_to_repl()
+            result = run_with_timeout(run_python_repl, [code], timeout=timeout)
+
+            # Collect the plots captured during this execution
+            try:
+                from biomni.tool.support_tools import get_captured_plots
+
+                worker_plots = get_captured_plots().copy()
+            except Exception as e:
+                print(f"Warning: Could not capture plots from execution: {e}")
+                worker_plots = []
+
+        return result, execution_metrics, worker_plots
+
+    def _get_output_store(self):
+        """Return the store of large outputs of the current session."""
+        root = os.path.abspath(os.path.join(self.path, ".cache", "outputs", self.session_id))
+        if self._output_store is None or self._output_store.root_dir != root:
+            self._output_store = OutputStore(root)
+        return self._output_store
+
+    def _get_environment(self):
+        """Return the environment snapshot, refreshed if the data lake changed on disk."""
+        environment = get_environment_snapshot(self.path + "/data_lake", self.commercial_mode)
+        if environment.code_fingerprint == self.environment.code_fingerprint:
+            self.environment = environment
+        return environment
+
+    def _list_data_lake_items(self):
+        """List data-lake files available to the agent, including not-yet-downloaded lazy files."""
+        items = self._get_environment().data_lake_items
+        if getattr(self, "_lazy_data_lake", None) is not None:
+            items = sorted(set(items) | self._lazy_data_lake.catalog)
+        return items
+
     def _prepare_resources_for_retrieval(self, prompt):
         """Prepare resources for retrieval and return selected resource names.
 
@@ -1535,9 +1911,7 @@ Each library is listed with its description to help you understand its functiona
         all_tools = self.tool_registry.tools if hasattr(self, "tool_registry") else []
 
         # 2. Data lake items with descriptions
-        data_lake_path = self.path + "/data_lake"
-        data_lake_content = glob.glob(data_lake_path + "/*")
-        data_lake_items = [x.split("/")[-1] for x in data_lake_content]
+        data_lake_items = self._list_data_lake_items()
 
         # Create data lake descriptions for retrieval
         data_lake_descriptions = []
@@ -1569,9 +1943,23 @@ Each library is listed with its description to help you understand its functiona
             "libraries": library_descriptions,
         }
 
-        # Use prompt-based retrieval with the agent's LLM
-        selected_resources = self.retriever.prompt_based_retrieval(prompt, resources, llm=self.llm)
-        print("Using prompt-based retrieval with the agent's LLM")
+        # Repeated queries against the same resources reuse the earlier selection
+        cache_version = None
+        if getattr(self, "retrieval_cache", None) is not None:
+            cache_version = self._retrieval_cache_version(resources)
+            cached = self.retrieval_cache.get(prompt, cache_version)
+            if cached is not None:
+                print("Using cached resource selection")
+                tools_by_name = {tool["name"]: tool for tool in all_tools}
+                return {
+                    "tools": [tools_by_name[name] for name in cached["tools"] if name in tools_by_name],
+                    "data_lake": cached["data_lake"],
+                    "libraries": cached["libraries"],
+                }
+
+        # Select resources with the configured strategy (prompt-based uses the agent's LLM)
+        selected_resources = self.retriever.retrieve(prompt, resources, llm=self.llm, mode=self.retriever_mode)
+        print(f"Using {self.retriever_mode}-based retrieval")
 
         # Extract the names from the selected resources for the system prompt
         selected_resources_names = {
@@ -1591,41 +1979,136 @@ Each library is listed with its description to help you understand its functiona
             else:
                 selected_resources_names["data_lake"].append(item)
 
-        return selected_resources_names
-
-    def go(self, prompt):
-        """Execute the agent with the given prompt.
+        if cache_version is not None:
+            self.retrieval_cache.put(
+                prompt,
+                cache_version,
+                {
+                    "tools": [tool["name"] for tool in selected_resources_names["tools"] if isinstance(tool, dict)],
+                    "data_lake": selected_resources_names["data_lake"],
+                    "libraries": selected_resources_names["libraries"],
+                },
+            )
 
-        Args:
-            prompt: The user's query
+        return selected_resources_names
 
-        """
-        self.critic_count = 0
+    def _retrieval_cache_version(self, resources):
+        """Fingerprint of everything a resource selection depends on besides the query."""
+        h = hashlib.sha256(self.retriever_mode.encode())
+        h.update(str(getattr(self.llm, "model_name", None) or getattr(self.llm, "model", "")).encode())
+        for category in ("tools", "data_lake", "libraries"):
+            h.update(f"\0{category}".encode())
+            for item in resources[category]:
+                h.update(f"\0{item.get('name', '')}:{item.get('description', '')}".encode())
+        return h.hexdigest()[:16]
+
+    def _prepare_query(self, prompt):
+        """Select the resources for a query and update the system prompt accordingly."""
+        self._apply_pending_mcp_tools()
         self.user_task = prompt
 
         if self.use_tool_retriever:
             selected_resources_names = self._prepare_resources_for_retrieval(prompt)
             self.update_system_prompt_with_selected_resources(selected_resources_names)
+            if self._lazy_data_lake is not None:
+                # Start fetching the datasets the retriever expects this query to need
+                self._lazy_data_lake.prefetch(selected_resources_names["data_lake"])
+
+    def _start_run(self, prompt, thread_id=None):
+        """Prepare the agent for a new query and return the graph inputs and config."""
+        self._prepare_query(prompt)
+        self.critic_count = 0
 
         inputs = {"messages": [HumanMessage(content=prompt)], "next_step": None}
-        config = {"recursion_limit": 500, "configurable": {"thread_id": 42}}
+        # Each run is checkpointed under its own thread id so it can be resumed
+        self.thread_id = str(thread_id) if thread_id is not None else uuid.uuid4().hex
+        config = {"recursion_limit": 500, "configurable": {"thread_id": self.thread_id}}
         self.log = []
-
         # Store the final conversation state for markdown generation
-        final_state = None
+        self._conversation_state = None
+        return inputs, config
+
+    def _start_resume(self, thread_id):
+        """Restore the agent for an interrupted run and return the graph inputs (None) and config."""
+        config = {"recursion_limit": 500, "configurable": {"thread_id": str(thread_id)}}
+        snapshot = self.app.get_state(config)
+        if not snapshot.values:
+            raise ValueError(f"No checkpointed run with thread id '{thread_id}'")
+        if not snapshot.next:
+            raise ValueError(f"Run '{thread_id}' has already finished")
+
+        messages = snapshot.values["messages"]
+        # The resources are selected again for the original query (a retrieval cache hit)
+        self._prepare_query(messages[0].content)
+        feedback = "Wait... this is not enough to solve the task."
+        self.critic_count = sum(
+            1 for m in messages[1:] if isinstance(m, HumanMessage) and str(m.content).startswith(feedback)
+        )
+        self.thread_id = str(thread_id)
+        if self._has_namespace_snapshot():
+            self.restore_namespace(self.thread_id)
+        # Resuming first streams the checkpointed state, which logs its last message
+        self.log = [pretty_print(m) for m in messages[:-1]]
+        self._conversation_state = snapshot.values
+        return None, config
+
+    def _finish_run(self, config):
+        # In-memory checkpoints cannot outlive the process; drop them once the run has completed
+        if isinstance(self.checkpointer, MemorySaver):
+            self.checkpointer.delete_thread(config["configurable"]["thread_id"])
+        # Namespace snapshots follow the retention of checkpoints
+        prune_snapshots(os.path.join(self.path, ".cache", "namespaces"), default_config.checkpoint_retention)
+
+    def _stream_events(self, item, stream_tokens, run):
+        """Turn one item of the graph stream into the steps/tokens yielded to the caller.
+
+        ``run`` carries the token parser between items of the same run.
+        """
+        events = []
+        if stream_tokens:
+            mode, payload = item
+            if mode == "messages":
+                chunk, metadata = payload
+                # Only the response being generated is streamed; other LLM calls are internal
+                if not isinstance(chunk, AIMessageChunk) or metadata.get("langgraph_node") != "generate":
+                    return events
+                if run.get("parser") is None:
+                    run["parser"] = TagStreamParser()
+                events.extend({"type": "token", **event} for event in run["parser"].feed(chunk_text(chunk.content)))
+                return events
+            s = payload
+            if run.get("parser") is not None:
+                events.extend({"type": "token", **event} for event in run["parser"].flush())
+                run["parser"] = None
+        else:
+            s = item
+
+        message = s["messages"][-1]
+        out = pretty_print(message)
+        self.log.append(out)
+        self._conversation_state = s  # Store the latest state
+
+        if stream_tokens:
+            events.append({"type": "step", "output": out, "role": message.type, "content": message.content})
+        else:
+            events.append({"output": out})
+        return events
 
-        for s in self.app.stream(inputs, stream_mode="values", config=config):
-            message = s["messages"][-1]
-            out = pretty_print(message)
-            self.log.append(out)
-            final_state = s  # Store the latest state
+    def go(self, prompt, thread_id: str | int | None = None):
+        """Execute the agent with the given prompt.
 
-        # Store the conversation state for markdown generation
-        self._conversation_state = final_state
+        Args:
+            prompt: The user's query
+            thread_id: Checkpointer thread id of this run (defaults to a new id, stored in ``self.thread_id``)
 
-        return self.log, message.content
+        """
+        for _ in self.go_stream(prompt, thread_id=thread_id):
+            pass
+        return self.log, self._conversation_state["messages"][-1].content
 
-    def go_stream(self, prompt) -> Generator[dict, None, None]:
+    def go_stream(
+        self, prompt, thread_id: str | int | None = None, stream_tokens: bool = False
+    ) -> Generator[dict, None, None]:
         """Execute the agent with the given prompt and return a generator that yields each step.
 
         This function returns a generator that yields each step of the agent's execution,
@@ -1633,35 +2116,100 @@ Each library is listed with its description to help you understand its functiona
 
         Args:
             prompt: The user's query
+            thread_id: Checkpointer thread id of this run (defaults to a new id, stored in ``self.thread_id``)
+            stream_tokens: Also yield the LLM response token by token while it is generated
 
         Yields:
-            dict: Each step of the agent's execution containing the current message and state
+            dict: Each step of the agent's execution containing the current message and state.
+                With ``stream_tokens``, steps are ``{"type": "step", "output", "role", "content"}``
+                and tokens are ``{"type": "token", "event": "start"|"delta"|"end", "tag", "text"}``,
+                where ``tag`` is "think", "execute", "solution" or "text".
         """
-        self.critic_count = 0
-        self.user_task = prompt
+        inputs, config = self._start_run(prompt, thread_id)
+        yield from self._stream(inputs, config, stream_tokens)
 
-        if self.use_tool_retriever:
-            selected_resources_names = self._prepare_resources_for_retrieval(prompt)
-            self.update_system_prompt_with_selected_resources(selected_resources_names)
+    def _stream(self, inputs, config, stream_tokens):
+        stream_mode = ["values", "messages"] if stream_tokens else "values"
+        run = {}
+        for item in self.app.stream(inputs, stream_mode=stream_mode, config=config):
+            yield from self._stream_events(item, stream_tokens, run)
+        self._finish_run(config)
 
-        inputs = {"messages": [HumanMessage(content=prompt)], "next_step": None}
-        config = {"recursion_limit": 500, "configurable": {"thread_id": 42}}
-        self.log = []
+    def resume(self, thread_id: str):
+        """Continue an interrupted run from its last completed step.
 
-        # Store the final conversation state for markdown generation
-        final_state = None
+        LLM responses and code cells that had completed are not repeated. Variables
+        defined by earlier code cells are restored lazily from the run's namespace
+        snapshot (see ``restore_namespace``).
 
-        for s in self.app.stream(inputs, stream_mode="values", config=config):
-            message = s["messages"][-1]
-            out = pretty_print(message)
-            self.log.append(out)
-            final_state = s  # Store the latest state
+        Args:
+            thread_id: Thread id of the run (``self.thread_id`` after ``go``)
+        """
+        for _ in self.resume_stream(thread_id):
+            pass
+        return self.log, self._conversation_state["messages"][-1].content
+
+    def resume_stream(self, thread_id: str, stream_tokens: bool = False) -> Generator[dict, None, None]:
+        """Continue an interrupted run, yielding its remaining steps like ``go_stream``."""
+        inputs, config = self._start_resume(thread_id)
+        yield from self._stream(inputs, config, stream_tokens)
+
+    async def ago(self, prompt, thread_id: str | int | None = None):
+        """Asynchronous version of ``go``.
 
-            # Yield the current step
-            yield {"output": out}
+        LLM calls use ``ainvoke`` and code blocks run on the shared execution pool, so many
+        agents can run concurrently on one event loop.
 
-        # Store the conversation state for markdown generation
-        self._conversation_state = final_state
+        Args:
+            prompt: The user's query
+            thread_id: Checkpointer thread id of this run (defaults to a new id, stored in ``self.thread_id``)
+
+        """
+        async for _ in self.astream(prompt, thread_id=thread_id):
+            pass
+        return self.log, self._conversation_state["messages"][-1].content
+
+    async def astream(
+        self, prompt, thread_id: str | int | None = None, stream_tokens: bool = False
+    ) -> AsyncGenerator[dict, None]:
+        """Asynchronous version of ``go_stream``, yielding the same steps and tokens.
+
+        Args:
+            prompt: The user's query
+            thread_id: Checkpointer thread id of this run (defaults to a new id, stored in ``self.thread_id``)
+            stream_tokens: Also yield the LLM response token by token while it is generated
+        """
+        # Resource retrieval may call the LLM and read indexes; keep it off the event loop
+        inputs, config = await asyncio.to_thread(self._start_run, prompt, thread_id)
+        async for event in self._astream(inputs, config, stream_tokens):
+            yield event
+
+    async def _astream(self, inputs, config, stream_tokens):
+        stream_mode = ["values", "messages"] if stream_tokens else "values"
+        run = {}
+        async for item in self.app.astream(inputs, stream_mode=stream_mode, config=config):
+            for event in self._stream_events(item, stream_tokens, run):
+                yield event
+        await asyncio.to_thread(self._finish_run, config)
+
+    async def aresume_stream(self, thread_id: str, stream_tokens: bool = False) -> AsyncGenerator[dict, None]:
+        """Asynchronous version of ``resume_stream``."""
+        inputs, config = await asyncio.to_thread(self._start_resume, thread_id)
+        async for event in self._astream(inputs, config, stream_tokens):
+            yield event
+
+    def _find_tool_module(self, tool_name):
+        """Return the module a tool is defined in, or None if the tool is unknown."""
+        registry = getattr(self, "tool_registry", None)
+        if registry is not None:
+            module_name = registry.get_module_by_name(tool_name)
+            if module_name:
+                return module_name
+        for mod, apis in getattr(self, "module2api", {}).items():
+            for api in apis:
+                if api.get("name") == tool_name:
+                    return mod
+        return None
 
     def update_system_prompt_with_selected_resources(self, selected_resources):
         """Update the system prompt with the selected resources."""
@@ -1672,17 +2220,12 @@ Each library is listed with its description to help you understand its functiona
             if isinstance(tool, dict):
                 module_name = tool.get("module", None)
 
-                # If module is not specified, try to find it in the module2api
-                if not module_name and hasattr(self, "module2api"):
-                    for mod, apis in self.module2api.items():
-                        for api in apis:
-                            if api.get("name") == tool.get("name"):
-                                module_name = mod
-                                # Update the tool with the module information
-                                tool["module"] = module_name
-                                break
-                        if module_name:
-                            break
+                # If module is not specified, look it up by tool name
+                if not module_name:
+                    module_name = self._find_tool_module(tool.get("name"))
+                    if module_name:
+                        # Update the tool with the module information
+                        tool["module"] = module_name
 
                 # If still not found, use a default
                 if not module_name:
@@ -1691,18 +2234,12 @@ Each library is listed with its description to help you understand its functiona
             else:
                 module_name = getattr(tool, "module_name", None)
 
-                # If module is not specified, try to find it in the module2api
-                if not module_name and hasattr(self, "module2api"):
-                    tool_name = getattr(tool, "name", str(tool))
-                    for mod, apis in self.module2api.items():
-                        for api in apis:
-                            if api.get("name") == tool_name:
-                                module_name = mod
-                                # Set the module_name attribute
-                                tool.module_name = module_name
-                                break
-                        if module_name:
-                            break
+                # If module is not specified, look it up by tool name
+                if not module_name:
+                    module_name = self._find_tool_module(getattr(tool, "name", str(tool)))
+                    if module_name:
+                        # Set the module_name attribute
+                        tool.module_name = module_name
 
                 # If still not found, use a default
                 if not module_name:
@@ -1788,8 +2325,23 @@ Each library is listed with its description to help you understand its functiona
             ]
         )
 
+        inputs = {"messages": [("user", str(self.log))]}
+        # Formatting the same log for the same output class gives the same answer; reuse it
+        cache = get_llm_cache()
+        if cache is not None:
+            cache_key = llm_cache_key(
+                self.llm,
+                self.format_check_prompt.format_messages(**inputs),
+                output_schema=getattr(output_class, "model_json_schema", output_class.schema)(),
+            )
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return json.loads(cached)
+
         checker_llm = self.format_check_prompt | self.llm.with_structured_output(output_class)
-        result = checker_llm.invoke({"messages": [("user", str(self.log))]}).dict()
+        result = checker_llm.invoke(inputs).dict()
+        if cache is not None:
+            cache.put(cache_key, json.dumps(result, default=str))
         return result
 
     def _parse_tool_calls_from_code(self, code: str) -> list[str]:
@@ -1818,20 +2370,119 @@ Each library is listed with its description to help you understand its functiona
         custom_functions = getattr(self, "_custom_functions", {})
         return parse_tool_calls_with_modules(code, module2api, custom_functions)
 
+    def _repl_injections(self):
+        """Objects injected into the REPL namespace: custom tools, the data lake and output readers."""
+        custom_functions = dict(getattr(self, "_custom_functions", {}))
+        if getattr(self, "datalake", None) is not None:
+            custom_functions["datalake"] = self.datalake
+        output_store = self._get_output_store()
+        custom_functions["read_output"] = output_store.read_output
+        custom_functions["grep_output"] = output_store.grep_output
+        return custom_functions
+
     def _inject_custom_functions_to_repl(self):
         """Inject custom functions into the Python REPL execution environment.
         This makes custom tools available during code execution.
         """
-        custom_functions = getattr(self, "_custom_functions", {})
+        custom_functions = self._repl_injections()
+        if getattr(self, "_repl_pool", None) is not None:
+            if custom_functions:
+                self._repl_pool.inject(self.session_id, custom_functions)
+            return
         inject_custom_functions_to_repl(custom_functions)
 
-    def create_mcp_server(self, tool_modules=None):
+    def _snapshot_dir(self, thread_id=None):
+        return os.path.join(self.path, ".cache", "namespaces", str(thread_id or self.thread_id))
+
+    def _has_namespace_snapshot(self):
+        return self.thread_id is not None and os.path.exists(os.path.join(self._snapshot_dir(), MANIFEST))
+
+    def _snapshot_namespace(self):
+        """Write the REPL variables changed by the last step to the run's snapshot directory.
+
+        Only in process REPL mode: in thread mode the namespace is shared by every agent
+        of the process, so a snapshot would capture other agents' variables.
+        """
+        if not default_config.namespace_snapshots or self.thread_id is None or self._repl_pool is None:
+            return
+        # Injected objects are injected again after a restore
+        exclude = list(self._repl_injections())
+        result = self._repl_pool.snapshot(
+            self.session_id,
+            self._snapshot_dir(),
+            exclude,
+            default_config.namespace_snapshot_max_var_mb,
+            timeout=self.timeout_seconds,
+        )
+        if result.status == "ok":
+            self._namespace_snapshot_stats = result.output
+            return
+        message = str(result.output).strip().split("\n", 1)[0]
+        if result.status == "crashed":
+            # The worker died while snapshotting (e.g. out of memory); bring back the last saved variables
+            restored = self._has_namespace_snapshot() and self.restore_namespace(self._snapshot_dir())
+            message += "; variables of the previous step restored" if restored else "; the namespace was reset"
+        print(f"Warning: Could not snapshot the Python namespace: {message}")
+
+    def restore_namespace(self, source: str) -> int:
+        """Make the variables of a namespace snapshot available to this agent's code.
+
+        Variables are loaded when code first refers to them; names the namespace
+        already defines are kept. To move a session to another worker or node, point
+        ``source`` at a copy of the run's snapshot directory.
+
+        Args:
+            source: Thread id of a run under this agent's data path, or a snapshot directory
+
+        Returns:
+            Number of variables in the snapshot
+        """
+        directory = source if os.path.exists(os.path.join(source, MANIFEST)) else self._snapshot_dir(source)
+        if self._repl_pool is not None:
+            result = self._repl_pool.restore(self.session_id, directory)
+            if result.status != "ok":
+                message = (str(result.output).splitlines() or [""])[0]
+                print(f"Warning: Could not restore the Python namespace: {message}")
+                return 0
+            return result.output
+        from biomni.tool.support_tools import _persistent_namespace
+
+        return restore_namespace(_persistent_namespace, directory)
+
+    def close(self):
+        """Release the execution resources held by this agent.
+
+        In process REPL mode this terminates the worker process that owns the
+        agent's Python namespace. Stored large outputs of the session are deleted.
+        The agent can still be used afterwards; a fresh worker is assigned on the
+        next execution.
+        """
+        if getattr(self, "_repl_pool", None) is not None:
+            self._repl_pool.release(self.session_id)
+        if getattr(self, "_tool_dispatcher", None) is not None:
+            self._tool_dispatcher.shutdown()
+            self._tool_dispatcher = None
+        if getattr(self, "_speculation_executor", None) is not None:
+            self._speculation_executor.shutdown(wait=True)
+            self._speculation_executor = None
+        self._speculative_execution = None
+        if getattr(self, "_output_store", None) is not None:
+            self._output_store.clear()
+        if getattr(self, "context_policy", None) is not None:
+            # Compaction state refers to this session's conversations and stored outputs
+            self.context_policy.reset()
+
+    def create_mcp_server(self, tool_modules=None, concurrent=False, dispatcher=None):
         """
         Create an MCP server object that exposes internal Biomni tools.
         This gives you control over when and how to run the server.
 
         Args:
             tool_modules: List of module names to expose (default: all in self.module2api)
+            concurrent: Serve many clients at once: tools run on a ToolDispatcher (API tools on
+                a thread pool, analysis tools in worker processes) with timeouts, memory limits
+                and cancellation, and tool modules are imported on their first call
+            dispatcher: ToolDispatcher to use in concurrent mode (default: built from the config)
 
         Returns:
             FastMCP server object that you can run manually
@@ -1845,6 +2496,40 @@ Each library is listed with its description to help you understand its functiona
 
         registered_tools = 0
 
+        if concurrent or dispatcher is not None:
+            if dispatcher is None:
+                from biomni.tool_dispatch import ToolDispatcher
+
+                dispatcher = ToolDispatcher(
+                    io_workers=default_config.mcp_server_io_workers,
+                    cpu_workers=default_config.mcp_server_cpu_workers,
+                    default_timeout=default_config.mcp_server_tool_timeout,
+                    memory_limit_mb=default_config.mcp_server_memory_limit_mb,
+                )
+            self._tool_dispatcher = dispatcher
+            custom_functions = getattr(self, "_custom_functions", {})
+            for module_name in modules:
+                for tool_schema in self.module2api.get(module_name, []):
+                    tool_name = tool_schema.get("name")
+                    if not tool_name:
+                        continue
+                    try:
+                        # Custom and MCP-proxied tools are called directly; module tools are imported lazily
+                        wrapper_func = self._generate_async_mcp_wrapper(
+                            dispatcher,
+                            module_name,
+                            tool_name,
+                            tool_schema,
+                            func=custom_functions.get(tool_name),
+                        )
+                        mcp.tool()(wrapper_func)
+                        registered_tools += 1
+                    except Exception as e:
+                        print(f"Warning: Failed to register tool '{tool_name}': {e}")
+
+            print(f"Created concurrent MCP server with {registered_tools} tools")
+            return mcp
+
         for module_name in modules:
             try:
                 # Import the actual module
@@ -2371,10 +3056,60 @@ Each library is listed with its description to help you understand its functiona
         except Exception as e:
             print(f"Warning: Could not clear execution plots: {e}")
 
-    def _generate_mcp_wrapper_from_biomni_schema(self, original_func, func_name, required_params, optional_params):
-        """Generate wrapper function based on Biomni schema format."""
+    def _generate_async_mcp_wrapper(self, dispatcher, module_name, tool_name, tool_schema, func=None):
+        """Generate an async wrapper that runs a tool on the dispatcher, based on Biomni schema format."""
+        required_params = tool_schema.get("required_parameters", [])
+        optional_params = tool_schema.get("optional_parameters", [])
+        param_names = [p["name"] for p in required_params + optional_params]
+
+        async def wrapper(**kwargs) -> dict:
+            filtered_kwargs = {k: kwargs[k] for k in param_names if kwargs.get(k) is not None}
+            try:
+                result = await dispatcher.acall(
+                    None if func is not None else module_name, tool_name, filtered_kwargs, func=func
+                )
+                if isinstance(result, dict):
+                    return result
+                return {"result": result}
+            except Exception as e:
+                return {"error": str(e)}
+
+        wrapper.__name__ = tool_name
+        # The module is not imported yet, so the description comes from the schema
+        wrapper.__doc__ = func.__doc__ if func is not None and func.__doc__ else tool_schema.get("description", "")
+        wrapper.__signature__ = self._mcp_signature_from_biomni_schema(required_params, optional_params)
+        return wrapper
+
+    @staticmethod
+    def _mcp_signature_from_biomni_schema(required_params, optional_params):
+        """Keyword-only signature of a tool wrapper, from Biomni schema parameters."""
         import inspect
 
+        new_params = []
+
+        # Map your types to Python types
+        type_map = {"str": str, "int": int, "float": float, "bool": bool, "List[str]": list[str], "dict": dict}
+
+        # Add required parameters
+        for param_info in required_params:
+            param_type = type_map.get(param_info["type"], str)
+            new_params.append(
+                inspect.Parameter(param_info["name"], inspect.Parameter.KEYWORD_ONLY, annotation=param_type)
+            )
+
+        # Add optional parameters, made optional
+        for param_info in optional_params:
+            param_type = type_map.get(param_info["type"], str)
+            new_params.append(
+                inspect.Parameter(
+                    param_info["name"], inspect.Parameter.KEYWORD_ONLY, default=None, annotation=param_type | None
+                )
+            )
+
+        return inspect.Signature(new_params, return_annotation=dict)
+
+    def _generate_mcp_wrapper_from_biomni_schema(self, original_func, func_name, required_params, optional_params):
+        """Generate wrapper function based on Biomni schema format."""
         # Combine all parameters
         all_params = required_params + optional_params
 
@@ -2423,36 +3158,7 @@ Each library is listed with its description to help you understand its functiona
             wrapper.__name__ = func_name
             wrapper.__doc__ = original_func.__doc__
 
-            # Create proper signature
-            new_params = []
-
-            # Map your types to Python types
-            type_map = {"str": str, "int": int, "float": float, "bool": bool, "List[str]": list[str], "dict": dict}
-
-            # Add required parameters
-            for param_info in required_params:
-                param_name = param_info["name"]
-                param_type_str = param_info["type"]
-                param_type = type_map.get(param_type_str, str)
-
-                new_params.append(inspect.Parameter(param_name, inspect.Parameter.KEYWORD_ONLY, annotation=param_type))
-
-            # Add optional parameters
-            for param_info in optional_params:
-                param_name = param_info["name"]
-                param_type_str = param_info["type"]
-                param_type = type_map.get(param_type_str, str)
-
-                # Make it optional
-                optional_type = param_type | None
-
-                new_params.append(
-                    inspect.Parameter(
-                        param_name, inspect.Parameter.KEYWORD_ONLY, default=None, annotation=optional_type
-                    )
-                )
-
             # Set the signature
-            wrapper.__signature__ = inspect.Signature(new_params, return_annotation=dict)
+            wrapper.__signature__ = self._mcp_signature_from_biomni_schema(required_params, optional_params)
 
             return wrapper
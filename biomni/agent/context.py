@@ -0,0 +1,349 @@
+"""
+Context-window policies for A1.
+
+``generate`` used to send the full conversation on every step, so a long analysis
+grew the prompt (and the per-step latency) without bound. A context policy turns the
+stored conversation into the list of messages actually sent to the LLM, within a
+token budget. The conversation kept in the graph state is never modified; only the
+view sent to the model is.
+
+``CompactingContextPolicy`` (the default) works in three stages:
+
+1. Stale observations (all but the most recent few) are replaced by a short
+   head/tail preview. Their full text is kept in the session's ``OutputStore``
+   under a handle quoted in the preview, so the agent can read it back with
+   ``read_output``/``grep_output`` instead of re-running the cell.
+2. If the history is still over budget, the oldest steps are replaced by a
+   summary (written by the LLM when a summarizer is configured, otherwise a note
+   listing what was dropped).
+3. As a last resort, the latest message is truncated so the call fits the
+   hard budget.
+
+Compaction is sticky: once a message is compacted it stays compacted, and it only
+happens when the budget is exceeded (down to a lower target). The prompt therefore
+keeps a stable prefix between compactions, which keeps provider prompt caching
+effective. These decisions belong to one conversation (A1 passes its run's thread
+id); the state of the least recently used conversations is discarded.
+
+Usage:
+    from biomni.agent.context import CompactingContextPolicy
+
+    agent = A1(context_policy=CompactingContextPolicy(max_tokens=60000))
+"""
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from biomni.agent.output_store import HANDLE_RE
+from biomni.agent.streaming import chunk_text
+
+OBSERVATION_OPEN = "<observation>"
+OBSERVATION_CLOSE = "</observation>"
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap, provider-independent token estimate (about four characters per token)."""
+    return math.ceil(len(text) / 4)
+
+
+def message_text(message: BaseMessage) -> str:
+    """Return the text content of a message."""
+    return chunk_text(message.content)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()
+
+
+def is_observation(message: BaseMessage) -> bool:
+    return message_text(message).lstrip().startswith(OBSERVATION_OPEN)
+
+
+class ContextPolicy:
+    """Base class: decide which messages are sent to the LLM for a step.
+
+    Subclasses override ``apply``. ``budget`` is the number of tokens available
+    for the history (the system prompt is already accounted for), or None when
+    unbounded.
+    """
+
+    def __init__(self, max_tokens: int | None = None, token_counter=None):
+        """
+        Args:
+            max_tokens: Hard budget for a whole LLM call, system prompt included; None means unbounded
+            token_counter: Callable returning the number of tokens in a string (defaults to ``estimate_tokens``)
+        """
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter or estimate_tokens
+        self._counts: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "compacted_observations": 0, "summarized_messages": 0, "truncated_messages": 0}
+
+    def count_tokens(self, text: str) -> int:
+        """Token count of ``text``, memoized since the same messages are counted on every step."""
+        key = _digest(text)
+        with self._lock:
+            if key in self._counts:
+                self._counts.move_to_end(key)
+                return self._counts[key]
+        count = self.token_counter(text)
+        with self._lock:
+            self._counts[key] = count
+            if len(self._counts) > 4096:
+                self._counts.popitem(last=False)
+        return count
+
+    def message_tokens(self, message: BaseMessage) -> int:
+        # A few tokens of per-message overhead (role markers)
+        return self.count_tokens(message_text(message)) + 4
+
+    def history_tokens(self, messages: list[BaseMessage]) -> int:
+        return sum(self.message_tokens(m) for m in messages)
+
+    def apply(
+        self, messages: list[BaseMessage], budget: int | None = None, llm=None, conversation: str | None = None
+    ) -> list[BaseMessage]:
+        """Return the messages to send for this step.
+
+        Args:
+            messages: The full conversation (not modified)
+            budget: Tokens available for the history, or None for ``max_tokens`` alone
+            llm: The agent's chat model, for policies that summarize
+            conversation: Key of the conversation, scoping any state the policy keeps between steps
+                (defaults to the first message)
+
+        Returns:
+            list[BaseMessage]: The messages to send
+        """
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget the state kept for every conversation."""
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+class FullHistoryPolicy(ContextPolicy):
+    """Send the whole conversation on every step (the previous behavior)."""
+
+    def apply(self, messages, budget=None, llm=None, conversation=None):
+        with self._lock:
+            self.stats["calls"] += 1
+        return list(messages)
+
+
+class CompactingContextPolicy(ContextPolicy):
+    """Keep the history under a token budget by compacting stale observations first."""
+
+    def __init__(
+        self,
+        max_tokens: int | None = 120000,
+        keep_recent_observations: int = 3,
+        preview_chars: int = 1000,
+        target_ratio: float = 0.6,
+        output_store=None,
+        summarize: bool = False,
+        token_counter=None,
+        max_conversations: int = 32,
+    ):
+        """
+        Args:
+            max_tokens: Hard budget for a whole LLM call, system prompt included
+            keep_recent_observations: Number of most recent observations always sent in full
+            preview_chars: Characters of head and tail kept from a compacted observation
+            target_ratio: Once the budget is exceeded, compact down to this fraction of it
+            output_store: OutputStore, or a callable returning the current one, keeping the full text
+                of compacted observations
+            summarize: Summarize dropped steps with the LLM instead of only listing them
+            token_counter: Callable returning the number of tokens in a string
+            max_conversations: Conversations whose compaction state is kept
+        """
+        super().__init__(max_tokens=max_tokens, token_counter=token_counter)
+        self.keep_recent_observations = keep_recent_observations
+        self.preview_chars = preview_chars
+        self.target_ratio = target_ratio
+        self.output_store = output_store
+        self.summarize = summarize
+        self.max_conversations = max_conversations
+        # Sticky decisions per conversation: compacted observations and summaries keyed by content
+        # digest, and the number of leading history messages replaced by a summary
+        self._conversations: OrderedDict[str, dict] = OrderedDict()
+
+    def _state(self, conversation: str) -> dict:
+        with self._lock:
+            state = self._conversations.get(conversation)
+            if state is None:
+                state = self._conversations[conversation] = {"compacted": {}, "summaries": {}, "dropped": 0}
+                while len(self._conversations) > self.max_conversations:
+                    self._conversations.popitem(last=False)
+            else:
+                self._conversations.move_to_end(conversation)
+            return state
+
+    def reset(self):
+        with self._lock:
+            self._conversations.clear()
+
+    def _store(self):
+        return self.output_store() if callable(self.output_store) else self.output_store
+
+    def spill(self, text: str) -> str | None:
+        """Keep ``text`` in the output store and return its handle (None without a store)."""
+        store = self._store()
+        return store.put(text) if store is not None else None
+
+    def compact_observation(self, text: str, state: dict | None = None) -> str:
+        """Return a head/tail preview of an observation, with the handle of its full text.
+
+        ``state`` is the conversation's state, in which the preview is remembered.
+        """
+        cache = state["compacted"] if state is not None else {}
+        key = _digest(text)
+        if key in cache:
+            return cache[key]
+        body = text.strip()
+        if body.startswith(OBSERVATION_OPEN):
+            body = body[len(OBSERVATION_OPEN) :]
+        if body.endswith(OBSERVATION_CLOSE):
+            body = body[: -len(OBSERVATION_CLOSE)]
+        n = self.preview_chars
+        if len(body) <= 2 * n:
+            compacted = text
+        else:
+            # Outputs already spilled by execute quote their handle in the preview tail
+            handle = None if HANDLE_RE.search(body[-n:]) else self.spill(body)
+            where = f' Read the rest with read_output("{handle}", start_line, end_line).' if handle else ""
+            compacted = (
+                f"{OBSERVATION_OPEN}[Earlier output compacted: {len(body)} characters, showing the first and last "
+                f"{n}.{where}]\n{body[:n]}\n...\n{body[-n:]}{OBSERVATION_CLOSE}"
+            )
+        cache[key] = compacted
+        return compacted
+
+    def _summary_message(self, dropped: list[BaseMessage], llm, state: dict) -> HumanMessage:
+        key = _digest("\x00".join(message_text(m) for m in dropped))
+        summary = state["summaries"].get(key)
+        if summary is None:
+            if self.summarize and llm is not None:
+                transcript = "\n\n".join(f"{m.type}: {message_text(m)[:4000]}" for m in dropped)
+                try:
+                    summary = chunk_text(
+                        llm.invoke(
+                            [
+                                HumanMessage(
+                                    content="Summarize the following steps of an analysis for the agent that "
+                                    "performed them. Keep the plan and its progress, key results, file paths, "
+                                    "variable names and errors; drop everything else.\n\n" + transcript
+                                )
+                            ]
+                        ).content
+                    )
+                except Exception as e:
+                    print(f"Warning: could not summarize earlier steps: {e}")
+            if not summary:
+                code_steps = sum(1 for m in dropped if "<execute>" in message_text(m))
+                summary = (
+                    f"{len(dropped)} earlier messages ({code_steps} code executions) were removed to fit the "
+                    "context window. Variables and files created by that code still exist in the environment."
+                )
+            state["summaries"][key] = summary
+        return HumanMessage(content=f"[Summary of earlier steps]\n{summary}")
+
+    def apply(self, messages, budget=None, llm=None, conversation=None):
+        with self._lock:
+            self.stats["calls"] += 1
+        if budget is None:
+            budget = self.max_tokens
+        messages = list(messages)
+        if budget is None or not messages:
+            return messages
+        if conversation is None:
+            conversation = _digest(message_text(messages[0]))
+        # Compacted previews quote handles of the current output store; another store starts afresh
+        state = self._state(f"{conversation}\x00{getattr(self._store(), 'root_dir', '')}")
+
+        # Re-apply earlier compactions so the prefix sent to the LLM stays stable
+        observation_idx = [i for i, m in enumerate(messages) if is_observation(m)]
+        n_stale = max(len(observation_idx) - self.keep_recent_observations, 0)
+        stale = observation_idx[:n_stale]
+        pending = []
+        for i in stale:
+            key = _digest(message_text(messages[i]))
+            if key in state["compacted"]:
+                messages[i] = messages[i].model_copy(update={"content": state["compacted"][key]})
+            else:
+                pending.append(i)
+
+        dropped_count = min(state["dropped"], max(len(messages) - 2, 0))
+        view = self._with_summary(messages, dropped_count, llm, state)
+        if self.history_tokens(view) <= budget:
+            return view
+
+        # Compaction is needed: aim below the budget so the next steps reuse this prefix
+        target = int(budget * self.target_ratio)
+        for i in pending:
+            if self.history_tokens(view) <= target:
+                break
+            text = message_text(messages[i])
+            compacted = self.compact_observation(text, state)
+            if compacted != text:
+                messages[i] = messages[i].model_copy(update={"content": compacted})
+                with self._lock:
+                    self.stats["compacted_observations"] += 1
+                view = self._with_summary(messages, dropped_count, llm, state)
+
+        # Replace the oldest steps (after the task) by a summary, whole steps at a time. The
+        # summary is estimated while choosing the cut so the summarizer runs only once.
+        if self.history_tokens(view) > target:
+            summary_allowance = 300
+            previous = dropped_count
+            kept = self.message_tokens(messages[0]) + summary_allowance
+            kept += self.history_tokens(messages[1 + dropped_count :])
+            while kept > target and dropped_count + 2 < len(messages):
+                kept -= self.message_tokens(messages[1 + dropped_count])
+                dropped_count += 1
+                # Never split an <execute> message from its observation
+                while dropped_count + 2 < len(messages) and is_observation(messages[1 + dropped_count]):
+                    kept -= self.message_tokens(messages[1 + dropped_count])
+                    dropped_count += 1
+            if dropped_count != previous:
+                state["dropped"] = dropped_count
+                with self._lock:
+                    self.stats["summarized_messages"] += dropped_count - previous
+                view = self._with_summary(messages, dropped_count, llm, state)
+
+        # Hard budget: truncate the latest message
+        excess = self.history_tokens(view) - budget
+        if excess > 0:
+            last = view[-1]
+            text = message_text(last)
+            keep = max(len(text) - excess * 4 - 200, 0)
+            head = text[: keep // 2]
+            tail = text[len(text) - keep // 2 :] if keep else ""
+            notice = f"\n...[{len(text) - keep} characters truncated to fit the context window]...\n"
+            view[-1] = last.model_copy(update={"content": head + notice + tail})
+            with self._lock:
+                self.stats["truncated_messages"] += 1
+        return view
+
+    def _with_summary(self, messages, dropped_count, llm, state):
+        """The task message, a summary of ``dropped_count`` following messages, then the rest."""
+        if not dropped_count:
+            return list(messages)
+        dropped = messages[1 : 1 + dropped_count]
+        return [messages[0], self._summary_message(dropped, llm, state)] + messages[1 + dropped_count :]
+
+
+def get_context_policy(name: str | None, max_tokens: int | None = None, **kwargs) -> ContextPolicy:
+    """Build a context policy from its configuration name ("compact" or "full")."""
+    if name in (None, "full", "none"):
+        return FullHistoryPolicy(max_tokens=max_tokens)
+    if name == "compact":
+        return CompactingContextPolicy(max_tokens=max_tokens, **kwargs)
+    raise ValueError(f"Unknown context policy: {name}. Valid options are 'compact' or 'full'")
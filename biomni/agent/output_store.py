@@ -0,0 +1,197 @@
+"""
+Per-session store for large execution outputs.
+
+Outputs longer than the observation limit used to be cut at 10,000 characters, so
+the agent re-ran (often expensive) code to see the rest. Instead, ``execute`` now
+writes the full output to an ``OutputStore`` and puts a head/tail preview plus a
+handle in the observation. The agent reads the rest from its code with the
+``read_output`` and ``grep_output`` helpers injected into the REPL:
+
+    print(read_output("out-1a2b3c4d5e6f", start_line=200, end_line=400))
+    print(grep_output("out-1a2b3c4d5e6f", r"ERROR|p-value"))
+
+Outputs are content-addressed (the same output gets the same handle) and read
+through ``mmap``, so paging or searching a very large output does not load it
+into memory.
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import shutil
+
+HANDLE_PREFIX = "out-"
+HANDLE_RE = re.compile(r"\bout-[0-9a-f]{12}\b")
+
+
+class OutputStore:
+    """Content-addressed files of execution outputs, one directory per session.
+
+    Instances only hold a directory path, so they (and their bound ``read_output``
+    and ``grep_output`` methods) can be sent to REPL worker processes.
+    """
+
+    def __init__(self, root_dir: str):
+        """
+        Args:
+            root_dir: Directory of this session's outputs (created on first write)
+        """
+        self.root_dir = root_dir
+
+    def _path(self, handle: str) -> str:
+        if not HANDLE_RE.fullmatch(handle):
+            raise ValueError(f"Invalid output handle: {handle!r}")
+        return os.path.join(self.root_dir, f"{handle}.txt")
+
+    def put(self, text: str) -> str:
+        """Store ``text`` and return its handle."""
+        data = text.encode("utf-8", errors="replace")
+        handle = HANDLE_PREFIX + hashlib.sha256(data).hexdigest()[:12]
+        path = self._path(handle)
+        if not os.path.exists(path):
+            os.makedirs(self.root_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return handle
+
+    def _open(self, handle: str):
+        path = self._path(handle)
+        if not os.path.exists(path):
+            raise KeyError(f"No stored output with handle {handle!r} in this session")
+        f = open(path, "rb")
+        if os.fstat(f.fileno()).st_size == 0:
+            return f, b""
+        return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read_output(self, handle: str, start_line: int = 1, end_line: int | None = None, max_lines: int = 200) -> str:
+        """Return lines ``start_line``..``end_line`` (1-based, inclusive) of a stored output.
+
+        Args:
+            handle: Handle quoted in the observation (e.g. "out-1a2b3c4d5e6f")
+            start_line: First line to return
+            end_line: Last line to return (defaults to ``start_line + max_lines - 1``)
+            max_lines: Maximum number of lines returned at once
+
+        Returns:
+            str: The requested lines
+        """
+        start_line = max(start_line, 1)
+        if end_line is None or end_line - start_line + 1 > max_lines:
+            end_line = start_line + max_lines - 1
+        f, data = self._open(handle)
+        try:
+            pos = 0
+            line_no = 1
+            while line_no < start_line and pos != -1:
+                pos = data.find(b"\n", pos)
+                if pos != -1:
+                    pos += 1
+                    line_no += 1
+            if pos == -1 or pos >= len(data):
+                return ""
+            end = pos
+            while line_no <= end_line and end != -1:
+                end = data.find(b"\n", end)
+                if end != -1:
+                    end += 1
+                    line_no += 1
+            chunk = data[pos:] if end == -1 else data[pos:end]
+            return bytes(chunk).decode("utf-8", errors="replace").rstrip("\n")
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+            f.close()
+
+    def grep_output(
+        self, handle: str, pattern: str, context: int = 0, max_matches: int = 50, ignore_case: bool = False
+    ) -> str:
+        """Return the lines of a stored output matching a regular expression, prefixed by their line number.
+
+        Args:
+            handle: Handle quoted in the observation
+            pattern: Regular expression searched line by line
+            context: Number of lines shown before and after each match
+            max_matches: Maximum number of matching lines reported
+            ignore_case: Case-insensitive matching
+
+        Returns:
+            str: Matching lines as "line_number: text" ("line_number- text" for context lines)
+        """
+        regex = re.compile(pattern.encode("utf-8"), re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+        f, data = self._open(handle)
+        try:
+            match_lines = []
+            line_no, line_start = 1, 0
+            truncated = False
+            for m in regex.finditer(data):
+                # Advance the line counter to the line containing the match
+                while True:
+                    nxt = data.find(b"\n", line_start)
+                    if nxt == -1 or nxt >= m.start():
+                        break
+                    line_start = nxt + 1
+                    line_no += 1
+                if match_lines and match_lines[-1] == line_no:
+                    continue
+                if len(match_lines) >= max_matches:
+                    truncated = True
+                    break
+                match_lines.append(line_no)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+            f.close()
+
+        if not match_lines:
+            return f"No lines match {pattern!r}"
+        lines = []
+        last_shown = 0
+        for n in match_lines:
+            first = max(n - context, last_shown + 1, 1)
+            block = self.read_output(handle, first, n + context, max_lines=2 * context + 1).split("\n")
+            for offset, text in enumerate(block):
+                line = first + offset
+                lines.append(f"{line}{':' if line == n else '-'} {text}")
+                last_shown = line
+        if truncated:
+            lines.append(f"... (stopped after {max_matches} matching lines)")
+        return "\n".join(lines)
+
+    def info(self, handle: str) -> dict:
+        """Return the size in bytes and the line count of a stored output."""
+        f, data = self._open(handle)
+        try:
+            lines, pos = 0, 0
+            while pos < len(data):
+                lines += 1
+                pos = data.find(b"\n", pos)
+                if pos == -1:
+                    break
+                pos += 1
+            return {"handle": handle, "bytes": len(data), "lines": lines}
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+            f.close()
+
+    def preview(self, text: str, head_chars: int = 6000, tail_chars: int = 2000) -> str:
+        """Store ``text`` and return a head/tail preview that quotes its handle and the helpers to read it."""
+        handle = self.put(text)
+        n_lines = text.count("\n") + (0 if text.endswith("\n") else 1)
+        omitted = len(text) - head_chars - tail_chars
+        shown = text
+        if omitted > 0:
+            shown = f"{text[:head_chars]}\n... [{omitted} characters omitted] ...\n{text[-tail_chars:]}"
+        return (
+            f"{shown}\n"
+            f"[The full output ({len(text)} characters, {n_lines} lines) is stored as {handle}. "
+            f'Instead of re-running the code, use read_output("{handle}", start_line, end_line) '
+            f'or grep_output("{handle}", pattern) in Python to see the rest.]'
+        )
+
+    def clear(self):
+        """Delete every output of this session."""
+        shutil.rmtree(self.root_dir, ignore_errors=True)
@@ -79,6 +79,7 @@ class react:
         if self.use_tool_retriever:
             self.tool_registry = ToolRegistry(module2api)
             self.retriever = ToolRetriever()
+            self.retriever_mode = default_config.tool_retriever_mode
 
         self.timeout_seconds = timeout_seconds  # 10 minutes default timeout
 
@@ -378,9 +379,9 @@ Here is the list of available libraries with their descriptions:
                 "libraries": library_descriptions,
             }
 
-            # Use prompt-based retrieval with the agent's LLM
-            selected_resources = self.retriever.prompt_based_retrieval(prompt, resources, llm=self.llm)
-            print("Using prompt-based retrieval with the agent's LLM")
+            # Select resources with the configured strategy (prompt-based uses the agent's LLM)
+            selected_resources = self.retriever.retrieve(prompt, resources, llm=self.llm, mode=self.retriever_mode)
+            print(f"Using {self.retriever_mode}-based retrieval")
 
             # If we're using prompt or embedding based retrieval, print the selected resources
             print("\nSelected tools:")
@@ -0,0 +1,224 @@
+"""
+Pool of warm A1 agents for serving many conversations from one process.
+
+Constructing an A1 agent is expensive (data-lake checks, tool-description imports,
+prompt and graph construction), so a server should not build one per request. The
+session manager keeps idle agents keyed by the settings that shape them and hands
+each request an agent that has been reset to a fresh conversation.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from biomni.config import default_config
+from biomni.repl_pool import new_session_id
+
+
+@dataclass
+class _PooledAgent:
+    agent: object
+    key: tuple
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    conversations: int = 0
+
+
+class A1SessionManager:
+    """Keep warm A1 agents and lend them out one conversation at a time.
+
+    Agents are pooled by ``(path, llm, source, commercial_mode, use_tool_retriever,
+    temperature)``. A checked-out agent is exclusively owned by one request until it
+    is returned; on checkout it gets a new session id (and therefore its own REPL
+    worker namespace in process mode), a new thread id and empty execution results.
+
+    Usage:
+        manager = A1SessionManager(max_idle_per_key=4, idle_timeout=900)
+        with manager.session(llm="gpt-4.1") as (agent, thread_id):
+            for step in agent.go_stream(query, thread_id=thread_id):
+                ...
+    """
+
+    def __init__(
+        self,
+        max_idle_per_key: int = 4,
+        idle_timeout: float = 900,
+        repl_mode: str = "process",
+        agent_factory=None,
+    ):
+        """
+        Args:
+            max_idle_per_key: Maximum number of idle agents kept for each configuration
+            idle_timeout: Seconds an idle agent may sit unused before it is evicted
+            repl_mode: REPL backend for pooled agents; "process" isolates sessions' namespaces
+            agent_factory: Callable building an agent from keyword arguments (defaults to A1)
+        """
+        if agent_factory is None:
+            from biomni.agent.a1 import A1
+
+            agent_factory = A1
+        self.agent_factory = agent_factory
+        self.max_idle_per_key = max_idle_per_key
+        self.idle_timeout = idle_timeout
+        self.repl_mode = repl_mode
+
+        self._lock = threading.Lock()
+        self._idle: dict[tuple, list[_PooledAgent]] = {}
+        self._in_use: dict[int, _PooledAgent] = {}
+        self.stats = {"created": 0, "reused": 0, "evicted": 0}
+
+    @staticmethod
+    def make_key(
+        path: str | None = None,
+        llm: str | None = None,
+        source: str | None = None,
+        commercial_mode: bool | None = None,
+        use_tool_retriever: bool | None = None,
+        temperature: float | None = None,
+    ) -> tuple:
+        """Resolve unspecified settings against ``default_config`` and build the pool key."""
+        return (
+            path if path is not None else default_config.path,
+            llm if llm is not None else default_config.llm,
+            source if source is not None else default_config.source,
+            commercial_mode if commercial_mode is not None else default_config.commercial_mode,
+            use_tool_retriever if use_tool_retriever is not None else default_config.use_tool_retriever,
+            temperature if temperature is not None else default_config.temperature,
+        )
+
+    def _build(self, key: tuple) -> _PooledAgent:
+        path, llm, source, commercial_mode, use_tool_retriever, temperature = key
+        agent = self.agent_factory(
+            path=path,
+            llm=llm,
+            source=source,
+            commercial_mode=commercial_mode,
+            use_tool_retriever=use_tool_retriever,
+            repl_mode=self.repl_mode,
+            temperature=temperature,
+        )
+        self.stats["created"] += 1
+        return _PooledAgent(agent=agent, key=key)
+
+    @staticmethod
+    def _reset_conversation(agent):
+        """Give an agent a clean conversation: new session, no results or logs."""
+        if hasattr(agent, "close"):
+            agent.close()
+        agent.session_id = new_session_id()
+        agent._execution_results = []
+        agent._conversation_state = None
+        agent.log = []
+        agent.token_usage = {}
+
+    def checkout(self, timeout_seconds: int | None = None, **config) -> tuple[object, str]:
+        """Borrow an agent for one conversation.
+
+        Args:
+            timeout_seconds: Per-request code execution timeout
+            **config: Any of path, llm, source, commercial_mode, use_tool_retriever, temperature
+
+        Returns:
+            A tuple of (agent, thread_id). The agent must be returned with ``checkin``.
+        """
+        self.evict_idle()
+        key = self.make_key(**config)
+        pooled = None
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                pooled = idle.pop()
+                self.stats["reused"] += 1
+        if pooled is None:
+            pooled = self._build(key)
+
+        agent = pooled.agent
+        self._reset_conversation(agent)
+        agent.timeout_seconds = timeout_seconds if timeout_seconds is not None else default_config.timeout_seconds
+        pooled.conversations += 1
+        pooled.last_used = time.time()
+        with self._lock:
+            self._in_use[id(agent)] = pooled
+        return agent, new_session_id()
+
+    def checkin(self, agent):
+        """Return a borrowed agent to the idle pool."""
+        with self._lock:
+            pooled = self._in_use.pop(id(agent), None)
+        if pooled is None:
+            return
+        pooled.last_used = time.time()
+        # Free the session's REPL worker right away; the next checkout assigns a new one
+        if hasattr(agent, "close"):
+            agent.close()
+        with self._lock:
+            idle = self._idle.setdefault(pooled.key, [])
+            if len(idle) < self.max_idle_per_key:
+                idle.append(pooled)
+                return
+        self.stats["evicted"] += 1
+
+    @contextmanager
+    def session(self, timeout_seconds: int | None = None, **config):
+        """Context manager wrapping ``checkout``/``checkin``."""
+        agent, thread_id = self.checkout(timeout_seconds=timeout_seconds, **config)
+        try:
+            yield agent, thread_id
+        finally:
+            self.checkin(agent)
+
+    def prewarm(self, count: int = 1, **config):
+        """Build idle agents for a configuration ahead of the first request."""
+        key = self.make_key(**config)
+        for _ in range(count):
+            with self._lock:
+                if len(self._idle.get(key, [])) >= self.max_idle_per_key:
+                    break
+            pooled = self._build(key)
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle_per_key:
+                    idle.append(pooled)
+                    continue
+            # Another caller filled the idle list meanwhile; release the agent's worker
+            if hasattr(pooled.agent, "close"):
+                pooled.agent.close()
+            break
+
+    def evict_idle(self) -> int:
+        """Drop idle agents that have not been used within ``idle_timeout`` seconds."""
+        now = time.time()
+        evicted = []
+        with self._lock:
+            for key, idle in list(self._idle.items()):
+                keep = [p for p in idle if now - p.last_used < self.idle_timeout]
+                evicted.extend(p for p in idle if now - p.last_used >= self.idle_timeout)
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+            self.stats["evicted"] += len(evicted)
+        for p in evicted:
+            if hasattr(p.agent, "close"):
+                p.agent.close()
+        return len(evicted)
+
+    def status(self) -> dict:
+        """Return pool occupancy and counters."""
+        with self._lock:
+            return {
+                "idle": {str(k): len(v) for k, v in self._idle.items()},
+                "in_use": len(self._in_use),
+                **self.stats,
+            }
+
+    def shutdown(self):
+        """Release every pooled agent's resources."""
+        with self._lock:
+            pooled = [p for idle in self._idle.values() for p in idle] + list(self._in_use.values())
+            self._idle = {}
+            self._in_use = {}
+        for p in pooled:
+            if hasattr(p.agent, "close"):
+                p.agent.close()
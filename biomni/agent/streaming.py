@@ -0,0 +1,116 @@
+"""
+Incremental parsing of streamed A1 responses.
+
+A1 responses are structured with ``<think>``, ``<execute>`` and ``<solution>``
+tags. When the response is streamed token by token, a tag can be split across
+chunks (``"<exe"`` + ``"cute>"``), so ``TagStreamParser`` holds back any trailing
+text that could still become a tag and turns the stream into start/delta/end
+events per tag. Inside a tag only its own close tag ends it, so code such as
+``print("</solution>")`` stays part of the ``<execute>`` block, as it does for the
+``<execute>(.*?)</execute>`` match applied to the complete response.
+"""
+
+STREAM_TAGS = ("think", "execute", "solution")
+
+# Name used for text outside any tag
+TEXT_CHANNEL = "text"
+
+
+def chunk_text(content) -> str:
+    """Extract the text of a streamed message chunk (a string or a list of content blocks)."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for block in content:
+            if isinstance(block, str):
+                parts.append(block)
+            elif isinstance(block, dict) and block.get("type", "text") == "text":
+                parts.append(block.get("text", ""))
+        return "".join(parts)
+    return ""
+
+
+class TagStreamParser:
+    """Turn a stream of text chunks into tag-aware events.
+
+    Events are dictionaries with an ``event`` of "start", "delta" or "end", the
+    ``tag`` they belong to ("think", "execute", "solution" or "text" for untagged
+    text) and, for deltas, the ``text``.
+
+    Usage:
+        parser = TagStreamParser()
+        for chunk in chunks:
+            for event in parser.feed(chunk):
+                ...
+        for event in parser.flush():
+            ...
+    """
+
+    def __init__(self, tags: tuple[str, ...] = STREAM_TAGS):
+        self.tags = tags
+        self.current: str | None = None
+        self._buffer = ""
+        self._open = {f"<{t}>": t for t in tags}
+        self._close = {f"</{t}>": t for t in tags}
+        self._markers = list(self._open) + list(self._close)
+
+    def _emit(self, events: list[dict], text: str):
+        if not text:
+            return
+        tag = self.current or TEXT_CHANNEL
+        if events and events[-1]["event"] == "delta" and events[-1]["tag"] == tag:
+            events[-1]["text"] += text
+        else:
+            events.append({"event": "delta", "tag": tag, "text": text})
+
+    def _switch(self, events: list[dict], tag: str | None):
+        if self.current is not None:
+            events.append({"event": "end", "tag": self.current})
+        self.current = tag
+        if tag is not None:
+            events.append({"event": "start", "tag": tag})
+
+    def _active_markers(self) -> list[str]:
+        # Inside a tag, other tags are content; outside, any open tag (or a stray close tag) counts
+        if self.current is not None:
+            return [f"</{self.current}>"]
+        return self._markers
+
+    def feed(self, text: str) -> list[dict]:
+        """Consume a chunk and return the events it completes."""
+        events: list[dict] = []
+        buffer = self._buffer + text
+        while buffer:
+            idx = buffer.find("<")
+            if idx == -1:
+                self._emit(events, buffer)
+                buffer = ""
+                break
+            self._emit(events, buffer[:idx])
+            buffer = buffer[idx:]
+
+            markers = self._active_markers()
+            marker = next((m for m in markers if buffer.startswith(m)), None)
+            if marker is not None:
+                if marker in self._open:
+                    self._switch(events, self._open[marker])
+                elif self.current is not None:
+                    self._switch(events, None)
+                buffer = buffer[len(marker) :]
+                continue
+            if any(m.startswith(buffer) for m in markers):
+                # Possibly the beginning of a tag split across chunks; wait for more text
+                break
+            self._emit(events, "<")
+            buffer = buffer[1:]
+        self._buffer = buffer
+        return events
+
+    def flush(self) -> list[dict]:
+        """Emit any held-back text and close the open tag (e.g. one cut off by a stop sequence)."""
+        events: list[dict] = []
+        self._emit(events, self._buffer)
+        self._buffer = ""
+        self._switch(events, None)
+        return events
@@ -0,0 +1,198 @@
+"""
+Durable checkpoints of agent runs.
+
+Every A1 run gets its own thread id, and its graph state (the message history and
+the next step) is checkpointed after each step. With the default SQLite
+checkpointer an interrupted run (worker crash, deploy, Ctrl-C) can be picked up
+with ``A1.resume(thread_id)`` from its last completed step, so the LLM responses
+and code cells already finished are not paid for again.
+
+The store stays bounded: only the last ``keep_last`` checkpoints of a run are kept
+(resuming needs only the latest), and runs that have not been updated for
+``retention_seconds``, or beyond the ``max_runs`` most recent ones, are pruned.
+
+The backend is chosen with ``BiomniConfig.checkpointer``: "sqlite" (default),
+"memory" (nothing survives the process), or "package.module:factory" for any
+LangGraph checkpoint saver, built by ``factory(config)``.
+
+Usage:
+    from biomni.checkpoint import get_checkpointer
+
+    saver = get_checkpointer("/data/.cache/checkpoints.sqlite")
+    saver.runs(limit=10)  # most recently updated runs
+"""
+
+import asyncio
+import importlib
+import os
+import sqlite3
+import threading
+import time
+
+from langgraph.checkpoint.memory import MemorySaver
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:
+    SqliteSaver = None
+
+
+if SqliteSaver is not None:
+
+    class SqliteCheckpointer(SqliteSaver):
+        """SqliteSaver with async methods, per-run compaction and retention of old runs."""
+
+        def __init__(
+            self,
+            db_path: str,
+            keep_last: int = 2,
+            retention_seconds: float | None = 7 * 24 * 3600,
+            max_runs: int | None = 1000,
+            prune_every: int = 256,
+        ):
+            """
+            Args:
+                db_path: SQLite file holding the checkpoints
+                keep_last: Checkpoints kept per run; older ones and their pending writes are deleted
+                retention_seconds: Runs not updated for this long are pruned (None keeps them)
+                max_runs: Only the most recently updated runs are kept (None for no limit)
+                prune_every: Prune old runs after this many checkpoints written by this process
+            """
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+            super().__init__(conn)
+            self.db_path = db_path
+            self.keep_last = max(1, keep_last)
+            self.retention_seconds = retention_seconds
+            self.max_runs = max_runs
+            self.prune_every = prune_every
+            self._puts = 0
+            self.prune()
+
+        def setup(self) -> None:
+            if self.is_setup:
+                return
+            super().setup()
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs (thread_id TEXT PRIMARY KEY, created REAL, updated REAL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS runs_updated ON runs (updated)")
+            self.conn.commit()
+
+        def put(self, config, checkpoint, metadata, new_versions):
+            saved = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = str(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+            now = time.time()
+            with self.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO runs (thread_id, created, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(thread_id) DO UPDATE SET updated = excluded.updated",
+                    (thread_id, now, now),
+                )
+                # Checkpoint ids increase with time, so the newest sort last
+                cur.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN "
+                    "(SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT ?)",
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last),
+                )
+                cur.execute(
+                    "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN "
+                    "(SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?)",
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns),
+                )
+            self._puts += 1
+            if self.prune_every and self._puts % self.prune_every == 0:
+                self.prune()
+            return saved
+
+        def delete_thread(self, thread_id: str) -> None:
+            super().delete_thread(thread_id)
+            with self.cursor() as cur:
+                cur.execute("DELETE FROM runs WHERE thread_id = ?", (str(thread_id),))
+
+        def prune(self) -> int:
+            """Delete runs past the retention period or beyond ``max_runs``; return how many."""
+            expired = []
+            with self.cursor() as cur:
+                if self.retention_seconds:
+                    cutoff = time.time() - self.retention_seconds
+                    expired += [r[0] for r in cur.execute("SELECT thread_id FROM runs WHERE updated < ?", (cutoff,))]
+                if self.max_runs:
+                    expired += [
+                        r[0]
+                        for r in cur.execute(
+                            "SELECT thread_id FROM runs ORDER BY updated DESC LIMIT -1 OFFSET ?", (self.max_runs,)
+                        )
+                    ]
+            for thread_id in set(expired):
+                self.delete_thread(thread_id)
+            return len(set(expired))
+
+        def runs(self, limit: int | None = None) -> list[dict]:
+            """Return the stored runs, most recently updated first."""
+            with self.cursor(transaction=False) as cur:
+                rows = cur.execute(
+                    "SELECT thread_id, created, updated FROM runs ORDER BY updated DESC LIMIT ?",
+                    (limit if limit is not None else -1,),
+                ).fetchall()
+            return [{"thread_id": t, "created": c, "updated": u} for t, c, u in rows]
+
+        # SqliteSaver is synchronous only; the async graph API runs its methods on threads
+
+        async def aget_tuple(self, config):
+            return await asyncio.to_thread(self.get_tuple, config)
+
+        async def alist(self, config, *, filter=None, before=None, limit=None):
+            items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+            for item in items:
+                yield item
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path=""):
+            return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+        async def adelete_thread(self, thread_id):
+            return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+_checkpointers: dict[str, object] = {}
+_checkpointers_lock = threading.Lock()
+
+
+def get_checkpointer(db_path: str, config=None):
+    """Return the process-wide checkpointer configured by ``config`` for a database path."""
+    if config is None:
+        from biomni.config import default_config as config
+    backend = config.checkpointer
+    key = os.path.abspath(db_path) if backend == "sqlite" else backend
+    with _checkpointers_lock:
+        saver = _checkpointers.get(key)
+        if saver is not None:
+            return saver
+        if backend == "memory":
+            saver = MemorySaver()
+        elif backend == "sqlite":
+            if SqliteSaver is None:
+                print(
+                    "Warning: langgraph-checkpoint-sqlite is not installed; agent runs are checkpointed in memory "
+                    "and cannot be resumed after a restart. Install it with: pip install langgraph-checkpoint-sqlite"
+                )
+                saver = MemorySaver()
+            else:
+                saver = SqliteCheckpointer(
+                    key,
+                    keep_last=config.checkpoint_keep_last,
+                    retention_seconds=config.checkpoint_retention,
+                    max_runs=config.checkpoint_max_runs,
+                )
+        else:
+            module_name, _, factory = backend.partition(":")
+            if not factory:
+                raise ValueError(f"Unknown checkpointer '{backend}': use 'sqlite', 'memory' or 'module:factory'")
+            saver = getattr(importlib.import_module(module_name), factory)(config)
+        _checkpointers[key] = saver
+        return saver
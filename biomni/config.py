@@ -5,8 +5,9 @@ Simple configuration class for centralizing common settings.
 Maintains full backward compatibility with existing code.
 """
 
+import json
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -32,12 +33,102 @@ class BiomniConfig:
     path: str = "./data"
     timeout_seconds: int = 600
 
+    # Lazy data lake: fetch data-lake files on first use instead of at startup,
+    # optionally through a cache directory shared by all agents on the node
+    lazy_data_lake: bool = False
+    data_lake_cache_dir: str | None = None
+
+    # Expose the data lake to agent code as a columnar `datalake` query object
+    datalake_query_api: bool = True
+
+    # Memory budget of the process-wide cache of parsed data-lake files used by tools
+    data_cache_max_mb: int = 2048
+
+    # Python execution backend: "thread" runs code in-process, "process" uses
+    # pre-forked worker processes with one isolated namespace per session
+    repl_mode: str = "thread"
+    repl_pool_size: int = 2
+    repl_memory_limit_mb: int | None = None
+    # Threads running code blocks for asynchronous agents (A1.ago / A1.astream)
+    async_execution_workers: int = 8
+    # Start running an <execute> block while the rest of the response is still streaming
+    speculative_execution: bool = False
+
+    # Checkpoints of agent runs, used by A1.resume: "sqlite" (<path>/.cache/checkpoints.sqlite
+    # unless checkpoint_path is set), "memory", or "module:factory" returning a LangGraph saver.
+    # Each run keeps its last checkpoint_keep_last checkpoints; runs idle for checkpoint_retention
+    # seconds or beyond the checkpoint_max_runs most recent are pruned
+    checkpointer: str = "sqlite"
+    checkpoint_path: str | None = None
+    checkpoint_keep_last: int = 2
+    checkpoint_retention: int | None = 7 * 24 * 3600
+    checkpoint_max_runs: int | None = 1000
+    # Write the REPL variables changed by each Python step to <path>/.cache/namespaces/<thread id>,
+    # restored lazily by A1.resume and after a REPL worker crash; larger variables are skipped.
+    # Process REPL mode only: in thread mode the namespace is shared by all agents of the process
+    namespace_snapshots: bool = True
+    namespace_snapshot_max_var_mb: float | None = 2048
+
+    # Mark the system prompt and conversation for provider prompt caching (Anthropic, Claude on Bedrock)
+    prompt_caching: bool = True
+
+    # Context window: "compact" elides stale observations and summarizes old steps to stay
+    # within context_max_tokens per LLM call; "full" always sends the whole conversation
+    context_policy: str = "compact"
+    context_max_tokens: int | None = 120000
+    context_summarize: bool = False
+    # Execution outputs longer than this are stored and shown as a preview with a handle
+    output_spill_chars: int = 10000
+
     # LLM settings (API keys still from environment)
     llm: str = "claude-sonnet-4-5"
     temperature: float = 0.7
+    # Keep-alive HTTP connections shared by all LLM clients of a provider; requests
+    # beyond the limit wait for a free connection. Per-provider values override it.
+    llm_max_connections: int = 32
+    llm_provider_max_connections: dict[str, int] = field(default_factory=dict)
+    # Shared budget per provider and model: requests and tokens per minute (None = unlimited)
+    # and an adaptive concurrency limit that halves on 429/overload and recovers as calls
+    # succeed. llm_rate_limits overrides them per "Source" or "Source:model", e.g.
+    # {"Anthropic": {"tokens_per_minute": 400000}, "OpenAI:gpt-4.1": {"requests_per_minute": 500}}
+    llm_rate_limiting: bool = True
+    llm_requests_per_minute: float | None = None
+    llm_tokens_per_minute: float | None = None
+    llm_max_concurrency: int = 16
+    llm_rate_limits: dict[str, dict] = field(default_factory=dict)
+    # Retries of rate-limited/overloaded calls, with jittered exponential backoff
+    llm_max_retries: int = 6
+    # Persistent cache of deterministic LLM sub-calls (database query synthesis, result
+    # formatting); defaults to <path>/.cache/llm_cache.sqlite
+    llm_cache: bool = True
+    llm_cache_path: str | None = None
+    llm_cache_ttl: int | None = 30 * 24 * 3600
+    llm_cache_max_entries: int = 20000
+    llm_cache_max_mb: float | None = 256
+
+    # MCP servers added with A1.add_mcp: warm client sessions kept per server, tool call
+    # timeout in seconds (None for no limit), and seconds between health-check pings
+    mcp_sessions_per_server: int = 2
+    mcp_call_timeout: float | None = None
+    mcp_health_check_interval: float | None = 60
+    # Seconds add_mcp waits for an uncached server's tool list before continuing without it
+    mcp_discovery_timeout: float = 30
+    # A1.create_mcp_server(concurrent=True): threads for API tools, worker processes for
+    # analysis tools, per-call timeout in seconds and address-space limit (MB) of a worker call
+    mcp_server_io_workers: int = 32
+    mcp_server_cpu_workers: int = 4
+    mcp_server_tool_timeout: float | None = 600
+    mcp_server_memory_limit_mb: int | None = None
 
     # Tool settings
     use_tool_retriever: bool = True
+    # Resource retrieval strategy: "prompt" asks the LLM over the full catalog, "embedding"
+    # uses a local BM25 + vector index, "embedding_rerank" lets the LLM pick from its shortlist
+    tool_retriever_mode: str = "prompt"
+    # Reuse resource selections for repeated queries; similarity enables near-duplicate hits (e.g. 0.95)
+    retrieval_cache: bool = True
+    retrieval_cache_ttl: int = 7 * 24 * 3600
+    retrieval_cache_similarity: float | None = None
 
     # Data licensing settings
     commercial_mode: bool = False  # If True, excludes non-commercial datasets
@@ -57,10 +148,107 @@ class BiomniConfig:
             self.path = os.getenv("BIOMNI_PATH") or os.getenv("BIOMNI_DATA_PATH")
         if os.getenv("BIOMNI_TIMEOUT_SECONDS"):
             self.timeout_seconds = int(os.getenv("BIOMNI_TIMEOUT_SECONDS"))
+        if os.getenv("BIOMNI_LAZY_DATA_LAKE"):
+            self.lazy_data_lake = os.getenv("BIOMNI_LAZY_DATA_LAKE").lower() == "true"
+        if os.getenv("BIOMNI_DATA_LAKE_CACHE_DIR"):
+            self.data_lake_cache_dir = os.getenv("BIOMNI_DATA_LAKE_CACHE_DIR")
+        if os.getenv("BIOMNI_DATALAKE_QUERY_API"):
+            self.datalake_query_api = os.getenv("BIOMNI_DATALAKE_QUERY_API").lower() == "true"
+        if os.getenv("BIOMNI_DATA_CACHE_MAX_MB"):
+            self.data_cache_max_mb = int(os.getenv("BIOMNI_DATA_CACHE_MAX_MB"))
+        if os.getenv("BIOMNI_REPL_MODE"):
+            self.repl_mode = os.getenv("BIOMNI_REPL_MODE").lower()
+        if os.getenv("BIOMNI_REPL_POOL_SIZE"):
+            self.repl_pool_size = int(os.getenv("BIOMNI_REPL_POOL_SIZE"))
+        if os.getenv("BIOMNI_REPL_MEMORY_LIMIT_MB"):
+            self.repl_memory_limit_mb = int(os.getenv("BIOMNI_REPL_MEMORY_LIMIT_MB"))
+        if os.getenv("BIOMNI_ASYNC_EXECUTION_WORKERS"):
+            self.async_execution_workers = int(os.getenv("BIOMNI_ASYNC_EXECUTION_WORKERS"))
+        if os.getenv("BIOMNI_SPECULATIVE_EXECUTION"):
+            self.speculative_execution = os.getenv("BIOMNI_SPECULATIVE_EXECUTION").lower() == "true"
+        if os.getenv("BIOMNI_CHECKPOINTER"):
+            self.checkpointer = os.getenv("BIOMNI_CHECKPOINTER")
+        if os.getenv("BIOMNI_CHECKPOINT_PATH"):
+            self.checkpoint_path = os.getenv("BIOMNI_CHECKPOINT_PATH")
+        if os.getenv("BIOMNI_CHECKPOINT_KEEP_LAST"):
+            self.checkpoint_keep_last = int(os.getenv("BIOMNI_CHECKPOINT_KEEP_LAST"))
+        if os.getenv("BIOMNI_CHECKPOINT_RETENTION"):
+            self.checkpoint_retention = int(os.getenv("BIOMNI_CHECKPOINT_RETENTION"))
+        if os.getenv("BIOMNI_CHECKPOINT_MAX_RUNS"):
+            self.checkpoint_max_runs = int(os.getenv("BIOMNI_CHECKPOINT_MAX_RUNS"))
+        if os.getenv("BIOMNI_NAMESPACE_SNAPSHOTS"):
+            self.namespace_snapshots = os.getenv("BIOMNI_NAMESPACE_SNAPSHOTS").lower() == "true"
+        if os.getenv("BIOMNI_NAMESPACE_SNAPSHOT_MAX_VAR_MB"):
+            self.namespace_snapshot_max_var_mb = float(os.getenv("BIOMNI_NAMESPACE_SNAPSHOT_MAX_VAR_MB"))
+        if os.getenv("BIOMNI_PROMPT_CACHING"):
+            self.prompt_caching = os.getenv("BIOMNI_PROMPT_CACHING").lower() == "true"
+        if os.getenv("BIOMNI_CONTEXT_POLICY"):
+            self.context_policy = os.getenv("BIOMNI_CONTEXT_POLICY").lower()
+        if os.getenv("BIOMNI_CONTEXT_MAX_TOKENS"):
+            self.context_max_tokens = int(os.getenv("BIOMNI_CONTEXT_MAX_TOKENS"))
+        if os.getenv("BIOMNI_CONTEXT_SUMMARIZE"):
+            self.context_summarize = os.getenv("BIOMNI_CONTEXT_SUMMARIZE").lower() == "true"
+        if os.getenv("BIOMNI_OUTPUT_SPILL_CHARS"):
+            self.output_spill_chars = int(os.getenv("BIOMNI_OUTPUT_SPILL_CHARS"))
         if os.getenv("BIOMNI_LLM") or os.getenv("BIOMNI_LLM_MODEL"):
             self.llm = os.getenv("BIOMNI_LLM") or os.getenv("BIOMNI_LLM_MODEL")
+        if os.getenv("BIOMNI_LLM_MAX_CONNECTIONS"):
+            self.llm_max_connections = int(os.getenv("BIOMNI_LLM_MAX_CONNECTIONS"))
+        if os.getenv("BIOMNI_LLM_PROVIDER_MAX_CONNECTIONS"):
+            # e.g. "Anthropic=8,OpenAI=64"
+            for item in os.getenv("BIOMNI_LLM_PROVIDER_MAX_CONNECTIONS").split(","):
+                provider, _, limit = item.partition("=")
+                if provider.strip() and limit.strip():
+                    self.llm_provider_max_connections[provider.strip()] = int(limit)
+        if os.getenv("BIOMNI_LLM_RATE_LIMITING"):
+            self.llm_rate_limiting = os.getenv("BIOMNI_LLM_RATE_LIMITING").lower() == "true"
+        if os.getenv("BIOMNI_LLM_REQUESTS_PER_MINUTE"):
+            self.llm_requests_per_minute = float(os.getenv("BIOMNI_LLM_REQUESTS_PER_MINUTE"))
+        if os.getenv("BIOMNI_LLM_TOKENS_PER_MINUTE"):
+            self.llm_tokens_per_minute = float(os.getenv("BIOMNI_LLM_TOKENS_PER_MINUTE"))
+        if os.getenv("BIOMNI_LLM_MAX_CONCURRENCY"):
+            self.llm_max_concurrency = int(os.getenv("BIOMNI_LLM_MAX_CONCURRENCY"))
+        if os.getenv("BIOMNI_LLM_RATE_LIMITS"):
+            # JSON, e.g. '{"Anthropic": {"tokens_per_minute": 400000}}'
+            self.llm_rate_limits = json.loads(os.getenv("BIOMNI_LLM_RATE_LIMITS"))
+        if os.getenv("BIOMNI_LLM_MAX_RETRIES"):
+            self.llm_max_retries = int(os.getenv("BIOMNI_LLM_MAX_RETRIES"))
+        if os.getenv("BIOMNI_LLM_CACHE"):
+            self.llm_cache = os.getenv("BIOMNI_LLM_CACHE").lower() == "true"
+        if os.getenv("BIOMNI_LLM_CACHE_PATH"):
+            self.llm_cache_path = os.getenv("BIOMNI_LLM_CACHE_PATH")
+        if os.getenv("BIOMNI_LLM_CACHE_TTL"):
+            self.llm_cache_ttl = int(os.getenv("BIOMNI_LLM_CACHE_TTL"))
+        if os.getenv("BIOMNI_LLM_CACHE_MAX_ENTRIES"):
+            self.llm_cache_max_entries = int(os.getenv("BIOMNI_LLM_CACHE_MAX_ENTRIES"))
+        if os.getenv("BIOMNI_LLM_CACHE_MAX_MB"):
+            self.llm_cache_max_mb = float(os.getenv("BIOMNI_LLM_CACHE_MAX_MB"))
+        if os.getenv("BIOMNI_MCP_SESSIONS_PER_SERVER"):
+            self.mcp_sessions_per_server = int(os.getenv("BIOMNI_MCP_SESSIONS_PER_SERVER"))
+        if os.getenv("BIOMNI_MCP_CALL_TIMEOUT"):
+            self.mcp_call_timeout = float(os.getenv("BIOMNI_MCP_CALL_TIMEOUT"))
+        if os.getenv("BIOMNI_MCP_HEALTH_CHECK_INTERVAL"):
+            self.mcp_health_check_interval = float(os.getenv("BIOMNI_MCP_HEALTH_CHECK_INTERVAL"))
+        if os.getenv("BIOMNI_MCP_DISCOVERY_TIMEOUT"):
+            self.mcp_discovery_timeout = float(os.getenv("BIOMNI_MCP_DISCOVERY_TIMEOUT"))
+        if os.getenv("BIOMNI_MCP_SERVER_IO_WORKERS"):
+            self.mcp_server_io_workers = int(os.getenv("BIOMNI_MCP_SERVER_IO_WORKERS"))
+        if os.getenv("BIOMNI_MCP_SERVER_CPU_WORKERS"):
+            self.mcp_server_cpu_workers = int(os.getenv("BIOMNI_MCP_SERVER_CPU_WORKERS"))
+        if os.getenv("BIOMNI_MCP_SERVER_TOOL_TIMEOUT"):
+            self.mcp_server_tool_timeout = float(os.getenv("BIOMNI_MCP_SERVER_TOOL_TIMEOUT"))
+        if os.getenv("BIOMNI_MCP_SERVER_MEMORY_LIMIT_MB"):
+            self.mcp_server_memory_limit_mb = int(os.getenv("BIOMNI_MCP_SERVER_MEMORY_LIMIT_MB"))
         if os.getenv("BIOMNI_USE_TOOL_RETRIEVER"):
             self.use_tool_retriever = os.getenv("BIOMNI_USE_TOOL_RETRIEVER").lower() == "true"
+        if os.getenv("BIOMNI_TOOL_RETRIEVER_MODE"):
+            self.tool_retriever_mode = os.getenv("BIOMNI_TOOL_RETRIEVER_MODE").lower()
+        if os.getenv("BIOMNI_RETRIEVAL_CACHE"):
+            self.retrieval_cache = os.getenv("BIOMNI_RETRIEVAL_CACHE").lower() == "true"
+        if os.getenv("BIOMNI_RETRIEVAL_CACHE_TTL"):
+            self.retrieval_cache_ttl = int(os.getenv("BIOMNI_RETRIEVAL_CACHE_TTL"))
+        if os.getenv("BIOMNI_RETRIEVAL_CACHE_SIMILARITY"):
+            self.retrieval_cache_similarity = float(os.getenv("BIOMNI_RETRIEVAL_CACHE_SIMILARITY"))
         if os.getenv("BIOMNI_COMMERCIAL_MODE"):
             self.commercial_mode = os.getenv("BIOMNI_COMMERCIAL_MODE").lower() == "true"
         if os.getenv("BIOMNI_TEMPERATURE"):
@@ -77,9 +265,55 @@ class BiomniConfig:
         return {
             "path": self.path,
             "timeout_seconds": self.timeout_seconds,
+            "lazy_data_lake": self.lazy_data_lake,
+            "data_lake_cache_dir": self.data_lake_cache_dir,
+            "datalake_query_api": self.datalake_query_api,
+            "data_cache_max_mb": self.data_cache_max_mb,
+            "repl_mode": self.repl_mode,
+            "repl_pool_size": self.repl_pool_size,
+            "repl_memory_limit_mb": self.repl_memory_limit_mb,
+            "async_execution_workers": self.async_execution_workers,
+            "speculative_execution": self.speculative_execution,
+            "checkpointer": self.checkpointer,
+            "checkpoint_path": self.checkpoint_path,
+            "checkpoint_keep_last": self.checkpoint_keep_last,
+            "checkpoint_retention": self.checkpoint_retention,
+            "checkpoint_max_runs": self.checkpoint_max_runs,
+            "namespace_snapshots": self.namespace_snapshots,
+            "namespace_snapshot_max_var_mb": self.namespace_snapshot_max_var_mb,
+            "prompt_caching": self.prompt_caching,
+            "context_policy": self.context_policy,
+            "context_max_tokens": self.context_max_tokens,
+            "context_summarize": self.context_summarize,
+            "output_spill_chars": self.output_spill_chars,
             "llm": self.llm,
             "temperature": self.temperature,
+            "llm_max_connections": self.llm_max_connections,
+            "llm_provider_max_connections": self.llm_provider_max_connections,
+            "llm_rate_limiting": self.llm_rate_limiting,
+            "llm_requests_per_minute": self.llm_requests_per_minute,
+            "llm_tokens_per_minute": self.llm_tokens_per_minute,
+            "llm_max_concurrency": self.llm_max_concurrency,
+            "llm_rate_limits": self.llm_rate_limits,
+            "llm_max_retries": self.llm_max_retries,
+            "llm_cache": self.llm_cache,
+            "llm_cache_path": self.llm_cache_path,
+            "llm_cache_ttl": self.llm_cache_ttl,
+            "llm_cache_max_entries": self.llm_cache_max_entries,
+            "llm_cache_max_mb": self.llm_cache_max_mb,
+            "mcp_sessions_per_server": self.mcp_sessions_per_server,
+            "mcp_call_timeout": self.mcp_call_timeout,
+            "mcp_health_check_interval": self.mcp_health_check_interval,
+            "mcp_discovery_timeout": self.mcp_discovery_timeout,
+            "mcp_server_io_workers": self.mcp_server_io_workers,
+            "mcp_server_cpu_workers": self.mcp_server_cpu_workers,
+            "mcp_server_tool_timeout": self.mcp_server_tool_timeout,
+            "mcp_server_memory_limit_mb": self.mcp_server_memory_limit_mb,
             "use_tool_retriever": self.use_tool_retriever,
+            "tool_retriever_mode": self.tool_retriever_mode,
+            "retrieval_cache": self.retrieval_cache,
+            "retrieval_cache_ttl": self.retrieval_cache_ttl,
+            "retrieval_cache_similarity": self.retrieval_cache_similarity,
             "commercial_mode": self.commercial_mode,
             "base_url": self.base_url,
             "api_key": self.api_key,
@@ -0,0 +1,207 @@
+"""
+Process-wide cache of parsed data-lake objects.
+
+Several tools load the same large artifacts on every call (TxGNN prediction
+pickles, the HPO ontology, the DDInter pickles, API schema pickles). The
+``DataCache`` keeps parsed objects in memory, keyed by the file's path, size and
+modification time plus the loader that produced them, and evicts the least
+recently used entries once the estimated memory of the cache exceeds its budget.
+
+Cached objects are shared between callers and must be treated as read-only.
+
+Usage:
+    from biomni.data_cache import cached_pickle
+
+    mapping = cached_pickle(data_lake_path + "/txgnn_name_mapping.pkl")
+"""
+
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+
+def _process_rss_bytes() -> int | None:
+    """Current resident set size of this process, if it can be read cheaply."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def estimate_nbytes(obj) -> int | None:
+    """Estimate the memory held by an object for the common data types, else None."""
+    try:
+        import pandas as pd
+
+        if isinstance(obj, pd.DataFrame | pd.Series):
+            usage = obj.memory_usage(deep=True)
+            return int(usage.sum() if hasattr(usage, "sum") else usage)
+    except ImportError:
+        pass
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return None
+
+
+class DataCache:
+    """LRU cache of parsed files bounded by an estimated memory budget.
+
+    The size of an entry is estimated from pandas/numpy memory usage when
+    available, otherwise from the growth of the process RSS while loading it
+    (and never less than the file size). Objects larger than the whole budget
+    are returned without being cached.
+    """
+
+    def __init__(self, max_bytes: int = 2 * 1024**3):
+        """
+        Args:
+            max_bytes: Memory budget for cached objects; 0 disables caching
+        """
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, tuple[object, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: dict[tuple, threading.Lock] = {}
+        self._bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "uncacheable": 0}
+
+    @staticmethod
+    def _file_key(path: str, loader_key) -> tuple:
+        # Let a lazily materialized data lake fetch the file before it is stat'ed
+        from biomni.data_sync import ensure_data_lake_file
+
+        ensure_data_lake_file(path)
+        st = os.stat(path)
+        return (os.path.realpath(path), st.st_size, st.st_mtime_ns, loader_key)
+
+    def get(self, path: str, loader, loader_key=None):
+        """Return ``loader(path)``, reusing the result while the file is unchanged.
+
+        Args:
+            path: File the object is loaded from
+            loader: Callable taking the path and returning the parsed object
+            loader_key: Hashable identifying the loader and its options (defaults to the loader's name)
+
+        Returns:
+            The (shared, read-only) parsed object
+        """
+        if loader_key is None:
+            loader_key = f"{getattr(loader, '__module__', '')}.{getattr(loader, '__qualname__', repr(loader))}"
+        key = self._file_key(path, loader_key)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Concurrent requests for the same object wait for a single load
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[0]
+                self.stats["misses"] += 1
+
+            rss_before = _process_rss_bytes()
+            obj = loader(path)
+            nbytes = estimate_nbytes(obj)
+            if nbytes is None:
+                rss_after = _process_rss_bytes()
+                rss_growth = rss_after - rss_before if rss_before is not None and rss_after is not None else 0
+                nbytes = max(rss_growth, key[1], sys.getsizeof(obj))
+
+            with self._lock:
+                self._key_locks.pop(key, None)
+                if nbytes > self.max_bytes:
+                    self.stats["uncacheable"] += 1
+                    return obj
+                # Drop entries for older versions of the same file and loader
+                for stale in [k for k in self._entries if k[0] == key[0] and k[3] == key[3]]:
+                    self._bytes -= self._entries.pop(stale)[1]
+                self._entries[key] = (obj, nbytes)
+                self._bytes += nbytes
+                self._evict()
+            return obj
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._bytes -= nbytes
+            self.stats["evictions"] += 1
+
+    def set_max_bytes(self, max_bytes: int):
+        """Change the memory budget, evicting entries if needed."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        """Drop every cached object."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self) -> dict:
+        """Return hit/miss counters and current memory usage."""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+
+_default_cache: DataCache | None = None
+_default_cache_lock = threading.Lock()
+
+
+def get_data_cache() -> DataCache:
+    """Return the process-wide data cache, sized from ``default_config.data_cache_max_mb``."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            from biomni.config import default_config
+
+            _default_cache = DataCache(max_bytes=int(default_config.data_cache_max_mb) * 1024 * 1024)
+        return _default_cache
+
+
+def _load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _kwargs_key(kwargs: dict) -> tuple:
+    return tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in kwargs.items()))
+
+
+def cached_pickle(path: str):
+    """Unpickle a file through the process-wide data cache."""
+    return get_data_cache().get(path, _load_pickle, loader_key="pickle")
+
+
+def cached_read_csv(path: str, **kwargs):
+    """``pd.read_csv`` through the process-wide data cache; keyword arguments are part of the key."""
+    import pandas as pd
+
+    return get_data_cache().get(path, lambda p: pd.read_csv(p, **kwargs), loader_key=("read_csv", _kwargs_key(kwargs)))
+
+
+def cached_read_parquet(path: str, **kwargs):
+    """``pd.read_parquet`` through the process-wide data cache; keyword arguments are part of the key."""
+    import pandas as pd
+
+    return get_data_cache().get(
+        path, lambda p: pd.read_parquet(p, **kwargs), loader_key=("read_parquet", _kwargs_key(kwargs))
+    )
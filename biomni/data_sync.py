@@ -0,0 +1,600 @@
+"""
+Concurrent, resumable data-lake synchronizer.
+
+Downloads data-lake objects from the Biomni S3 bucket in parallel over a bounded
+connection pool. Each file is written to ``<name>.part`` (resuming with an HTTP
+Range request if a partial file exists), checked against the remote size and
+checksum, and atomically renamed into place. A local manifest records what has been
+verified so later runs only need a ``stat`` per file.
+
+``LazyDataLake`` builds on the synchronizer for nodes that should not hold the whole
+data lake: files are fetched (or linked from a shared cache directory) the first
+time code opens them.
+
+Command line:
+    python -m biomni.data_sync --path ./data            # download missing files
+    python -m biomni.data_sync --path ./data --verify   # re-check every local file
+"""
+
+import argparse
+import fcntl
+import functools
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin
+
+import requests
+import tqdm
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_BUCKET_URL = "https://biomni-release.s3.amazonaws.com"
+LOCAL_MANIFEST_NAME = ".sync_manifest.json"
+REMOTE_MANIFEST_NAME = "manifest.json"
+
+# Part size used by the AWS CLI for multipart uploads; lets us check multipart ETags
+_S3_MULTIPART_CHUNK = 8 * 1024 * 1024
+
+
+def load_local_manifest(local_path: str) -> dict[str, dict]:
+    """Read the manifest of verified files in a local data-lake directory."""
+    try:
+        with open(os.path.join(local_path, LOCAL_MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _md5_matches_etag(path: str, etag: str, part_size: int | None = None) -> bool | None:
+    """Compare a file with an S3 ETag.
+
+    A single-part ETag is the file's MD5, so the result is True or False. A multipart
+    ETag depends on the part size used for the upload: it is only conclusive when
+    ``part_size`` is known (from the remote manifest) or implied by a single part.
+    Otherwise the default AWS CLI part size is tried, returning True on a match and
+    None (cannot be checked) on a mismatch.
+    """
+    etag = etag.strip('"')
+    if "-" not in etag:
+        h = hashlib.md5()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(_S3_MULTIPART_CHUNK), b""):
+                h.update(block)
+        return h.hexdigest() == etag
+
+    expected_parts = etag.split("-", 1)[1]
+    known = part_size is not None or expected_parts == "1"
+    if part_size is None:
+        part_size = max(os.path.getsize(path), 1) if expected_parts == "1" else _S3_MULTIPART_CHUNK
+    part_digests = []
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(part_size), b""):
+            part_digests.append(hashlib.md5(block).digest())
+    if f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{expected_parts}" == etag:
+        return True
+    return False if known else None
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class DataLakeSynchronizer:
+    """Synchronize a local directory with a folder of the Biomni S3 bucket.
+
+    Usage:
+        sync = DataLakeSynchronizer(local_path="./data/biomni_data/data_lake")
+        results = sync.sync(["kg.csv", "BindingDB_All_202409.tsv"])
+        problems = sync.verify(["kg.csv"])
+    """
+
+    def __init__(
+        self,
+        local_path: str,
+        s3_bucket_url: str = DEFAULT_BUCKET_URL,
+        folder: str = "data_lake",
+        max_workers: int = 8,
+        chunk_size: int = 1024 * 1024,
+        show_progress: bool = True,
+    ):
+        """
+        Args:
+            local_path: Local directory the files are synchronized into
+            s3_bucket_url: Base URL of the S3 bucket
+            folder: Folder inside the bucket
+            max_workers: Number of concurrent downloads (and pooled connections)
+            chunk_size: Bytes read per iteration while streaming a download
+            show_progress: Whether to show an aggregate progress bar
+        """
+        self.local_path = local_path
+        self.base_url = s3_bucket_url.rstrip("/") + "/" + folder + "/"
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = chunk_size
+        self.show_progress = show_progress
+
+        self._local = threading.local()
+        self._manifest_lock = threading.Lock()
+        self._remote_manifest: dict[str, dict] | None = None
+        os.makedirs(local_path, exist_ok=True)
+        self.local_manifest = load_local_manifest(local_path)
+
+    # --- HTTP -----------------------------------------------------------------
+
+    def _session(self) -> requests.Session:
+        """Return this thread's session; connections are kept alive between files."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            retry = Retry(total=5, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._local.session = session
+        return session
+
+    def _url(self, name: str) -> str:
+        return urljoin(self.base_url, name)
+
+    def _fetch_remote_manifest(self) -> dict[str, dict]:
+        """Load ``manifest.json`` from the bucket folder if it is published."""
+        if self._remote_manifest is None:
+            self._remote_manifest = {}
+            try:
+                response = self._session().get(self._url(REMOTE_MANIFEST_NAME), timeout=30)
+                if response.status_code == 200:
+                    self._remote_manifest = response.json()
+            except (requests.RequestException, ValueError):
+                pass
+        return self._remote_manifest
+
+    def remote_info(self, name: str) -> dict | None:
+        """Return {"size", "etag", "sha256", "part_size"} for a remote object, or None if it does not exist.
+
+        ``sha256`` and the multipart upload ``part_size`` are only known from the remote manifest.
+        """
+        info = dict(self._fetch_remote_manifest().get(name, {}))
+        if "size" in info:
+            return info
+        try:
+            response = self._session().head(self._url(name), timeout=30, allow_redirects=True)
+        except requests.RequestException:
+            return None
+        if response.status_code != 200:
+            return None
+        info["size"] = int(response.headers.get("content-length", 0)) or None
+        info["etag"] = response.headers.get("etag")
+        return info
+
+    # --- Local manifest -------------------------------------------------------
+
+    def _record(self, name: str, info: dict):
+        path = os.path.join(self.local_path, name)
+        st = os.stat(path)
+        with self._manifest_lock:
+            # Other processes may share this directory; merge with what is on disk
+            manifest = load_local_manifest(self.local_path)
+            manifest.update(self.local_manifest)
+            manifest[name] = {
+                "size": st.st_size,
+                "mtime": st.st_mtime,
+                "etag": info.get("etag"),
+                "sha256": info.get("sha256"),
+            }
+            self.local_manifest = manifest
+            self._save_local_manifest()
+
+    def _save_local_manifest(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.local_path, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.local_manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, os.path.join(self.local_path, LOCAL_MANIFEST_NAME))
+
+    def is_current(self, name: str) -> bool:
+        """True if the file exists and matches what was recorded when it was verified."""
+        path = os.path.join(self.local_path, name)
+        record = self.local_manifest.get(name)
+        if record is None or not os.path.exists(path):
+            return False
+        st = os.stat(path)
+        return st.st_size == record["size"] and st.st_mtime == record["mtime"]
+
+    # --- Checks and downloads -------------------------------------------------
+
+    def _check(self, path: str, info: dict) -> tuple[bool, str]:
+        """Check a local file against remote metadata."""
+        size = os.path.getsize(path)
+        if info.get("size") and size != info["size"]:
+            return False, f"size mismatch ({size} != {info['size']} bytes)"
+        if info.get("sha256"):
+            if _sha256(path) != info["sha256"]:
+                return False, "sha256 mismatch"
+        elif info.get("etag"):
+            if _md5_matches_etag(path, info["etag"], info.get("part_size")) is False:
+                return False, "checksum mismatch"
+        return True, "ok"
+
+    def _download(self, name: str, info: dict, progress) -> bool:
+        final_path = os.path.join(self.local_path, name)
+        part_path = final_path + ".part"
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        total = info.get("size")
+        if total and offset > total:
+            os.remove(part_path)
+            offset = 0
+
+        headers = {}
+        if offset and (not total or offset < total):
+            headers["Range"] = f"bytes={offset}-"
+        try:
+            if not total or offset < total:
+                with self._session().get(self._url(name), stream=True, headers=headers, timeout=60) as response:
+                    if response.status_code == 416:
+                        # Range not satisfiable: the partial file is already complete
+                        pass
+                    else:
+                        response.raise_for_status()
+                        mode = "ab" if response.status_code == 206 else "wb"
+                        if mode == "wb" and offset and progress is not None:
+                            progress.update(-offset)
+                        with open(part_path, mode) as f:
+                            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                                if chunk:
+                                    f.write(chunk)
+                                    if progress is not None:
+                                        progress.update(len(chunk))
+        except requests.RequestException as e:
+            # Keep the partial file so the next run resumes from it
+            print(f"✗ Failed to download {name}: {e}")
+            return False
+
+        ok, reason = self._check(part_path, info)
+        if not ok:
+            print(f"✗ Discarding corrupt download of {name}: {reason}")
+            os.remove(part_path)
+            return False
+
+        os.replace(part_path, final_path)
+        self._record(name, info)
+        return True
+
+    def sync(self, files: list[str], verify: bool = False) -> dict[str, bool]:
+        """Make sure every file in ``files`` is present and complete.
+
+        Args:
+            files: Object names inside the bucket folder
+            verify: Re-check files already recorded in the local manifest
+
+        Returns:
+            Dictionary mapping file names to success status
+        """
+        results = {}
+        pending = []
+        for name in files:
+            if not verify and self.is_current(name):
+                results[name] = True
+            else:
+                pending.append(name)
+        if not pending:
+            return results
+
+        # Resolve remote metadata concurrently (HEAD requests unless a manifest is published)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            infos = dict(zip(pending, pool.map(self.remote_info, pending), strict=True))
+
+        to_download = []
+        for name in pending:
+            info = infos[name]
+            path = os.path.join(self.local_path, name)
+            if info is None:
+                print(f"✗ {name} not found in bucket")
+                results[name] = os.path.exists(path)
+                continue
+            if os.path.exists(path):
+                ok, reason = self._check(path, info)
+                if ok:
+                    self._record(name, info)
+                    results[name] = True
+                    continue
+                print(f"Repairing {name}: {reason}")
+                os.remove(path)
+            to_download.append(name)
+
+        if not to_download:
+            return results
+
+        total_bytes = sum(infos[name].get("size") or 0 for name in to_download)
+        already = sum(
+            os.path.getsize(os.path.join(self.local_path, n + ".part"))
+            for n in to_download
+            if os.path.exists(os.path.join(self.local_path, n + ".part"))
+        )
+        print(f"Downloading {len(to_download)} file(s) with {self.max_workers} parallel connections...")
+        progress = (
+            tqdm.tqdm(total=total_bytes, initial=already, unit="B", unit_scale=True, desc="data lake", ncols=80)
+            if self.show_progress
+            else None
+        )
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {pool.submit(self._download, name, infos[name], progress): name for name in to_download}
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        print(f"✗ Failed to download {name}: {e}")
+                        results[name] = False
+                    if results[name]:
+                        print(f"✓ Successfully downloaded: {name}")
+        finally:
+            if progress is not None:
+                progress.close()
+        return results
+
+    def verify(self, files: list[str]) -> dict[str, str]:
+        """Check local files against remote sizes and checksums without downloading.
+
+        Returns:
+            Dictionary mapping file names to "ok", "missing", or a description of the problem
+        """
+        report = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            infos = dict(zip(files, pool.map(self.remote_info, files), strict=True))
+        for name in files:
+            path = os.path.join(self.local_path, name)
+            if not os.path.exists(path):
+                report[name] = "missing"
+            elif infos[name] is None:
+                report[name] = "not found in bucket"
+            else:
+                ok, reason = self._check(path, infos[name])
+                report[name] = reason
+                if ok:
+                    self._record(name, infos[name])
+        return report
+
+
+class LazyDataLake:
+    """Virtual data-lake catalog whose files are materialized on first use.
+
+    Files are downloaded the first time Python code opens them (detected with an
+    audit hook on ``open`` plus wrappers for readers that open files natively, such
+    as ``pandas.read_parquet``), or ahead of time through ``prefetch``. When a shared
+    cache directory is configured, files are downloaded there once and symlinked into
+    the data lake so every agent on the node reads (and memory-maps) the same copy.
+
+    Checking a file without opening it (``os.path.exists``, ``os.stat``) does not
+    download it and reports a not-yet-downloaded file as missing; call
+    ``ensure_data_lake_file`` on the path first.
+
+    Usage:
+        lake = LazyDataLake("./data/biomni_data/data_lake", catalog=list(data_lake_dict))
+        lake.install()
+        lake.prefetch(["DisGeNET.parquet"])
+    """
+
+    def __init__(
+        self,
+        data_lake_path: str,
+        catalog: list[str],
+        cache_dir: str | None = None,
+        s3_bucket_url: str = DEFAULT_BUCKET_URL,
+        max_workers: int = 4,
+    ):
+        """
+        Args:
+            data_lake_path: Directory agents read the data lake from
+            catalog: File names that may be materialized
+            cache_dir: Optional shared directory holding downloaded files
+            s3_bucket_url: Base URL of the S3 bucket
+            max_workers: Number of concurrent prefetch downloads
+        """
+        self.data_lake_path = os.path.abspath(data_lake_path)
+        self.catalog = set(catalog)
+        self.cache_dir = os.path.abspath(cache_dir) if cache_dir else None
+        self.max_workers = max_workers
+        self._synchronizer = DataLakeSynchronizer(
+            self.cache_dir or self.data_lake_path,
+            s3_bucket_url=s3_bucket_url,
+            max_workers=1,
+            show_progress=False,
+        )
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._prefetcher: ThreadPoolExecutor | None = None
+        self.stats = {"materialized": 0, "failed": 0}
+        os.makedirs(self.data_lake_path, exist_ok=True)
+
+    def _lock_for(self, name: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def is_materialized(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.data_lake_path, name))
+
+    def ensure(self, name: str) -> bool:
+        """Materialize one catalog file, blocking until it is available.
+
+        Safe to call concurrently from threads and from REPL worker processes.
+        """
+        if name not in self.catalog or self.is_materialized(name):
+            return self.is_materialized(name)
+
+        with self._lock_for(name):
+            if self.is_materialized(name):
+                return True
+            # Serialize across processes sharing the same data lake or cache directory
+            lock_dir = self.cache_dir or self.data_lake_path
+            with open(os.path.join(lock_dir, f".{name}.lock"), "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    ok = self._synchronizer.sync([name]).get(name, False)
+                    if ok and self.cache_dir and not self.is_materialized(name):
+                        target = os.path.join(self.data_lake_path, name)
+                        try:
+                            os.symlink(os.path.join(self.cache_dir, name), target)
+                        except OSError:
+                            shutil.copyfile(os.path.join(self.cache_dir, name), target)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        ok = self.is_materialized(name)
+        self.stats["materialized" if ok else "failed"] += 1
+        return ok
+
+    def prefetch(self, names: list[str]):
+        """Start materializing files in the background (e.g. the retriever's data-lake picks)."""
+        names = [n for n in names if n in self.catalog and not self.is_materialized(n)]
+        if not names:
+            return
+        if self._prefetcher is None:
+            self._prefetcher = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="datalake-prefetch")
+        for name in names:
+            self._prefetcher.submit(self.ensure, name)
+
+    def _name_for_path(self, path) -> str | None:
+        """Return the catalog name a path refers to, if it lies inside this data lake."""
+        if isinstance(path, int):
+            return None
+        try:
+            path = os.fsdecode(os.fspath(path))
+        except TypeError:
+            return None
+        if not path.startswith(self.data_lake_path):
+            path = os.path.abspath(path)
+            if not path.startswith(self.data_lake_path):
+                return None
+        name = path[len(self.data_lake_path) :].lstrip(os.sep)
+        return name if name in self.catalog else None
+
+    def install(self):
+        """Fetch catalog files transparently when code in this process opens them."""
+        _install_open_hook()
+        _patch_native_readers()
+        with _lazy_lakes_lock:
+            if self not in _lazy_lakes:
+                _lazy_lakes.append(self)
+
+
+_lazy_lakes: list[LazyDataLake] = []
+_lazy_lakes_lock = threading.Lock()
+_hook_state = threading.local()
+_hook_installed = False
+
+
+def _materialize_path(path):
+    """Materialize ``path`` if it names a not-yet-downloaded file of a registered lazy data lake."""
+    if getattr(_hook_state, "active", False):
+        return
+    for lake in _lazy_lakes:
+        name = lake._name_for_path(path)
+        if name is not None and not lake.is_materialized(name):
+            _hook_state.active = True
+            try:
+                lake.ensure(name)
+            finally:
+                _hook_state.active = False
+            return
+
+
+def ensure_data_lake_file(path: str) -> str:
+    """Download a lazy data-lake file that has not been fetched yet, and return ``path``.
+
+    Call before checking a data-lake path with ``os.path.exists`` or ``os.stat``, which
+    do not trigger the download on open. Does nothing for other paths.
+    """
+    _materialize_path(path)
+    return path
+
+
+def _open_audit_hook(event, args):
+    if event == "open" and _lazy_lakes and args and args[0] is not None:
+        _materialize_path(args[0])
+
+
+def _install_open_hook():
+    global _hook_installed
+    if not _hook_installed:
+        # Audit hooks cannot be removed; the hook is a no-op while no lazy data lake is registered
+        sys.addaudithook(_open_audit_hook)
+        _hook_installed = True
+
+
+def _patch_native_readers():
+    """Wrap readers that open files in native code, bypassing the ``open`` audit event."""
+    try:
+        import pandas as pd
+    except ImportError:
+        return
+    for attr in ("read_parquet", "read_feather", "read_orc"):
+        reader = getattr(pd, attr, None)
+        if reader is None or getattr(reader, "_biomni_lazy", False):
+            continue
+
+        def make_wrapper(original):
+            @functools.wraps(original)
+            def wrapper(path, *args, **kwargs):
+                _materialize_path(path)
+                return original(path, *args, **kwargs)
+
+            wrapper._biomni_lazy = True
+            return wrapper
+
+        setattr(pd, attr, make_wrapper(reader))
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Synchronize the Biomni data lake")
+    parser.add_argument("--path", default=None, help="Biomni data path (default: BiomniConfig.path)")
+    parser.add_argument("--workers", type=int, default=8, help="Number of parallel downloads")
+    parser.add_argument("--commercial", action="store_true", help="Only sync commercially licensed datasets")
+    parser.add_argument("--verify", action="store_true", help="Verify local files and repair corrupt ones")
+    parser.add_argument("--check-only", action="store_true", help="With --verify, report without downloading")
+    parser.add_argument("files", nargs="*", help="Specific files to sync (default: the whole data lake)")
+    args = parser.parse_args(argv)
+
+    from biomni.config import default_config
+
+    path = args.path or default_config.path
+    if args.files:
+        files = args.files
+    elif args.commercial:
+        from biomni.env_desc_cm import data_lake_dict
+
+        files = list(data_lake_dict)
+    else:
+        from biomni.env_desc import data_lake_dict
+
+        files = list(data_lake_dict)
+
+    sync = DataLakeSynchronizer(os.path.join(path, "biomni_data", "data_lake"), max_workers=args.workers)
+    if args.verify and args.check_only:
+        report = sync.verify(files)
+        bad = {k: v for k, v in report.items() if v != "ok"}
+        for name, reason in sorted(bad.items()):
+            print(f"{name}: {reason}")
+        print(f"{len(report) - len(bad)}/{len(report)} files verified")
+        return 1 if bad else 0
+
+    results = sync.sync(files, verify=args.verify)
+    failed = sorted(name for name, ok in results.items() if not ok)
+    for name in failed:
+        print(f"✗ {name}")
+    print(f"{len(results) - len(failed)}/{len(results)} files in sync")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
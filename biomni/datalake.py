@@ -0,0 +1,388 @@
+"""
+Columnar query access to the Biomni data lake.
+
+Agent code usually loads a whole data-lake file with ``pd.read_csv`` or
+``pd.read_parquet`` only to keep a few genes or columns. ``DataLake`` exposes
+every tabular file as a lazily scanned ``pyarrow.dataset`` so a query only reads
+the columns it projects and skips Parquet row groups whose statistics rule out
+the filter. Large CSV/TSV files are converted once to partitioned Parquet in a
+cache directory next to the data lake, so the conversion cost is paid a single
+time per file version.
+
+Usage:
+    from biomni.datalake import DataLake
+
+    datalake = DataLake("./data/biomni_data/data_lake")
+    df = datalake.query("kg.csv", columns=["x_name", "relation", "y_name"], filter={"x_name": ["TP53", "BRCA1"]})
+"""
+
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+# Delimited files larger than this are converted to Parquet on first use; smaller
+# ones are scanned in place since parsing them is already cheap.
+DEFAULT_CONVERT_MIN_BYTES = 16 * 1024 * 1024
+
+# Size of the Parquet files and row groups written by the conversion. Row groups
+# are the unit min/max statistics are kept for, so smaller groups skip more data.
+_MAX_ROWS_PER_FILE = 2_000_000
+_MAX_ROWS_PER_GROUP = 100_000
+
+_PARQUET_EXTENSIONS = (".parquet", ".pq")
+_FEATHER_EXTENSIONS = (".feather", ".arrow", ".ipc")
+_DELIMITED_EXTENSIONS = (".csv", ".tsv", ".txt", ".csv.gz", ".tsv.gz", ".txt.gz")
+
+_FILTER_OPS = {"==", "=", "!=", "<", "<=", ">", ">=", "in", "not in"}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset  # noqa: F401
+    except ImportError:
+        raise ImportError(  # noqa: B904
+            "pyarrow package is required for the data lake query API. Install with: pip install pyarrow"
+        )
+
+
+def is_tabular(name: str) -> bool:
+    """Return True if a data-lake file can be queried as a table."""
+    return name.lower().endswith(_PARQUET_EXTENSIONS + _FEATHER_EXTENSIONS + _DELIMITED_EXTENSIONS)
+
+
+def _sniff_delimiter(path: str) -> str:
+    if path.lower().endswith((".csv", ".csv.gz")):
+        return ","
+    if path.lower().endswith((".tsv", ".tsv.gz")):
+        return "\t"
+    # .txt files in the data lake may use either separator; decide from the header line
+    opener = open
+    if path.endswith(".gz"):
+        import gzip
+
+        opener = gzip.open
+    with opener(path, "rt", errors="replace") as f:
+        header = f.readline()
+    return "\t" if header.count("\t") >= header.count(",") else ","
+
+
+def _read_header(path: str, delimiter: str) -> list[str]:
+    import csv
+    import gzip
+
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", errors="replace", newline="") as f:
+        header = next(csv.reader(f, delimiter=delimiter), [])
+    # Match pandas: unnamed columns (typically a written-out index) become "Unnamed: i"
+    return [name if name else f"Unnamed: {i}" for i, name in enumerate(header)]
+
+
+def to_expression(filter):
+    """Convert a filter specification to a ``pyarrow.compute.Expression``.
+
+    Accepted forms:
+        - a pyarrow Expression, returned unchanged
+        - a dict mapping columns to a value (equality), a list/set (membership) or
+          an ``(op, value)`` tuple, e.g. ``{"gene": ["TP53"], "score": (">", 0.5)}``
+        - a list of ``(column, op, value)`` tuples, combined with AND
+        - a list of such lists, combined with OR (the Parquet DNF convention)
+    """
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    if filter is None or isinstance(filter, pc.Expression):
+        return filter
+
+    def predicate(column, op, value):
+        if op not in _FILTER_OPS:
+            raise ValueError(f"Unsupported filter operator '{op}'. Use one of: {sorted(_FILTER_OPS)}")
+        field = ds.field(column)
+        if op in ("in", "not in"):
+            expr = field.isin(list(value))
+            return ~expr if op == "not in" else expr
+        return {
+            "==": field == value,
+            "=": field == value,
+            "!=": field != value,
+            "<": field < value,
+            "<=": field <= value,
+            ">": field > value,
+            ">=": field >= value,
+        }[op]
+
+    def conjunction(terms):
+        expr = None
+        for term in terms:
+            expr = term if expr is None else expr & term
+        return expr
+
+    if isinstance(filter, dict):
+        terms = []
+        for column, value in filter.items():
+            if isinstance(value, tuple) and len(value) == 2 and value[0] in _FILTER_OPS:
+                terms.append(predicate(column, *value))
+            elif isinstance(value, list | set | frozenset):
+                terms.append(predicate(column, "in", value))
+            else:
+                terms.append(predicate(column, "==", value))
+        return conjunction(terms)
+
+    if isinstance(filter, list) and filter:
+        if all(isinstance(t, list) for t in filter):
+            expr = None
+            for group in filter:
+                group_expr = conjunction(predicate(*t) for t in group)
+                expr = group_expr if expr is None else expr | group_expr
+            return expr
+        return conjunction(predicate(*t) for t in filter)
+
+    raise ValueError(f"Unsupported filter specification: {filter!r}")
+
+
+class DataLakeTable:
+    """One data-lake file exposed as a lazily scanned table."""
+
+    def __init__(self, name: str, dataset, source_path: str):
+        self.name = name
+        self.dataset = dataset
+        self.source_path = source_path
+
+    @property
+    def schema(self):
+        return self.dataset.schema
+
+    @property
+    def columns(self) -> list[str]:
+        return [c for c in self.dataset.schema.names if not c.startswith("__index_level_")]
+
+    def to_arrow(self, columns: list[str] | None = None, filter=None, limit: int | None = None):
+        """Scan the table into a ``pyarrow.Table``, reading only what the query needs."""
+        expr = to_expression(filter)
+        if limit is not None:
+            return self.dataset.head(limit, columns=columns, filter=expr)
+        return self.dataset.to_table(columns=columns, filter=expr)
+
+    def query(self, columns: list[str] | None = None, filter=None, limit: int | None = None):
+        """Scan the table into a pandas DataFrame. See ``DataLake.query``."""
+        return self.to_arrow(columns=columns, filter=filter, limit=limit).to_pandas()
+
+    def batches(self, columns: list[str] | None = None, filter=None, batch_size: int = 100_000):
+        """Iterate over the matching rows as pandas DataFrames of at most ``batch_size`` rows."""
+        for batch in self.dataset.to_batches(columns=columns, filter=to_expression(filter), batch_size=batch_size):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+    def count(self, filter=None) -> int:
+        """Count matching rows without materializing them."""
+        return self.dataset.count_rows(filter=to_expression(filter))
+
+    def head(self, n: int = 5, columns: list[str] | None = None):
+        return self.query(columns=columns, limit=n)
+
+    def unique(self, column: str, filter=None) -> list:
+        """Return the distinct values of one column."""
+        import pyarrow.compute as pc
+
+        return pc.unique(self.to_arrow(columns=[column], filter=filter).column(column)).to_pylist()
+
+    def __repr__(self):
+        return f"DataLakeTable({self.name!r}, columns={len(self.columns)})"
+
+
+class DataLake:
+    """Query interface over the files of a data-lake directory.
+
+    Tables are opened on first use and cached per process. Delimited files above
+    ``convert_min_bytes`` are converted to Parquet under ``cache_dir`` the first
+    time they are queried; the converted copy is reused until the source file's
+    size or modification time changes.
+    """
+
+    def __init__(
+        self,
+        data_lake_path: str,
+        cache_dir: str | None = None,
+        convert_min_bytes: int = DEFAULT_CONVERT_MIN_BYTES,
+    ):
+        """
+        Args:
+            data_lake_path: Path to the ``biomni_data/data_lake`` directory
+            cache_dir: Where converted Parquet copies are stored (defaults to ``biomni_data/.cache/datalake``)
+            convert_min_bytes: Delimited files at least this large are converted to Parquet
+        """
+        self.data_lake_path = os.path.abspath(data_lake_path)
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(self.data_lake_path), ".cache", "datalake")
+        self.cache_dir = cache_dir
+        self.convert_min_bytes = convert_min_bytes
+        self._tables: dict[str, tuple[tuple, DataLakeTable]] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Opened datasets are rebuilt on demand; only the configuration travels to REPL workers
+        state = self.__dict__.copy()
+        state["_tables"] = {}
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def list_tables(self) -> list[str]:
+        """Names of the data-lake files that can be queried."""
+        if not os.path.isdir(self.data_lake_path):
+            return []
+        return sorted(n for n in os.listdir(self.data_lake_path) if is_tabular(n) and not n.startswith("."))
+
+    def _source_path(self, name: str) -> str:
+        path = os.path.join(self.data_lake_path, name)
+        # Let a lazily materialized data lake fetch the file; pyarrow opens files natively
+        from biomni.data_sync import ensure_data_lake_file
+
+        ensure_data_lake_file(path)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Data lake file not found: {name}")
+        if not is_tabular(name):
+            raise ValueError(f"Data lake file '{name}' is not a tabular file (parquet, feather, csv, tsv or txt)")
+        return path
+
+    def table(self, name: str) -> DataLakeTable:
+        """Open a data-lake file as a table, converting it to Parquet first if needed."""
+        _require_pyarrow()
+        path = self._source_path(name)
+        st = os.stat(path)
+        version = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._tables.get(name)
+            if cached and cached[0] == version:
+                return cached[1]
+
+        table = DataLakeTable(name, self._open_dataset(name, path, st.st_size, st.st_mtime_ns), path)
+        with self._lock:
+            self._tables[name] = (version, table)
+        return table
+
+    def _open_dataset(self, name: str, path: str, size: int, mtime_ns: int):
+        import pyarrow.dataset as ds
+
+        lower = name.lower()
+        if lower.endswith(_PARQUET_EXTENSIONS):
+            return ds.dataset(path, format="parquet")
+        if lower.endswith(_FEATHER_EXTENSIONS):
+            return ds.dataset(path, format="feather")
+
+        delimiter = _sniff_delimiter(path)
+        if size < self.convert_min_bytes:
+            return ds.dataset(path, format=self._csv_format(path, delimiter))
+        return ds.dataset(self._converted_path(name, path, delimiter, size, mtime_ns), format="parquet")
+
+    @staticmethod
+    def _csv_format(path: str, delimiter: str, all_strings: bool = False):
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+        import pyarrow.dataset as ds
+
+        names = _read_header(path, delimiter)
+        read_options = pacsv.ReadOptions(column_names=names, skip_rows=1, block_size=16 * 1024 * 1024)
+        parse_options = pacsv.ParseOptions(delimiter=delimiter, newlines_in_values=True)
+        convert_options = pacsv.ConvertOptions(
+            column_types=dict.fromkeys(names, pa.string()) if all_strings else None,
+            strings_can_be_null=True,
+        )
+        return ds.CsvFileFormat(read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+
+    def _converted_path(self, name: str, path: str, delimiter: str, size: int, mtime_ns: int) -> str:
+        """Return the directory holding the Parquet copy of a delimited file, converting it if stale."""
+        target = os.path.join(self.cache_dir, name + ".parquet")
+        marker = os.path.join(target, "_source.json")
+        source = {"size": size, "mtime_ns": mtime_ns}
+
+        def is_current():
+            try:
+                with open(marker) as f:
+                    return json.load(f) == source
+            except (OSError, ValueError):
+                return False
+
+        if is_current():
+            return target
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Serialize conversions of the same file across threads and processes
+        with open(os.path.join(self.cache_dir, f".{name}.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if is_current():
+                    return target
+                print(f"Converting {name} to Parquet for fast queries (one-time)...")
+                tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=f".{name}.", suffix=".tmp")
+                try:
+                    self._convert(path, delimiter, tmp_dir)
+                    with open(os.path.join(tmp_dir, "_source.json"), "w") as f:
+                        json.dump(source, f)
+                    if os.path.exists(target):
+                        shutil.rmtree(target)
+                    os.replace(tmp_dir, target)
+                finally:
+                    if os.path.exists(tmp_dir):
+                        shutil.rmtree(tmp_dir, ignore_errors=True)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return target
+
+    def _convert(self, path: str, delimiter: str, out_dir: str):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        def write(all_strings):
+            source = ds.dataset(path, format=self._csv_format(path, delimiter, all_strings=all_strings))
+            ds.write_dataset(
+                source.scanner(),
+                out_dir,
+                format="parquet",
+                basename_template="part-{i}.parquet",
+                max_rows_per_file=_MAX_ROWS_PER_FILE,
+                max_rows_per_group=_MAX_ROWS_PER_GROUP,
+                min_rows_per_group=_MAX_ROWS_PER_GROUP // 2,
+                existing_data_behavior="overwrite_or_ignore",
+            )
+
+        try:
+            write(all_strings=False)
+        except pa.ArrowInvalid:
+            # Types are inferred from the first block; a later block that does not fit
+            # (e.g. an ID column that turns alphanumeric) falls back to string columns
+            for entry in os.listdir(out_dir):
+                os.remove(os.path.join(out_dir, entry))
+            write(all_strings=True)
+
+    def schema(self, name: str) -> dict[str, str]:
+        """Return ``{column: type}`` for a table without reading its rows."""
+        table = self.table(name)
+        return {f.name: str(f.type) for f in table.schema if f.name in table.columns}
+
+    def query(self, name: str, columns: list[str] | None = None, filter=None, limit: int | None = None):
+        """Read selected columns and rows of a data-lake file into a pandas DataFrame.
+
+        Args:
+            name: File name in the data lake, e.g. "kg.csv"
+            columns: Columns to read; all columns if None
+            filter: Row filter; see ``to_expression`` for the accepted forms
+            limit: Stop after this many matching rows
+
+        Returns:
+            A pandas DataFrame with the matching rows
+        """
+        return self.table(name).query(columns=columns, filter=filter, limit=limit)
+
+    def count(self, name: str, filter=None) -> int:
+        """Count the rows of a data-lake file matching ``filter``."""
+        return self.table(name).count(filter=filter)
+
+    def __repr__(self):
+        return f"DataLake({self.data_lake_path!r})"
@@ -0,0 +1,210 @@
+"""
+Shared environment snapshot for A1 agents.
+
+Every agent needs the same expensive-to-build view of its environment: the tool
+schemas from ``biomni.tool.tool_description``, the data-lake listing with
+descriptions, the software library list, and the rendered system prompt built from
+them. An ``EnvironmentSnapshot`` captures all of it once per process, persists it
+next to the data lake and is only rebuilt when the underlying files change.
+"""
+
+import glob
+import hashlib
+import importlib
+import os
+import pickle
+import tempfile
+import threading
+
+from biomni.version import __version__
+
+_TOOL_DESCRIPTION_DIR = os.path.join(os.path.dirname(__file__), "tool", "tool_description")
+_PROMPT_TEMPLATE_FILE = os.path.join(os.path.dirname(__file__), "agent", "a1.py")
+_SNAPSHOT_FORMAT = 1
+
+
+def _env_desc_module(commercial_mode: bool) -> str:
+    return "biomni.env_desc_cm" if commercial_mode else "biomni.env_desc"
+
+
+def _code_fingerprint(commercial_mode: bool) -> str:
+    """Hash the files the tool schemas, resource descriptions and the system prompt template are read from."""
+    files = sorted(glob.glob(os.path.join(_TOOL_DESCRIPTION_DIR, "*.py")))
+    env_desc_name = "env_desc_cm.py" if commercial_mode else "env_desc.py"
+    files.append(os.path.join(os.path.dirname(__file__), env_desc_name))
+    # Rendered prompts are persisted with the snapshot, so a change to the template invalidates it
+    files.append(_PROMPT_TEMPLATE_FILE)
+
+    h = hashlib.sha256(f"{__version__}:{_SNAPSHOT_FORMAT}:{commercial_mode}".encode())
+    for path in files:
+        st = os.stat(path)
+        h.update(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()[:16]
+
+
+def _scan_data_lake(data_lake_path: str) -> tuple[str, dict[str, dict]]:
+    """List the data lake with sizes and mtimes, returning (fingerprint, manifest)."""
+    manifest = {}
+    if os.path.isdir(data_lake_path):
+        with os.scandir(data_lake_path) as it:
+            for entry in it:
+                # Skip hidden bookkeeping files and in-progress downloads
+                if entry.name.startswith(".") or entry.name.endswith((".part", ".tmp")):
+                    continue
+                st = entry.stat()
+                manifest[entry.name] = {"size": st.st_size, "mtime": st.st_mtime}
+
+    h = hashlib.sha256(os.path.abspath(data_lake_path).encode())
+    for name in sorted(manifest):
+        h.update(f"{name}:{manifest[name]['size']}:{manifest[name]['mtime']}".encode())
+    return h.hexdigest()[:16], manifest
+
+
+class EnvironmentSnapshot:
+    """Immutable view of the agent environment, shared by all agents in a process.
+
+    Agents must copy anything they intend to mutate (``module2api``, the resource
+    dictionaries). The only mutable part is the cache of rendered prompts, which is
+    keyed by the options the prompt was rendered with.
+    """
+
+    def __init__(
+        self,
+        data_lake_path: str,
+        commercial_mode: bool,
+        code_fingerprint: str,
+        data_fingerprint: str,
+        module2api: dict,
+        data_lake_manifest: dict[str, dict],
+        data_lake_dict: dict[str, str],
+        library_content_dict: dict[str, str],
+        prompts: dict | None = None,
+    ):
+        self.data_lake_path = data_lake_path
+        self.commercial_mode = commercial_mode
+        self.code_fingerprint = code_fingerprint
+        self.data_fingerprint = data_fingerprint
+        self.module2api = module2api
+        self.data_lake_manifest = data_lake_manifest
+        self.data_lake_dict = data_lake_dict
+        self.library_content_dict = library_content_dict
+        self.prompts = prompts if prompts is not None else {}
+        self._cache_file: str | None = None
+
+    @property
+    def version(self) -> str:
+        """Content hash identifying this snapshot."""
+        return f"{self.code_fingerprint}-{self.data_fingerprint}"
+
+    @property
+    def data_lake_items(self) -> list[str]:
+        """File names present in the data lake, sorted."""
+        return sorted(self.data_lake_manifest)
+
+    def get_prompt(self, key: tuple) -> str | None:
+        """Return a previously rendered prompt for ``key``, if any."""
+        return self.prompts.get(key)
+
+    def set_prompt(self, key: tuple, prompt: str):
+        """Store a rendered prompt and persist the snapshot."""
+        if self.prompts.get(key) == prompt:
+            return
+        self.prompts[key] = prompt
+        if self._cache_file:
+            self.save(self._cache_file)
+
+    def save(self, path: str):
+        """Atomically write the snapshot to ``path``."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        state = {k: v for k, v in self.__dict__.items() if k != "_cache_file"}
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump({"format": _SNAPSHOT_FORMAT, "state": state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not persist environment snapshot: {e}")
+
+    @classmethod
+    def load(cls, path: str) -> "EnvironmentSnapshot | None":
+        """Load a snapshot written by ``save``; returns None if missing or unreadable."""
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        if not isinstance(data, dict) or data.get("format") != _SNAPSHOT_FORMAT:
+            return None
+        snapshot = cls.__new__(cls)
+        snapshot.__dict__.update(data["state"])
+        snapshot._cache_file = path
+        return snapshot
+
+
+_snapshots: dict[tuple, EnvironmentSnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def _cache_file_for(data_lake_path: str, commercial_mode: bool) -> str:
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(data_lake_path)), ".cache")
+    mode = "commercial" if commercial_mode else "academic"
+    return os.path.join(cache_dir, f"env_snapshot_{mode}.pkl")
+
+
+def get_environment_snapshot(data_lake_path: str, commercial_mode: bool = False) -> EnvironmentSnapshot:
+    """Return the current environment snapshot for a data lake.
+
+    The snapshot is looked up in the process-wide cache, then on disk, and only
+    rebuilt when the tool descriptions, resource descriptions or data-lake listing
+    have changed. Checking for changes costs one ``stat`` per file.
+
+    Args:
+        data_lake_path: Path to the ``biomni_data/data_lake`` directory
+        commercial_mode: Whether to use the commercial-license resource descriptions
+
+    Returns:
+        The shared EnvironmentSnapshot
+    """
+    key = (os.path.abspath(data_lake_path), commercial_mode)
+    code_fp = _code_fingerprint(commercial_mode)
+    data_fp, manifest = _scan_data_lake(data_lake_path)
+
+    with _snapshots_lock:
+        current = _snapshots.get(key)
+        if current and current.code_fingerprint == code_fp and current.data_fingerprint == data_fp:
+            return current
+
+        cache_file = _cache_file_for(data_lake_path, commercial_mode)
+        if current is None:
+            current = EnvironmentSnapshot.load(cache_file)
+            if current and current.code_fingerprint == code_fp and current.data_fingerprint == data_fp:
+                _snapshots[key] = current
+                return current
+
+        if current is not None and current.code_fingerprint == code_fp:
+            # Only the data lake changed: keep the parsed schemas, drop prompts that list the data lake
+            module2api = current.module2api
+            data_lake_dict = current.data_lake_dict
+            library_content_dict = current.library_content_dict
+        else:
+            from biomni.utils import read_module2api
+
+            env_desc = importlib.import_module(_env_desc_module(commercial_mode))
+            module2api = read_module2api()
+            data_lake_dict = dict(env_desc.data_lake_dict)
+            library_content_dict = dict(env_desc.library_content_dict)
+
+        snapshot = EnvironmentSnapshot(
+            data_lake_path=data_lake_path,
+            commercial_mode=commercial_mode,
+            code_fingerprint=code_fp,
+            data_fingerprint=data_fp,
+            module2api=module2api,
+            data_lake_manifest=manifest,
+            data_lake_dict=data_lake_dict,
+            library_content_dict=library_content_dict,
+        )
+        snapshot._cache_file = cache_file
+        snapshot.save(cache_file)
+        _snapshots[key] = snapshot
+        return snapshot
@@ -1,3 +1,4 @@
 from .biomni_eval1 import BiomniEval1
+from .runner import EvalRunner
 
-__all__ = ["BiomniEval1"]
+__all__ = ["BiomniEval1", "EvalRunner"]
@@ -0,0 +1,383 @@
+"""
+Batch evaluation runner for BiomniEval1.
+
+``BiomniEval1`` only scores answers. ``EvalRunner`` runs ``A1`` over the benchmark:
+instances are spread over a pool of worker processes, each owning one warm agent,
+and every finished instance is appended to ``results.jsonl`` in the output
+directory right away. Re-running with the same output directory skips the
+instances already recorded, so a crashed or interrupted run resumes where it
+stopped.
+
+Each record holds the answer, its score, the wall time of every agent step, the
+token usage and (when prices are given) the cost of the instance. ``report``
+aggregates the records into per-task accuracy, latency, token and throughput
+figures, written to ``report.json``.
+
+The LLM budgets in ``BiomniConfig`` (requests/tokens per minute) apply per
+process, so the runner divides them among the workers: the whole pool stays
+within the provider's limits, and those limits, not serial execution, bound the
+wall time.
+
+Usage:
+    from biomni.eval.runner import EvalRunner
+
+    runner = EvalRunner("runs/sonnet", agent_kwargs={"llm": "claude-sonnet-4-5"}, workers=8)
+    report = runner.run(tasks=["crispr_delivery"], split="val")
+
+    # or from the command line
+    python -m biomni.eval.runner --output runs/sonnet --llm claude-sonnet-4-5 --workers 8 --split val
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import statistics
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+RESULTS_FILE = "results.jsonl"
+REPORT_FILE = "report.json"
+
+_SOLUTION_RE = re.compile(r"<solution>(.*?)(?:</solution>|$)", re.DOTALL)
+
+# Agent of this worker process, built once by _init_worker
+_worker_agent = None
+
+
+def extract_answer(response: str) -> str:
+    """Return the content of the last <solution> block of a response (the whole response if there is none)."""
+    matches = _SOLUTION_RE.findall(response or "")
+    return (matches[-1] if matches else response or "").strip()
+
+
+def _scale_rate_limits(config, share: float):
+    """Give this process ``share`` of the configured per-minute LLM budgets."""
+    if config.llm_requests_per_minute:
+        config.llm_requests_per_minute *= share
+    if config.llm_tokens_per_minute:
+        config.llm_tokens_per_minute *= share
+    config.llm_rate_limits = {
+        key: {
+            name: value * share if name in ("requests_per_minute", "tokens_per_minute") and value else value
+            for name, value in limits.items()
+        }
+        for key, limits in (config.llm_rate_limits or {}).items()
+    }
+    config.llm_max_concurrency = max(1, int(config.llm_max_concurrency * share))
+
+
+def _init_worker(agent_kwargs: dict, rate_limit_share: float, log_dir: str):
+    global _worker_agent
+    from biomni.config import default_config
+
+    # Agents print every step; keep each worker's output in its own log file
+    log = open(os.path.join(log_dir, f"worker-{os.getpid()}.log"), "a", buffering=1)
+    sys.stdout = sys.stderr = log
+    _scale_rate_limits(default_config, rate_limit_share)
+
+    from biomni.agent.a1 import A1
+
+    _worker_agent = A1(**agent_kwargs)
+
+
+def _reset_agent(agent):
+    """Start the next instance from a clean conversation and namespace."""
+    from biomni.agent.session_manager import A1SessionManager
+    from biomni.tool import support_tools
+
+    A1SessionManager._reset_conversation(agent)
+    if getattr(agent, "repl_mode", "thread") == "thread":
+        support_tools._persistent_namespace.clear()
+
+
+def _run_instance(instance: dict) -> dict:
+    """Run the worker's agent on one instance; never raises, errors are recorded."""
+    agent = _worker_agent
+    _reset_agent(agent)
+    record = {
+        "task_name": instance["task_name"],
+        "task_instance_id": instance["task_instance_id"],
+        "worker": os.getpid(),
+        "started_at": time.time(),
+        "step_seconds": [],
+        "error": None,
+    }
+    print(f"\n===== {instance['task_name']} #{instance['task_instance_id']} =====")
+    started = last = time.perf_counter()
+    try:
+        thread_id = f"{instance['task_name']}-{instance['task_instance_id']}"
+        for _ in agent.go_stream(instance["prompt"], thread_id=thread_id):
+            now = time.perf_counter()
+            record["step_seconds"].append(round(now - last, 3))
+            last = now
+        response = agent._conversation_state["messages"][-1].content
+        record["response"] = response if isinstance(response, str) else str(response)
+        record["answer"] = extract_answer(record["response"])
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        record["answer"] = None
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    record["steps"] = len(record["step_seconds"])
+    record["token_usage"] = agent.get_token_usage()
+    return record
+
+
+def instance_cost(token_usage: dict, prices: dict | None) -> float | None:
+    """Cost of an instance from its token usage and prices in USD per million tokens.
+
+    ``prices`` has "input" and "output" and optionally "cache_read" and "cache_write"
+    (both default to the input price).
+    """
+    if not prices:
+        return None
+    uncached = token_usage.get("input_tokens", 0) - token_usage.get("cache_read_tokens", 0)
+    uncached -= token_usage.get("cache_creation_tokens", 0)
+    cost = (
+        uncached * prices["input"]
+        + token_usage.get("cache_read_tokens", 0) * prices.get("cache_read", prices["input"])
+        + token_usage.get("cache_creation_tokens", 0) * prices.get("cache_write", prices["input"])
+        + token_usage.get("output_tokens", 0) * prices["output"]
+    )
+    return round(cost / 1e6, 6)
+
+
+class EvalRunner:
+    """Run A1 over BiomniEval1 instances in parallel, with per-instance checkpoints."""
+
+    def __init__(
+        self,
+        output_dir: str,
+        agent_kwargs: dict | None = None,
+        workers: int = 4,
+        evaluator=None,
+        prices: dict | None = None,
+        start_method: str = "spawn",
+    ):
+        """
+        Args:
+            output_dir: Directory of results.jsonl, report.json and worker logs; reused to resume a run
+            agent_kwargs: Keyword arguments of the A1 agent built in every worker (must be picklable)
+            workers: Number of worker processes, each running one agent
+            evaluator: BiomniEval1 instance (loaded from the Hugging Face dataset by default)
+            prices: USD per million tokens ("input", "output", optional "cache_read"/"cache_write") for costs
+            start_method: multiprocessing start method of the worker pool
+        """
+        if evaluator is None:
+            from biomni.eval.biomni_eval1 import BiomniEval1
+
+            evaluator = BiomniEval1()
+        self.output_dir = output_dir
+        self.agent_kwargs = agent_kwargs or {}
+        self.workers = workers
+        self.evaluator = evaluator
+        self.prices = prices
+        self.start_method = start_method
+        self.results_path = os.path.join(output_dir, RESULTS_FILE)
+        os.makedirs(os.path.join(output_dir, "logs"), exist_ok=True)
+
+    def select(
+        self, tasks: list[str] | None = None, split: str | None = None, limit_per_task: int | None = None
+    ) -> list[dict]:
+        """Return the instances to run, as dicts with task_name, task_instance_id and prompt."""
+        df = self.evaluator.df
+        if tasks:
+            df = df[df["task_name"].isin(tasks)]
+        if split:
+            df = df[df["split"] == split]
+        if limit_per_task:
+            df = df.groupby("task_name", group_keys=False).head(limit_per_task)
+        return [
+            {"task_name": row.task_name, "task_instance_id": int(row.task_instance_id), "prompt": row.prompt}
+            for row in df.itertuples()
+        ]
+
+    def load_results(self) -> list[dict]:
+        """Return the records checkpointed so far (the latest record of each instance)."""
+        records = {}
+        if os.path.exists(self.results_path):
+            with open(self.results_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash
+                        continue
+                    records[(record["task_name"], record["task_instance_id"])] = record
+        return list(records.values())
+
+    def _score(self, record: dict) -> dict:
+        record["score"] = 0.0
+        if record["error"] is None:
+            try:
+                record["score"] = self.evaluator.evaluate(
+                    record["task_name"], record["task_instance_id"], record["answer"]
+                )
+            except Exception as e:
+                record["error"] = f"Scoring failed: {e}"
+        record["cost"] = instance_cost(record["token_usage"], self.prices)
+        return record
+
+    def _checkpoint(self, f, record: dict):
+        f.write(json.dumps(record, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+    def run(
+        self,
+        tasks: list[str] | None = None,
+        split: str | None = None,
+        limit_per_task: int | None = None,
+        retry_errors: bool = False,
+    ) -> dict:
+        """Run every selected instance not recorded yet, then write and return the report.
+
+        Args:
+            tasks: Task names to run (all tasks by default)
+            split: "train" or "val" (both by default)
+            limit_per_task: Maximum number of instances per task
+            retry_errors: Also re-run instances whose recorded run failed
+
+        Returns:
+            dict: The report (see ``report``)
+        """
+        done = {
+            (r["task_name"], r["task_instance_id"])
+            for r in self.load_results()
+            if not (retry_errors and r.get("error"))
+        }
+        instances = self.select(tasks, split, limit_per_task)
+        pending = [i for i in instances if (i["task_name"], i["task_instance_id"]) not in done]
+        print(
+            f"{len(instances)} instances selected, {len(instances) - len(pending)} already done, {len(pending)} to run"
+        )
+
+        started = time.time()
+        new_records = []
+        if pending:
+            workers = min(self.workers, len(pending))
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker,
+                initargs=(self.agent_kwargs, 1 / workers, os.path.join(self.output_dir, "logs")),
+            )
+            with pool, open(self.results_path, "a") as f:
+                futures = {pool.submit(_run_instance, instance) for instance in pending}
+                completed = 0
+                while futures:
+                    finished, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        record = self._score(future.result())
+                        self._checkpoint(f, record)
+                        new_records.append(record)
+                        completed += 1
+                        status = "error" if record["error"] else f"score={record['score']}"
+                        print(
+                            f"[{completed}/{len(pending)}] {record['task_name']} #{record['task_instance_id']}: "
+                            f"{status} ({record['seconds']:.1f}s)"
+                        )
+
+        selected = {(i["task_name"], i["task_instance_id"]) for i in instances}
+        records = [r for r in self.load_results() if (r["task_name"], r["task_instance_id"]) in selected]
+        report = self.report(records)
+        wall_seconds = time.time() - started
+        if new_records:
+            # Throughput of this invocation only; resumed records were produced by earlier runs
+            report["run"] = {
+                "instances": len(new_records),
+                "workers": min(self.workers, len(pending)),
+                "wall_seconds": round(wall_seconds, 1),
+                "instances_per_hour": round(3600 * len(new_records) / wall_seconds, 1),
+                # Agent-seconds of work completed per wall-clock second
+                "parallelism": round(sum(r["seconds"] for r in new_records) / wall_seconds, 2),
+            }
+        with open(os.path.join(self.output_dir, REPORT_FILE), "w") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    @staticmethod
+    def report(records: list[dict]) -> dict:
+        """Aggregate records into overall and per-task accuracy, latency, tokens and cost."""
+
+        def summarize(rows):
+            seconds = [r["seconds"] for r in rows]
+            step_seconds = [s for r in rows for s in r.get("step_seconds", [])]
+            costs = [r["cost"] for r in rows if r.get("cost") is not None]
+            return {
+                "instances": len(rows),
+                "accuracy": round(statistics.mean(r["score"] for r in rows), 4) if rows else 0.0,
+                "errors": sum(1 for r in rows if r.get("error")),
+                "mean_seconds": round(statistics.mean(seconds), 2) if seconds else 0.0,
+                "p95_seconds": round(sorted(seconds)[int(0.95 * (len(seconds) - 1))], 2) if seconds else 0.0,
+                "mean_steps": round(statistics.mean(r.get("steps", 0) for r in rows), 1) if rows else 0.0,
+                "mean_step_seconds": round(statistics.mean(step_seconds), 2) if step_seconds else 0.0,
+                "input_tokens": sum(r["token_usage"].get("input_tokens", 0) for r in rows),
+                "output_tokens": sum(r["token_usage"].get("output_tokens", 0) for r in rows),
+                "cache_read_tokens": sum(r["token_usage"].get("cache_read_tokens", 0) for r in rows),
+                "cost": round(sum(costs), 4) if costs else None,
+            }
+
+        by_task = {}
+        for record in records:
+            by_task.setdefault(record["task_name"], []).append(record)
+        return {
+            "overall": summarize(records),
+            "tasks": {task: summarize(rows) for task, rows in sorted(by_task.items())},
+        }
+
+
+def print_report(report: dict):
+    """Print the per-task table of a report."""
+    columns = ["instances", "accuracy", "errors", "mean_seconds", "mean_steps", "output_tokens", "cost"]
+    width = max([len(task) for task in report["tasks"]] + [len("overall")])
+    print(f"{'task':<{width}}  " + "  ".join(f"{c:>13}" for c in columns))
+    for task, row in [*report["tasks"].items(), ("overall", report["overall"])]:
+        print(f"{task:<{width}}  " + "  ".join(f"{str(row[c]):>13}" for c in columns))
+    if "run" in report:
+        print(json.dumps(report["run"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run A1 over BiomniEval1 with parallel, resumable workers")
+    parser.add_argument("--output", required=True, help="Output directory (reuse it to resume a run)")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes, one agent each")
+    parser.add_argument("--tasks", help="Comma-separated task names (default: all)")
+    parser.add_argument("--split", choices=["train", "val"], help="Dataset split (default: both)")
+    parser.add_argument("--limit-per-task", type=int, help="Maximum instances per task")
+    parser.add_argument("--retry-errors", action="store_true", help="Re-run instances whose recorded run failed")
+    parser.add_argument("--path", default="./data", help="Biomni data path")
+    parser.add_argument("--llm", help="Model name (default: BiomniConfig.llm)")
+    parser.add_argument("--source", help="LLM source, if it cannot be inferred from the model name")
+    parser.add_argument("--repl-mode", default="thread", choices=["thread", "process"])
+    parser.add_argument("--timeout", type=int, default=600, help="Code execution timeout in seconds")
+    parser.add_argument("--price-input", type=float, help="USD per million input tokens")
+    parser.add_argument("--price-output", type=float, help="USD per million output tokens")
+    parser.add_argument("--price-cache-read", type=float, help="USD per million cached input tokens")
+    args = parser.parse_args()
+
+    agent_kwargs = {"path": args.path, "repl_mode": args.repl_mode, "timeout_seconds": args.timeout}
+    if args.llm:
+        agent_kwargs["llm"] = args.llm
+    if args.source:
+        agent_kwargs["source"] = args.source
+    prices = None
+    if args.price_input is not None and args.price_output is not None:
+        prices = {"input": args.price_input, "output": args.price_output}
+        if args.price_cache_read is not None:
+            prices["cache_read"] = args.price_cache_read
+
+    runner = EvalRunner(args.output, agent_kwargs=agent_kwargs, workers=args.workers, prices=prices)
+    report = runner.run(
+        tasks=args.tasks.split(",") if args.tasks else None,
+        split=args.split,
+        limit_per_task=args.limit_per_task,
+        retry_errors=args.retry_errors,
+    )
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
+import asyncio
+import atexit
+import functools
+import hashlib
 import os
+import threading
 from typing import TYPE_CHECKING, Literal, Optional
 
 from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, SystemMessage
 
 if TYPE_CHECKING:
     from biomni.config import BiomniConfig
@@ -18,10 +24,21 @@ def get_llm(
     base_url: str | None = None,
     api_key: str | None = None,
     config: Optional["BiomniConfig"] = None,
+    cache: bool = True,
 ) -> BaseChatModel:
     """
     Get a language model instance based on the specified model name and source.
     This function supports models from OpenAI, Azure OpenAI, Anthropic, Ollama, Gemini, Bedrock, and custom model serving.
+
+    Clients are shared process-wide: calls with the same source, model, base URL, API key,
+    temperature and stop sequences return the same instance, and all clients of a provider
+    share one keep-alive HTTP connection pool bounded by its max connections (see
+    ``BiomniConfig.llm_max_connections``). Shared clients must not be mutated.
+
+    Every client of a provider and model also shares one rate limiter (requests and tokens
+    per minute, adaptive concurrency; see ``biomni.rate_limit``), and retries rate-limited
+    or overloaded calls with jittered exponential backoff up to ``llm_max_retries`` times.
+
     Args:
         model (str): The model name to use
         temperature (float): Temperature setting for generation
@@ -31,6 +48,7 @@ def get_llm(
         base_url (str): The base URL for custom model serving (e.g., "http://localhost:8000/v1"), default is None
         api_key (str): The API key for the custom llm
         config (BiomniConfig): Optional configuration object. If provided, unspecified parameters will use config values
+        cache (bool): Reuse a shared client for identical settings (default True); False always builds a new one
     """
     # Use config values for any unspecified parameters
     if config is not None:
@@ -94,6 +112,65 @@ def get_llm(
             else:
                 raise ValueError("Unable to determine model source. Please specify 'source' parameter.")
 
+    if not cache:
+        llm = _create_llm(
+            model, temperature, stop_sequences, source, base_url, api_key, max_retries=_max_retries(config)
+        )
+        return _apply_rate_limit(llm, source, model, config)
+
+    key = (
+        source,
+        model,
+        base_url,
+        hashlib.sha256(api_key.encode()).hexdigest(),
+        temperature,
+        tuple(stop_sequences or ()),
+    )
+    with _clients_lock:
+        llm = _llm_clients.get(key)
+        if llm is not None:
+            _client_stats["hits"] += 1
+            return llm
+    http_client = _shared_http_client(source, config)
+    http_async_client = _shared_http_client(source, config, asynchronous=True)
+    llm = _create_llm(
+        model,
+        temperature,
+        stop_sequences,
+        source,
+        base_url,
+        api_key,
+        http_client,
+        http_async_client,
+        max_retries=_max_retries(config),
+    )
+    llm = _apply_rate_limit(llm, source, model, config)
+    with _clients_lock:
+        # Another thread may have built the same client meanwhile; keep the first one
+        llm = _llm_clients.setdefault(key, llm)
+        _client_stats["misses"] += 1
+    return llm
+
+
+def _create_llm(
+    model,
+    temperature,
+    stop_sequences,
+    source,
+    base_url,
+    api_key,
+    http_client=None,
+    http_async_client=None,
+    max_retries=2,
+) -> BaseChatModel:
+    """Construct a chat model for a resolved source.
+
+    ``http_client`` and ``http_async_client`` are the shared httpx pools used by synchronous
+    and asynchronous calls, if any.
+
+    ``max_retries`` is passed to the providers whose SDK retries failed calls (429, overloaded,
+    5xx) with jittered exponential backoff, honoring the provider's retry-after.
+    """
     # Create appropriate model based on source
     if source == "OpenAI":
         try:
@@ -102,7 +179,14 @@ def get_llm(
             raise ImportError(  # noqa: B904
                 "langchain-openai package is required for OpenAI models. Install with: pip install langchain-openai"
             )
-        return ChatOpenAI(model=model, temperature=temperature, stop_sequences=stop_sequences)
+        return ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            stop_sequences=stop_sequences,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            max_retries=max_retries,
+        )
 
     elif source == "AzureOpenAI":
         try:
@@ -119,6 +203,9 @@ def get_llm(
             azure_deployment=model,
             openai_api_version=API_VERSION,
             temperature=temperature,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            max_retries=max_retries,
         )
 
     elif source == "Anthropic":
@@ -128,12 +215,15 @@ def get_llm(
             raise ImportError(  # noqa: B904
                 "langchain-anthropic package is required for Anthropic models. Install with: pip install langchain-anthropic"
             )
-        return ChatAnthropic(
+        llm = ChatAnthropic(
             model=model,
             temperature=temperature,
             max_tokens=8192,
             stop_sequences=stop_sequences,
+            max_retries=max_retries,
         )
+        _use_anthropic_http_client(llm, http_client, http_async_client)
+        return llm
 
     elif source == "Gemini":
         # If you want to use ChatGoogleGenerativeAI, you need to pass the stop sequences upon invoking the model.
@@ -154,6 +244,9 @@ def get_llm(
             api_key=os.getenv("GEMINI_API_KEY"),
             base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
             stop_sequences=stop_sequences,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            max_retries=max_retries,
         )
 
     elif source == "Groq":
@@ -169,6 +262,9 @@ def get_llm(
             api_key=os.getenv("GROQ_API_KEY"),
             base_url="https://api.groq.com/openai/v1",
             stop_sequences=stop_sequences,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            max_retries=max_retries,
         )
 
     elif source == "Ollama":
@@ -213,6 +309,9 @@ def get_llm(
             stop_sequences=stop_sequences,
             base_url=base_url,
             api_key=api_key,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            max_retries=max_retries,
         )
         return llm
 
@@ -220,3 +319,240 @@ def get_llm(
         raise ValueError(
             f"Invalid source: {source}. Valid options are 'OpenAI', 'AzureOpenAI', 'Anthropic', 'Gemini', 'Groq', 'Bedrock', or 'Ollama'"
         )
+
+
+_clients_lock = threading.Lock()
+_llm_clients: dict[tuple, BaseChatModel] = {}
+_http_clients: dict[str, object] = {}
+_async_http_clients: dict[str, object] = {}
+_client_stats = {"hits": 0, "misses": 0}
+
+# Providers reached over HTTP with an httpx client that can be shared
+_HTTPX_SOURCES = ("OpenAI", "AzureOpenAI", "Anthropic", "Gemini", "Groq", "Custom")
+
+
+def _max_connections(source: str, config: Optional["BiomniConfig"]) -> int:
+    if config is None:
+        from biomni.config import default_config as config
+    per_provider = getattr(config, "llm_provider_max_connections", None) or {}
+    return int(per_provider.get(source, getattr(config, "llm_max_connections", 32)))
+
+
+def _shared_http_client(source: str, config: Optional["BiomniConfig"], asynchronous: bool = False):
+    """Return the keep-alive HTTP client shared by every client of ``source``.
+
+    With ``asynchronous`` it is the pool used by ``ainvoke``/``astream``, with the same
+    connection limit and rate-limit hook as the synchronous one.
+    """
+    if source not in _HTTPX_SOURCES:
+        return None
+    clients = _async_http_clients if asynchronous else _http_clients
+    with _clients_lock:
+        client = clients.get(source)
+        if client is not None:
+            return client
+        try:
+            # Use the SDK's own HTTP client class so its transport matches what the SDK expects
+            if source == "Anthropic":
+                import anthropic as sdk
+            else:
+                import openai as sdk
+        except ImportError:
+            return None
+        from biomni.rate_limit import aobserve_http_response, observe_http_response
+
+        limit = _max_connections(source, config)
+        client_class = sdk.DefaultAsyncHttpxClient if asynchronous else sdk.DefaultHttpxClient
+        hook = aobserve_http_response if asynchronous else observe_http_response
+        client = client_class(
+            limits=type(sdk.DEFAULT_CONNECTION_LIMITS)(max_connections=limit, max_keepalive_connections=limit),
+            # Requests beyond the connection limit wait for a free connection instead of failing
+            timeout=sdk.Timeout(600.0, connect=10.0, pool=None),
+            # Every 429/overloaded answer, including those the SDK retries, throttles the provider's limiters
+            event_hooks={"response": [functools.partial(hook, source)]},
+        )
+        clients[source] = client
+        return client
+
+
+def _max_retries(config: Optional["BiomniConfig"]) -> int:
+    if config is None:
+        from biomni.config import default_config as config
+    return int(getattr(config, "llm_max_retries", 6))
+
+
+def _apply_rate_limit(llm: BaseChatModel, source: str, model: str, config: Optional["BiomniConfig"]) -> BaseChatModel:
+    """Attach the rate limiter shared by every client of ``source``/``model``."""
+    if config is None:
+        from biomni.config import default_config as config
+    if not getattr(config, "llm_rate_limiting", True):
+        return llm
+    from biomni.rate_limit import get_rate_limiter
+
+    limiter = get_rate_limiter(source, model, config)
+    llm.rate_limiter = limiter
+    # The limiter's callback frees its concurrency slot and charges the tokens used when a call ends
+    llm.callbacks = [*(llm.callbacks or []), limiter.callback]
+    return llm
+
+
+def _use_anthropic_http_client(llm, http_client, http_async_client=None):
+    """Make a ChatAnthropic instance send its requests through the shared HTTP clients."""
+    import anthropic
+
+    # ChatAnthropic builds its clients lazily (cached properties); provide them up front
+    if http_client is not None:
+        llm.__dict__["_client"] = anthropic.Client(**llm._client_params, http_client=http_client)
+    if http_async_client is not None:
+        llm.__dict__["_async_client"] = anthropic.AsyncClient(**llm._client_params, http_client=http_async_client)
+
+
+def llm_client_metrics() -> dict:
+    """Return the number of shared LLM clients and how often they were reused."""
+    with _clients_lock:
+        return {
+            "clients": len(_llm_clients),
+            "http_pools": sorted(_http_clients),
+            "async_http_pools": sorted(_async_http_clients),
+            **_client_stats,
+        }
+
+
+def close_llm_clients():
+    """Close the shared HTTP connection pools and forget the shared clients."""
+    with _clients_lock:
+        clients = list(_http_clients.values())
+        async_clients = list(_async_http_clients.values())
+        _http_clients.clear()
+        _async_http_clients.clear()
+        _llm_clients.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception:
+            pass
+    for client in async_clients:
+        try:
+            # Fails inside a running event loop; the connections are then dropped with the process
+            asyncio.run(client.aclose())
+        except Exception:
+            pass
+
+
+atexit.register(close_llm_clients)
+
+
+# Anthropic-style cache breakpoint; a prompt may carry at most four of them
+_CACHE_CONTROL = {"type": "ephemeral"}
+
+_usage_lock = threading.Lock()
+_usage_totals = {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cache_read_tokens": 0, "cache_creation_tokens": 0}
+
+
+def prompt_cache_style(llm: BaseChatModel) -> str | None:
+    """Return how ``llm`` caches prompt prefixes.
+
+    "explicit" models (Anthropic, Claude on Bedrock) only cache up to ``cache_control``
+    breakpoints placed in the messages. "automatic" models (OpenAI, Azure, Gemini,
+    Groq and OpenAI-compatible servers such as vLLM or SGLang) reuse any stable prefix
+    on their own. None means the provider is not known to cache prompts.
+    """
+    name = type(llm).__name__
+    if name == "ChatAnthropic":
+        return "explicit"
+    if name == "ChatBedrock":
+        model_id = str(getattr(llm, "model_id", "") or getattr(llm, "model", ""))
+        return "explicit" if "anthropic" in model_id or "claude" in model_id else None
+    if name in ("ChatOpenAI", "AzureChatOpenAI"):
+        return "automatic"
+    return None
+
+
+def _with_cache_control(message: BaseMessage) -> BaseMessage:
+    content = message.content
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}] if content else []
+    else:
+        blocks = [dict(b) if isinstance(b, dict) else {"type": "text", "text": b} for b in content]
+    if not blocks:
+        return message
+    blocks[-1] = {**blocks[-1], "cache_control": _CACHE_CONTROL}
+    return message.model_copy(update={"content": blocks})
+
+
+def build_cached_prompt(llm: BaseChatModel, system_blocks: list[str], history: list[BaseMessage]) -> list[BaseMessage]:
+    """Assemble ``[system] + history`` so the provider can reuse the cached prompt prefix.
+
+    For providers with explicit caching, a breakpoint is placed after each system
+    prompt block (the static instructions and the resource listing) and after the
+    latest history message, so every step of a run reads the previous step's prompt
+    from the cache and only pays for the new messages. Other providers get the
+    system prompt as a single string, which keeps the prefix byte-identical between
+    calls for their automatic prefix caching.
+
+    Args:
+        llm: The chat model the prompt is sent to
+        system_blocks: System prompt split from most to least stable
+        history: Conversation messages following the system prompt
+
+    Returns:
+        list[BaseMessage]: Messages ready for ``llm.invoke``
+    """
+    blocks = [block for block in system_blocks if block]
+    if prompt_cache_style(llm) != "explicit":
+        return [SystemMessage(content="".join(blocks))] + list(history)
+
+    system = SystemMessage(
+        content=[{"type": "text", "text": block, "cache_control": _CACHE_CONTROL} for block in blocks]
+    )
+    history = list(history)
+    if history:
+        history[-1] = _with_cache_control(history[-1])
+    return [system] + history
+
+
+def record_token_usage(message, totals: dict | None = None) -> dict:
+    """Add the token usage reported on an LLM response to the process-wide totals.
+
+    Cached input tokens are read from the standard ``usage_metadata`` fields
+    (``input_token_details.cache_read`` / ``cache_creation``), which Anthropic,
+    Bedrock and OpenAI-compatible integrations all populate.
+
+    Args:
+        message: AIMessage (or chunk) returned by the model
+        totals: Optional per-agent dictionary updated alongside the process totals
+
+    Returns:
+        dict: The usage of this message
+    """
+    usage = getattr(message, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    record = {
+        "calls": 1 if usage else 0,
+        "input_tokens": usage.get("input_tokens", 0) or 0,
+        "output_tokens": usage.get("output_tokens", 0) or 0,
+        "cache_read_tokens": details.get("cache_read", 0) or 0,
+        "cache_creation_tokens": details.get("cache_creation", 0) or 0,
+    }
+    with _usage_lock:
+        for key, value in record.items():
+            _usage_totals[key] += value
+            if totals is not None:
+                totals[key] = totals.get(key, 0) + value
+    return record
+
+
+def token_usage_summary(totals: dict) -> dict:
+    """Return token totals with the share of input tokens served from the prompt cache."""
+    input_tokens = totals.get("input_tokens", 0)
+    return {
+        **totals,
+        "uncached_input_tokens": input_tokens - totals.get("cache_read_tokens", 0),
+        "cached_input_ratio": round(totals.get("cache_read_tokens", 0) / input_tokens, 3) if input_tokens else 0.0,
+    }
+
+
+def prompt_cache_metrics() -> dict:
+    """Return process-wide token usage, including cached vs. uncached input tokens."""
+    with _usage_lock:
+        return token_usage_summary(dict(_usage_totals))
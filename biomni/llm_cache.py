@@ -0,0 +1,195 @@
+"""
+Persistent cache of LLM responses for deterministic sub-calls.
+
+Several helpers use the LLM as a temperature-0 translation of a prompt into a URL
+or JSON: ``_query_llm_for_api`` behind the ``query_*`` database tools (including the
+parameter extraction of ``query_clinicaltrials``) and ``A1.result_formatting``.
+Repeating the same request ("UniProt entry for TP53") used to cost an LLM round trip
+every time. These call sites now look the response up in an ``LLMResponseCache``
+first, and store it once it has been parsed successfully, so malformed answers are
+never replayed.
+
+Entries are keyed by the model's identifying parameters (class, model name,
+temperature, stop sequences, ...), the full text of every message and any extra
+parameters of the call (e.g. the output schema). They expire after a TTL, and the
+least recently used entries are evicted beyond a number of entries or a total size.
+The SQLite file is shared by every agent and REPL worker using the same data path.
+
+Usage:
+    from biomni.llm_cache import get_llm_cache, llm_cache_key
+
+    cache = get_llm_cache()
+    key = llm_cache_key(llm, messages)
+    text = cache.get(key) if cache else None
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.messages import BaseMessage
+
+
+def _model_params(llm) -> dict:
+    try:
+        params = dict(llm._identifying_params)
+    except Exception:
+        params = {}
+    params["_type"] = type(llm).__name__
+    for attr in ("model_name", "model", "model_id", "deployment_name", "temperature", "stop", "stop_sequences"):
+        value = getattr(llm, attr, None)
+        if value is not None:
+            params.setdefault(attr, value)
+    return params
+
+
+def _message_repr(message) -> object:
+    if isinstance(message, BaseMessage):
+        return [message.type, message.content]
+    if isinstance(message, tuple):
+        return list(message)
+    return message
+
+
+def llm_cache_key(llm, messages, **params) -> str:
+    """Key of a call: the model's parameters, the full messages and any extra call parameters."""
+    if not isinstance(messages, list | tuple):
+        messages = [messages]
+    payload = {
+        "model": _model_params(llm),
+        "messages": [_message_repr(m) for m in messages],
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """SQLite-backed store of LLM responses with a TTL and LRU eviction."""
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl_seconds: float | None = 30 * 24 * 3600,
+        max_entries: int = 20000,
+        max_mb: float | None = 256,
+    ):
+        """
+        Args:
+            db_path: SQLite file holding the cache
+            ttl_seconds: Age after which an entry is ignored and pruned (None keeps entries forever)
+            max_entries: Least recently used entries beyond this count are evicted
+            max_mb: Least recently used entries are evicted while the stored responses exceed this size
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_mb = max_mb
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT, size INTEGER, created REAL, last_hit REAL, hits INTEGER DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_hit ON responses (last_hit)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _fresh_after(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds else 0.0
+
+    def get(self, key: str) -> str | None:
+        """Return the cached response for a key, or None on a miss."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created >= ?", (key, self._fresh_after())
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            conn.execute("UPDATE responses SET hits = hits + 1, last_hit = ? WHERE key = ?", (time.time(), key))
+            self.stats["hits"] += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """Store a response, then evict expired and least recently used entries beyond the limits."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created, last_hit, hits) VALUES (?, ?, ?, ?, ?, 0)",
+                (key, response, len(response.encode("utf-8", errors="replace")), now, now),
+            )
+            self.stats["stores"] += 1
+            evicted = conn.execute("DELETE FROM responses WHERE created < ?", (self._fresh_after(),)).rowcount
+            evicted += conn.execute(
+                "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY last_hit DESC LIMIT ?)",
+                (self.max_entries,),
+            ).rowcount
+            if self.max_mb:
+                # Keep the most recently used entries whose cumulative size fits the budget
+                evicted += conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM (SELECT key, SUM(size) OVER "
+                    "(ORDER BY last_hit DESC, key) AS total FROM responses) WHERE total > ?)",
+                    (int(self.max_mb * 1024 * 1024),),
+                ).rowcount
+            self.stats["evictions"] += evicted
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def metrics(self) -> dict:
+        """Return this process's hit/miss counters, and the number and size of stored entries."""
+        with self._lock, self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": entries,
+            "size_mb": round(size / (1024 * 1024), 2),
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+_llm_caches: dict[str, LLMResponseCache] = {}
+_llm_caches_lock = threading.Lock()
+
+
+def get_llm_cache(config=None) -> LLMResponseCache | None:
+    """Return the process-wide response cache configured by ``config``, or None when disabled."""
+    if config is None:
+        from biomni.config import default_config as config
+    if not config.llm_cache:
+        return None
+    db_path = os.path.abspath(config.llm_cache_path or os.path.join(config.path, ".cache", "llm_cache.sqlite"))
+    with _llm_caches_lock:
+        cache = _llm_caches.get(db_path)
+        if cache is None:
+            cache = _llm_caches[db_path] = LLMResponseCache(
+                db_path,
+                ttl_seconds=config.llm_cache_ttl,
+                max_entries=config.llm_cache_max_entries,
+                max_mb=config.llm_cache_max_mb,
+            )
+        return cache
+
+
+def llm_cache_metrics() -> dict[str, dict]:
+    """Metrics of every response cache opened in this process, keyed by database path."""
+    with _llm_caches_lock:
+        caches = dict(_llm_caches)
+    return {path: cache.metrics() for path, cache in caches.items()}
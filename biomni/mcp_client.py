@@ -0,0 +1,464 @@
+"""
+Long-lived MCP client sessions shared by every MCP tool of a process.
+
+``A1.add_mcp`` used to start the MCP server subprocess, initialize a session, call
+one tool and tear everything down on every tool invocation. For servers with a
+heavy startup (Docker images, Node or Python servers loading models) each call
+cost seconds. ``MCPSessionManager`` keeps warm sessions instead:
+
+- one background event loop owns every session, so tools can be called from
+  any thread (agent code in the REPL, the execution pool, the server);
+- each configured server gets a small pool of sessions (stdio subprocesses or
+  HTTP connections); concurrent ``call_tool`` requests are multiplexed over them;
+- a session whose transport dies is replaced and the call retried on a live one, and a
+  periodic ping replaces unresponsive sessions;
+- the tool list of each server is cached.
+
+Servers are identified by their transport settings, so agents configured with
+the same server share its sessions. ``MCPTool`` is the picklable callable
+registered for each tool; in a REPL worker process it uses that process's own
+manager.
+
+Usage:
+    from biomni.mcp_client import get_mcp_manager
+
+    manager = get_mcp_manager()
+    spec = {"command": "python", "args": ["-m", "my_server"]}
+    tools = manager.list_tools(spec)
+    result = manager.call_tool(spec, "search", {"query": "TP53"})
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+
+def server_key(spec: dict) -> str:
+    """Identity of a server: its transport settings."""
+    return json.dumps(spec, sort_keys=True, default=str)
+
+
+async def _open_transport(stack: contextlib.AsyncExitStack, spec: dict):
+    """Enter the transport context of ``spec`` and return its (read, write) streams."""
+    if spec.get("url"):
+        if spec.get("transport") == "sse":
+            from mcp.client.sse import sse_client
+
+            streams = await stack.enter_async_context(sse_client(spec["url"], headers=spec.get("headers")))
+        else:
+            from mcp.client import streamable_http
+
+            client = getattr(streamable_http, "streamablehttp_client", None) or streamable_http.streamable_http_client
+            streams = await stack.enter_async_context(client(spec["url"], headers=spec.get("headers")))
+    else:
+        from mcp.client.stdio import StdioServerParameters, stdio_client
+
+        params = StdioServerParameters(command=spec["command"], args=spec.get("args", []), env=spec.get("env") or None)
+        streams = await stack.enter_async_context(stdio_client(params))
+    return streams[0], streams[1]
+
+
+def _is_connection_error(error: BaseException) -> bool:
+    """Whether a failed request means the session's transport is gone (server exited, stream closed)."""
+    import anyio
+
+    if isinstance(error, anyio.ClosedResourceError | anyio.BrokenResourceError | anyio.EndOfStream):
+        return True
+    # McpError/MCPError raised for requests pending when the connection closed
+    code = getattr(getattr(error, "error", None), "code", None)
+    return code == -32000 or "connection closed" in str(error).lower()
+
+
+def server_fingerprint(spec: dict, version: str | None = None) -> str:
+    """Cache key of a server's tool schemas: its transport settings and version.
+
+    Without an explicit version, the modification times of the command and of any
+    file passed as an argument stand in for it, so editing a local server script
+    invalidates its cached schemas.
+    """
+    parts = [server_key(spec), str(version or "")]
+    if version is None and spec.get("command"):
+        for candidate in [shutil.which(spec["command"]), *spec.get("args", [])]:
+            if candidate and os.path.isfile(candidate):
+                parts.append(f"{candidate}:{os.path.getmtime(candidate)}")
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+class ToolSchemaCache:
+    """Discovered tool lists of MCP servers, one JSON file per server fingerprint."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _path(self, fingerprint: str) -> str:
+        return os.path.join(self.cache_dir, f"{fingerprint}.json")
+
+    def get(self, fingerprint: str) -> list[dict] | None:
+        try:
+            with open(self._path(fingerprint)) as f:
+                return json.load(f)["tools"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, fingerprint: str, tools: list[dict]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(fingerprint)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"tools": tools, "discovered_at": time.time()}, f, default=str)
+        os.replace(tmp_path, path)
+
+
+class _MCPSession:
+    """One initialized client session, owned by a task of the manager's loop."""
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.session = None
+        self.in_flight = 0
+        self.error = None
+        self.broken = False
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task = None
+
+    async def start(self, timeout: float):
+        self._task = asyncio.create_task(self._serve())
+        await asyncio.wait_for(self._ready.wait(), timeout)
+        if self.session is None:
+            raise RuntimeError(f"MCP server failed to start: {self.error}")
+
+    async def _serve(self):
+        # Transport and session contexts must be entered and exited by the same task
+        from mcp import ClientSession
+
+        try:
+            async with contextlib.AsyncExitStack() as stack:
+                read, write = await _open_transport(stack, self.spec)
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+                self.session = session
+                self._ready.set()
+                await self._stop.wait()
+        except BaseException as e:
+            # Report the underlying error rather than the task group wrapping it
+            while isinstance(e, BaseExceptionGroup) and len(e.exceptions) == 1:
+                e = e.exceptions[0]
+            self.error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and not self.broken and self._task is not None and not self._task.done()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            with contextlib.suppress(BaseException):
+                await asyncio.wait_for(self._task, 10)
+
+
+class _MCPServer:
+    """Pool of sessions to one server."""
+
+    def __init__(self, spec: dict, pool_size: int, startup_timeout: float):
+        self.spec = spec
+        self.pool_size = pool_size
+        self.startup_timeout = startup_timeout
+        self.sessions: list[_MCPSession] = []
+        self.tools = None
+        self.stats = {"calls": 0, "errors": 0, "starts": 0, "restarts": 0, "call_seconds_total": 0.0}
+        self._lock = asyncio.Lock()
+        self._growing = False
+
+    @property
+    def label(self) -> str:
+        return self.spec.get("url") or " ".join([self.spec["command"], *self.spec.get("args", [])])
+
+    async def _start_session(self) -> _MCPSession:
+        session = _MCPSession(self.spec)
+        await session.start(self.startup_timeout)
+        self.sessions.append(session)
+        self.stats["starts"] += 1
+        return session
+
+    async def _grow(self):
+        try:
+            await self._start_session()
+        except Exception as e:
+            print(f"Warning: could not start an additional MCP session: {e}")
+        finally:
+            self._growing = False
+
+    async def _session(self) -> _MCPSession:
+        """Return the least busy live session, starting one when there is none."""
+        async with self._lock:
+            dead = [s for s in self.sessions if not s.alive]
+            if dead:
+                self.stats["restarts"] += len(dead)
+                self.sessions = [s for s in self.sessions if s.alive]
+                for session in dead:
+                    await session.stop()
+            if not self.sessions:
+                return await self._start_session()
+            session = min(self.sessions, key=lambda s: s.in_flight)
+            if session.in_flight and len(self.sessions) < self.pool_size and not self._growing:
+                # Every session is busy: add one in the background, without delaying this call
+                self._growing = True
+                asyncio.create_task(self._grow())
+            return session
+
+    async def call_tool(self, tool_name: str, arguments: dict, timeout: float | None):
+        started = time.perf_counter()
+        self.stats["calls"] += 1
+        try:
+            # Every pooled session may have died with the server; the last attempt uses a fresh one
+            attempts = len(self.sessions) + 1
+            for attempt in range(attempts):
+                session = await self._session()
+                session.in_flight += 1
+                try:
+                    return await asyncio.wait_for(session.session.call_tool(tool_name, arguments), timeout)
+                except Exception as e:
+                    if attempt == attempts - 1 or isinstance(e, asyncio.TimeoutError):
+                        raise
+                    if session.alive and not _is_connection_error(e):
+                        raise
+                    # The server went away: the next attempt starts a fresh session
+                    session.broken = True
+                finally:
+                    session.in_flight -= 1
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.stats["call_seconds_total"] += time.perf_counter() - started
+
+    async def list_tools(self, refresh: bool = False) -> list[dict]:
+        if self.tools is None or refresh:
+            session = await self._session()
+            result = await session.session.list_tools()
+            self.tools = [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "inputSchema": getattr(tool, "inputSchema", None) or getattr(tool, "input_schema", None) or {},
+                }
+                for tool in (result.tools if hasattr(result, "tools") else result)
+                if hasattr(tool, "name")
+            ]
+        return self.tools
+
+    async def health_check(self, timeout: float = 10) -> int:
+        """Ping every session and stop those that do not answer; return the number replaced."""
+        unhealthy = []
+        for session in list(self.sessions):
+            try:
+                if not session.alive:
+                    raise RuntimeError("session closed")
+                await asyncio.wait_for(session.session.send_ping(), timeout)
+            except Exception:
+                unhealthy.append(session)
+        async with self._lock:
+            for session in unhealthy:
+                if session in self.sessions:
+                    self.sessions.remove(session)
+                    self.stats["restarts"] += 1
+                await session.stop()
+        return len(unhealthy)
+
+    async def close(self):
+        async with self._lock:
+            sessions, self.sessions = self.sessions, []
+        for session in sessions:
+            await session.stop()
+
+
+class MCPSessionManager:
+    """Warm MCP sessions, served from a background event loop."""
+
+    def __init__(
+        self,
+        pool_size: int = 1,
+        startup_timeout: float = 60,
+        call_timeout: float | None = None,
+        health_check_interval: float | None = 60,
+    ):
+        """
+        Args:
+            pool_size: Maximum number of sessions kept per server
+            startup_timeout: Seconds allowed for starting and initializing a session
+            call_timeout: Seconds allowed for one tool call (None for no limit)
+            health_check_interval: Seconds between pings of idle sessions (None disables them)
+        """
+        self.pool_size = pool_size
+        self.startup_timeout = startup_timeout
+        self.call_timeout = call_timeout
+        self.health_check_interval = health_check_interval
+        self._servers: dict[str, _MCPServer] = {}
+        self._loop = None
+        self._thread = None
+        self._health_task = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="mcp-sessions", daemon=True)
+                self._thread.start()
+                if self.health_check_interval:
+                    self._health_task = asyncio.run_coroutine_threadsafe(self._health_loop(), self._loop)
+            return self._loop
+
+    def _submit(self, coro):
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("MCP tools cannot be called synchronously from the MCP session loop")
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def _server(self, spec: dict) -> _MCPServer:
+        key = server_key(spec)
+        with self._lock:
+            server = self._servers.get(key)
+            if server is None:
+                server = self._servers[key] = _MCPServer(spec, self.pool_size, self.startup_timeout)
+            return server
+
+    def call_tool(self, spec: dict, tool_name: str, arguments: dict | None = None):
+        """Call a tool on the server described by ``spec`` and return the MCP ``CallToolResult``."""
+        server = self._server(spec)
+        return self._submit(server.call_tool(tool_name, arguments or {}, self.call_timeout)).result()
+
+    async def acall_tool(self, spec: dict, tool_name: str, arguments: dict | None = None):
+        """Asynchronous ``call_tool``, usable from any event loop."""
+        server = self._server(spec)
+        return await asyncio.wrap_future(self._submit(server.call_tool(tool_name, arguments or {}, self.call_timeout)))
+
+    def list_tools(self, spec: dict, refresh: bool = False) -> list[dict]:
+        """Return the tools of a server (name, description, inputSchema), cached after the first listing."""
+        return self.discover(spec, refresh).result()
+
+    def discover(self, spec: dict, refresh: bool = False) -> concurrent.futures.Future:
+        """Start listing a server's tools without waiting; servers are discovered concurrently."""
+        return self._submit(self._server(spec).list_tools(refresh))
+
+    def health_check(self) -> dict[str, int]:
+        """Ping every session now; return the number of sessions replaced per server."""
+        with self._lock:
+            servers = list(self._servers.values())
+        return {server.label: self._submit(server.health_check()).result() for server in servers}
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            for server in list(self._servers.values()):
+                with contextlib.suppress(Exception):
+                    await server.health_check()
+
+    def metrics(self) -> dict:
+        """Return per-server session counts, call counts, errors, restarts and mean call latency."""
+        with self._lock:
+            servers = dict(self._servers)
+        metrics = {}
+        for server in servers.values():
+            calls = server.stats["calls"]
+            metrics[server.label] = {
+                **{k: v for k, v in server.stats.items() if k != "call_seconds_total"},
+                "sessions": sum(1 for s in server.sessions if s.alive),
+                "in_flight": sum(s.in_flight for s in server.sessions),
+                "mean_call_seconds": round(server.stats["call_seconds_total"] / calls, 4) if calls else 0.0,
+            }
+        return metrics
+
+    def close(self):
+        """Stop every session and the background loop."""
+        with self._lock:
+            loop, servers = self._loop, list(self._servers.values())
+            self._servers.clear()
+            self._loop = None
+            if self._health_task is not None:
+                self._health_task.cancel()
+                self._health_task = None
+        if loop is None:
+            return
+        for server in servers:
+            with contextlib.suppress(Exception):
+                asyncio.run_coroutine_threadsafe(server.close(), loop).result(timeout=30)
+        loop.call_soon_threadsafe(loop.stop)
+
+
+class MCPTool:
+    """Synchronous function calling one MCP tool through the process's session manager.
+
+    Instances only hold the server's transport settings and the tool name, so they
+    can be sent to REPL worker processes.
+    """
+
+    def __init__(self, spec: dict, tool_name: str, doc: str | None = None):
+        self.spec = spec
+        self.tool_name = tool_name
+        self.__name__ = tool_name
+        self.__doc__ = doc
+
+    def __call__(self, **kwargs):
+        try:
+            result = get_mcp_manager().call_tool(self.spec, self.tool_name, kwargs)
+        except Exception as e:
+            raise RuntimeError(f"MCP tool execution failed for '{self.tool_name}': {e}") from e
+        content = result.content[0]
+        if hasattr(content, "json"):
+            return content.json()
+        return content.text
+
+    def __repr__(self):
+        return f"<MCP tool {self.tool_name}>"
+
+
+_manager: MCPSessionManager | None = None
+_manager_lock = threading.Lock()
+
+
+def get_mcp_manager(config=None) -> MCPSessionManager:
+    """Return the process-wide MCP session manager."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            if config is None:
+                from biomni.config import default_config as config
+            _manager = MCPSessionManager(
+                pool_size=config.mcp_sessions_per_server,
+                call_timeout=config.mcp_call_timeout,
+                health_check_interval=config.mcp_health_check_interval,
+            )
+        return _manager
+
+
+def close_mcp_sessions():
+    """Stop the sessions of the process-wide manager."""
+    global _manager
+    with _manager_lock:
+        manager, _manager = _manager, None
+    if manager is not None:
+        manager.close()
+
+
+def _forget_manager_after_fork():
+    # The loop thread does not exist in a forked child; it builds its own manager
+    global _manager, _manager_lock
+    _manager = None
+    _manager_lock = threading.Lock()
+
+
+atexit.register(close_mcp_sessions)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_manager_after_fork)
@@ -1,15 +1,418 @@
 import contextlib
+import hashlib
+import json
+import math
+import os
+import pickle
 import re
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+import zlib
+from collections import Counter
 
+import numpy as np
 from langchain_core.messages import HumanMessage
 from langchain_openai import ChatOpenAI
 
+# Number of candidates kept per category by embedding-based retrieval
+DEFAULT_TOP_K = {"tools": 20, "data_lake": 10, "libraries": 15}
+
+# Dimension of the hashed bag-of-words vectors used when no embedding model is given
+_HASH_DIM = 4096
+_INDEX_FORMAT = 2
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or that the this to was were which with "
+    "using use used based given can will may such these those their than then also any all each other".split()
+)
+
+
+def _tokenize(text: str) -> list[str]:
+    """Lowercase word tokens, with snake_case and camelCase identifiers split into parts."""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in _STOPWORDS]
+
+
+def _resource_text(resource) -> str:
+    """Text indexed for a tool, data-lake item or library."""
+    if isinstance(resource, dict):
+        parts = [str(resource.get("name", "")), str(resource.get("description", ""))]
+        for key in ("required_parameters", "optional_parameters"):
+            for param in resource.get(key) or []:
+                if isinstance(param, dict):
+                    parts.append(f"{param.get('name', '')} {param.get('description', '')}")
+        return " ".join(parts)
+    if isinstance(resource, str):
+        return resource
+    return f"{getattr(resource, 'name', resource)} {getattr(resource, 'description', '')}"
+
+
+def _hashed_features(tokens: list[str]) -> Counter:
+    """Hash unigrams, bigrams and character 4-grams into a fixed number of dimensions."""
+    features = Counter()
+    for token in tokens:
+        features[zlib.crc32(token.encode()) % _HASH_DIM] += 1.0
+        padded = f"#{token}#"
+        for i in range(len(padded) - 3):
+            features[zlib.crc32(b"c" + padded[i : i + 4].encode()) % _HASH_DIM] += 0.25
+    for a, b in zip(tokens, tokens[1:], strict=False):
+        features[zlib.crc32(f"{a} {b}".encode()) % _HASH_DIM] += 0.5
+    return features
+
+
+class HybridIndex:
+    """BM25 plus exact-cosine vector index over a fixed list of documents.
+
+    Vectors come from a LangChain ``Embeddings`` model when one is supplied and from
+    IDF-weighted hashed bag-of-words features otherwise, so the index works offline
+    and is fully deterministic.
+    """
+
+    k1 = 1.5
+    b = 0.75
+
+    def __init__(self, texts: list[str], embeddings=None, vector_cache: dict | None = None):
+        """
+        Args:
+            texts: Documents to index
+            embeddings: Optional LangChain Embeddings model
+            vector_cache: Embeddings of previously indexed texts, reused and extended so that
+                rebuilding after a catalog change only embeds the new documents
+        """
+        self.texts = list(texts)
+        self.size = len(texts)
+        doc_tokens = [_tokenize(t) for t in texts]
+        self.term_freqs = [Counter(tokens) for tokens in doc_tokens]
+        self.doc_lengths = np.array([len(tokens) for tokens in doc_tokens], dtype=np.float32)
+        self.avg_length = float(self.doc_lengths.mean()) if self.size else 0.0
+        doc_freq = Counter(term for tf in self.term_freqs for term in tf)
+        self.idf = {term: math.log(1 + (self.size - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+        self.uses_embeddings = embeddings is not None
+        if self.uses_embeddings:
+            vector_cache = {} if vector_cache is None else vector_cache
+            missing = [t for t in dict.fromkeys(texts) if t not in vector_cache]
+            if missing:
+                vector_cache.update(zip(missing, embeddings.embed_documents(missing), strict=True))
+            vectors = np.asarray([vector_cache[t] for t in texts], dtype=np.float32) if texts else np.zeros((0, 1))
+            self.hash_idf = None
+        else:
+            features = [_hashed_features(tokens) for tokens in doc_tokens]
+            dim_freq = np.zeros(_HASH_DIM, dtype=np.float32)
+            for f in features:
+                dim_freq[list(f)] += 1
+            self.hash_idf = np.log((1 + self.size) / (1 + dim_freq)) + 1
+            vectors = np.zeros((self.size, _HASH_DIM), dtype=np.float32)
+            for i, f in enumerate(features):
+                vectors[i, list(f)] = np.log1p(list(f.values()))
+            vectors *= self.hash_idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True) if self.size else 1
+        self.vectors = vectors / np.maximum(norms, 1e-12)
+
+    def _bm25(self, query_tokens: list[str]) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float32)
+        if not self.size:
+            return scores
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_length, 1e-6))
+        for term in set(query_tokens):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            tf = np.array([doc_tf.get(term, 0) for doc_tf in self.term_freqs], dtype=np.float32)
+            scores += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def _query_vector(self, query: str, embeddings=None) -> np.ndarray:
+        if self.uses_embeddings:
+            vector = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+        else:
+            vector = np.zeros(_HASH_DIM, dtype=np.float32)
+            features = _hashed_features(_tokenize(query))
+            vector[list(features)] = np.log1p(list(features.values()))
+            vector *= self.hash_idf
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def search(self, query: str, embeddings=None, alpha: float = 0.5) -> np.ndarray:
+        """Score every document; ``alpha`` weighs the vector score against normalized BM25."""
+        if not self.size:
+            return np.zeros(0, dtype=np.float32)
+        bm25 = self._bm25(_tokenize(query))
+        if bm25.max() > 0:
+            bm25 = bm25 / bm25.max()
+        cosine = np.clip(self.vectors @ self._query_vector(query, embeddings), 0, 1)
+        return alpha * cosine + (1 - alpha) * bm25
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query for cache lookups: case, whitespace and trailing punctuation are ignored."""
+    query = unicodedata.normalize("NFKC", query).lower()
+    return re.sub(r"\s+", " ", query).strip().rstrip("?.!").strip()
+
+
+class RetrievalCache:
+    """Persistent cache of retriever selections.
+
+    Entries are keyed by the normalized query and a version string that must
+    change whenever the set of retrievable resources (or the strategy selecting
+    among them) changes, so a stale selection is never served. Optionally, a miss
+    falls back to the most similar cached query of the same version when its
+    hashed bag-of-words cosine similarity reaches ``similarity_threshold``.
+
+    Selections are stored as resource names; callers map them back to resources.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl_seconds: float | None = 7 * 24 * 3600,
+        similarity_threshold: float | None = None,
+        max_entries: int = 5000,
+    ):
+        """
+        Args:
+            db_path: SQLite file holding the cache
+            ttl_seconds: Age after which an entry is ignored (None keeps entries forever)
+            similarity_threshold: Cosine similarity for near-duplicate hits (None for exact matches only)
+            max_entries: Least recently used entries beyond this count are pruned
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "near_hits": 0, "misses": 0, "stores": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS selections ("
+                "key TEXT PRIMARY KEY, version TEXT, query TEXT, features TEXT, selection TEXT, "
+                "created REAL, last_hit REAL, hits INTEGER DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS selections_version ON selections (version)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _key(normalized: str, version: str) -> str:
+        return hashlib.sha256(f"{version}\0{normalized}".encode()).hexdigest()
+
+    @staticmethod
+    def _features(normalized: str) -> dict[int, float]:
+        features = _hashed_features(_tokenize(normalized))
+        norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+        return {k: v / norm for k, v in features.items()}
+
+    def _fresh_after(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds else 0.0
+
+    def get(self, query: str, version: str) -> dict | None:
+        """Return the cached selection for a query, or None on a miss."""
+        normalized = normalize_query(query)
+        key = self._key(normalized, version)
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT key, selection FROM selections WHERE key = ? AND created >= ?", (key, self._fresh_after())
+            ).fetchone()
+            kind = "hits"
+            if row is None and self.similarity_threshold is not None:
+                row = self._nearest(conn, normalized, version)
+                kind = "near_hits"
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            conn.execute("UPDATE selections SET hits = hits + 1, last_hit = ? WHERE key = ?", (time.time(), row[0]))
+            self.stats[kind] += 1
+            return json.loads(row[1])
+
+    def _nearest(self, conn, normalized: str, version: str):
+        query_features = self._features(normalized)
+        best, best_score = None, self.similarity_threshold
+        rows = conn.execute(
+            "SELECT key, selection, features FROM selections WHERE version = ? AND created >= ?",
+            (version, self._fresh_after()),
+        )
+        for key, selection, features in rows:
+            cached = {int(k): v for k, v in json.loads(features).items()}
+            score = sum(v * cached.get(k, 0.0) for k, v in query_features.items())
+            if score >= best_score:
+                best, best_score = (key, selection), score
+        return best
+
+    def put(self, query: str, version: str, selection: dict):
+        """Store the selection made for a query."""
+        normalized = normalize_query(query)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO selections (key, version, query, features, selection, created, last_hit, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (
+                    self._key(normalized, version),
+                    version,
+                    normalized,
+                    json.dumps(self._features(normalized)),
+                    json.dumps(selection),
+                    now,
+                    now,
+                ),
+            )
+            conn.execute(
+                "DELETE FROM selections WHERE key NOT IN (SELECT key FROM selections ORDER BY last_hit DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self.stats["stores"] += 1
+
+    def clear(self):
+        """Remove every cached selection."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM selections")
+
+    def metrics(self) -> dict:
+        """Return this process's hit/miss counters and the number of stored entries."""
+        with self._lock, self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM selections").fetchone()[0]
+        hits = self.stats["hits"] + self.stats["near_hits"]
+        lookups = hits + self.stats["misses"]
+        return {**self.stats, "entries": entries, "hit_rate": round(hits / lookups, 3) if lookups else 0.0}
+
+
+_retrieval_caches: dict[str, RetrievalCache] = {}
+_retrieval_caches_lock = threading.Lock()
+
+
+def get_retrieval_cache(db_path: str, **kwargs) -> RetrievalCache:
+    """Return the process-wide RetrievalCache for a database file, so agents share hit statistics."""
+    db_path = os.path.abspath(db_path)
+    with _retrieval_caches_lock:
+        cache = _retrieval_caches.get(db_path)
+        if cache is None:
+            cache = _retrieval_caches[db_path] = RetrievalCache(db_path, **kwargs)
+        return cache
+
+
+def retrieval_cache_metrics() -> dict[str, dict]:
+    """Metrics of every retrieval cache opened in this process, keyed by database path."""
+    with _retrieval_caches_lock:
+        caches = dict(_retrieval_caches)
+    return {path: cache.metrics() for path, cache in caches.items()}
+
 
 class ToolRetriever:
     """Retrieve tools from the tool registry."""
 
-    def __init__(self):
-        pass
+    def __init__(self, embeddings=None, index_dir: str | None = None, top_k: dict | None = None, alpha: float = 0.5):
+        """
+        Args:
+            embeddings: Optional LangChain Embeddings model for the vector index (hashed features if None)
+            index_dir: Directory where built indexes are persisted (in memory only if None)
+            top_k: Number of resources kept per category by embedding-based retrieval
+            alpha: Weight of the vector score relative to BM25 in hybrid scoring
+        """
+        self.embeddings = embeddings
+        self.index_dir = index_dir
+        self.top_k = {**DEFAULT_TOP_K, **(top_k or {})}
+        self.alpha = alpha
+        self._indexes: dict[str, HybridIndex] = {}
+        self._vector_cache: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def _embeddings_id(self) -> str:
+        if self.embeddings is None:
+            return f"hashed-{_HASH_DIM}"
+        model = getattr(self.embeddings, "model", None) or getattr(self.embeddings, "model_name", None)
+        return f"{type(self.embeddings).__name__}:{model}"
+
+    def get_index(self, resources: list) -> HybridIndex:
+        """Return the index for a list of resources, building (and persisting) it if needed."""
+        texts = [_resource_text(r) for r in resources]
+        h = hashlib.sha256(f"{_INDEX_FORMAT}:{self._embeddings_id()}".encode())
+        for text in texts:
+            h.update(text.encode())
+            h.update(b"\0")
+        fingerprint = h.hexdigest()[:24]
+
+        with self._lock:
+            index = self._indexes.get(fingerprint)
+        if index is not None:
+            return index
+
+        path = os.path.join(self.index_dir, f"retrieval_index_{fingerprint}.pkl") if self.index_dir else None
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    index = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+                index = None
+            if index is not None and index.uses_embeddings:
+                self._vector_cache.update(zip(index.texts, index.vectors.tolist(), strict=True))
+        if index is None:
+            index = HybridIndex(texts, embeddings=self.embeddings, vector_cache=self._vector_cache)
+            if path:
+                try:
+                    os.makedirs(self.index_dir, exist_ok=True)
+                    fd, tmp_path = tempfile.mkstemp(dir=self.index_dir, suffix=".tmp")
+                    with os.fdopen(fd, "wb") as f:
+                        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    os.replace(tmp_path, path)
+                except OSError as e:
+                    print(f"Warning: Could not persist retrieval index: {e}")
+
+        with self._lock:
+            self._indexes[fingerprint] = index
+        return index
+
+    def embedding_based_retrieval(self, query: str, resources: dict, llm=None, rerank: bool = False) -> dict:
+        """Select the most relevant resources with a local hybrid BM25 + vector index.
+
+        No LLM call is made unless ``rerank`` is set, in which case the LLM only sees
+        a shortlist of candidates (twice ``top_k`` per category) instead of the full
+        catalog.
+
+        Args:
+            query: The user's query
+            resources: A dictionary with keys 'tools', 'data_lake', and 'libraries',
+                      each containing a list of available resources
+            llm: LLM used for reranking (if None and rerank is set, a default one is created)
+            rerank: Whether to let the LLM make the final selection among the top candidates
+
+        Returns:
+            A dictionary with the same keys, but containing only the most relevant resources
+        """
+        pool_factor = 2 if rerank else 1
+        selected = {}
+        for category in ("tools", "data_lake", "libraries"):
+            items = resources.get(category, [])
+            if not items:
+                selected[category] = []
+                continue
+            scores = self.get_index(items).search(query, embeddings=self.embeddings, alpha=self.alpha)
+            k = min(len(items), self.top_k.get(category, 10) * pool_factor)
+            # Stable sort keeps ties in catalog order so results are reproducible
+            order = np.argsort(-scores, kind="stable")[:k]
+            selected[category] = [items[i] for i in order if scores[i] > 0]
+
+        if rerank:
+            selected = self.prompt_based_retrieval(query, selected, llm=llm)
+        return selected
+
+    def retrieve(self, query: str, resources: dict, llm=None, mode: str = "prompt") -> dict:
+        """Select resources with the given strategy: "prompt", "embedding" or "embedding_rerank"."""
+        if mode == "prompt":
+            return self.prompt_based_retrieval(query, resources, llm=llm)
+        if mode in ("embedding", "embedding_rerank"):
+            return self.embedding_based_retrieval(query, resources, llm=llm, rerank=mode == "embedding_rerank")
+        raise ValueError(f"Unknown retrieval mode '{mode}'. Use 'prompt', 'embedding' or 'embedding_rerank'.")
 
     def prompt_based_retrieval(self, query: str, resources: dict, llm=None) -> dict:
         """Use a prompt-based approach to retrieve the most relevant resources for a query.
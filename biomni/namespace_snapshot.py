@@ -0,0 +1,256 @@
+"""
+Snapshots of the REPL namespace, restored lazily.
+
+The variables agent code builds up between ``<execute>`` steps (AnnData objects,
+DataFrames, fitted models) live in ``support_tools._persistent_namespace`` and used
+to be lost when the process or REPL worker went away. After every Python step A1
+(in process REPL mode, where the namespace belongs to one session) now writes the
+variables that changed to a snapshot directory of the run, and
+``A1.resume`` (or ``A1.restore_namespace`` when moving a session to another
+worker or node) makes them available again without recomputing them.
+
+Format: one file per value, named by the digest of its content, plus a
+``manifest.json`` mapping variable names to files. Values are pickled with
+protocol 5 and their buffers (numpy arrays, including the blocks of pandas frames
+and the matrices of AnnData objects) stored out-of-band, so writing does not copy
+them in memory and reading memory-maps them. An unchanged variable keeps its file
+and costs one digest per step. Modules are recorded by name and re-imported;
+values that cannot be pickled (functions defined in the REPL, open handles) are
+skipped.
+
+Restoring is lazy: the namespace is a ``LazyNamespace`` whose ``__missing__``
+loads a variable the first time code refers to it.
+"""
+
+import hashlib
+import importlib
+import json
+import mmap
+import os
+import pickle
+import shutil
+import struct
+import time
+import types
+
+MANIFEST = "manifest.json"
+_MAGIC = b"BNS1"
+_ALIGN = 64
+
+
+class SnapshotEntry:
+    """A variable stored in a snapshot directory, loaded on demand."""
+
+    def __init__(self, directory: str, name: str, info: dict):
+        self.directory = directory
+        self.name = name
+        self.info = info
+
+    @property
+    def path(self) -> str | None:
+        return os.path.join(self.directory, self.info["file"]) if self.info.get("file") else None
+
+    def load(self):
+        if self.info["kind"] == "module":
+            return importlib.import_module(self.info["module"])
+        return _read_value(self.path)
+
+
+class LazyNamespace(dict):
+    """REPL globals that load variables deferred from a snapshot on first access."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pending: dict[str, SnapshotEntry] = {}
+
+    def __missing__(self, name):
+        entry = self.pending.pop(name, None)
+        if entry is None:
+            raise KeyError(name)
+        value = self[name] = entry.load()
+        return value
+
+    def defer(self, name: str, entry: SnapshotEntry):
+        """Make ``name`` resolve to ``entry`` on first access, unless the namespace already defines it."""
+        if name not in self:
+            self.pending[name] = entry
+
+    def __setitem__(self, name, value):
+        self.pending.pop(name, None)
+        super().__setitem__(name, value)
+
+    def __delitem__(self, name):
+        if self.pending.pop(name, None) is not None and name not in self:
+            return
+        super().__delitem__(name)
+
+    def clear(self):
+        self.pending.clear()
+        super().clear()
+
+
+def _encode(value) -> tuple[bytes, list[memoryview]]:
+    buffers = []
+    header = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    return header, [b.raw() for b in buffers]
+
+
+def _write_value(path: str, header: bytes, buffers: list[memoryview]):
+    table_size = 16 + 16 * len(buffers)
+    offset = table_size + len(header)
+    offsets = []
+    for buf in buffers:
+        offset += -offset % _ALIGN
+        offsets.append(offset)
+        offset += buf.nbytes
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_MAGIC + struct.pack("<II", len(buffers), len(header)) + b"\0" * 4)
+        for buf, start in zip(buffers, offsets, strict=True):
+            f.write(struct.pack("<QQ", start, buf.nbytes))
+        f.write(header)
+        for buf, start in zip(buffers, offsets, strict=True):
+            f.write(b"\0" * (start - f.tell()))
+            f.write(buf)
+    os.replace(tmp, path)
+
+
+def _read_value(path: str):
+    with open(path, "rb") as f:
+        # Copy-on-write mapping: restored arrays are writable and share pages with the page cache
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    view = memoryview(mapped)
+    if bytes(view[:4]) != _MAGIC:
+        raise ValueError(f"Not a namespace snapshot file: {path}")
+    count, header_len = struct.unpack_from("<II", view, 4)
+    table = [struct.unpack_from("<QQ", view, 16 + 16 * i) for i in range(count)]
+    header_start = 16 + 16 * count
+    header = view[header_start : header_start + header_len]
+    return pickle.loads(header, buffers=[view[start : start + length] for start, length in table])
+
+
+def _digest(header: bytes, buffers: list[memoryview]) -> str:
+    h = hashlib.blake2b(header, digest_size=16)
+    for buf in buffers:
+        h.update(buf)
+    return h.hexdigest()
+
+
+def load_manifest(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def snapshot_namespace(namespace: dict, directory: str, exclude=(), max_var_mb: float | None = None) -> dict:
+    """Write the variables of ``namespace`` that changed since the last snapshot in ``directory``.
+
+    Args:
+        namespace: REPL globals (a ``LazyNamespace`` keeps its not-yet-loaded variables)
+        directory: Snapshot directory, created if needed
+        exclude: Names not to snapshot (e.g. injected tools, re-injected after a restore)
+        max_var_mb: Variables larger than this are skipped (None for no limit)
+
+    Returns:
+        Counts of saved, unchanged and removed variables, skipped names with the reason,
+        bytes written and seconds taken
+    """
+    started = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    previous = load_manifest(directory).get("variables", {})
+    exclude = set(exclude)
+    variables = {}
+    stats = {"saved": 0, "unchanged": 0, "removed": 0, "skipped": {}, "bytes_written": 0}
+
+    for name, value in list(namespace.items()):
+        if name.startswith("_") or name in exclude:
+            continue
+        if isinstance(value, types.ModuleType):
+            variables[name] = {"kind": "module", "module": value.__name__}
+            continue
+        try:
+            header, buffers = _encode(value)
+        except Exception as e:
+            stats["skipped"][name] = f"not picklable: {type(e).__name__}"
+            continue
+        size = len(header) + sum(b.nbytes for b in buffers)
+        if max_var_mb and size > max_var_mb * 1024 * 1024:
+            stats["skipped"][name] = f"larger than {max_var_mb} MB"
+            continue
+        digest = _digest(header, buffers)
+        filename = f"{digest}.snap"
+        if previous.get(name, {}).get("file") == filename and os.path.exists(os.path.join(directory, filename)):
+            stats["unchanged"] += 1
+        else:
+            if not os.path.exists(os.path.join(directory, filename)):
+                _write_value(os.path.join(directory, filename), header, buffers)
+                stats["bytes_written"] += size
+            stats["saved"] += 1
+        variables[name] = {"kind": "pickle", "file": filename, "size": size}
+
+    # Variables restored lazily and never accessed are unchanged; carry them over
+    for name, entry in getattr(namespace, "pending", {}).items():
+        if name in exclude or name in variables:
+            continue
+        info = dict(entry.info)
+        if entry.path is not None and os.path.dirname(os.path.abspath(entry.path)) != os.path.abspath(directory):
+            target = os.path.join(directory, info["file"])
+            if not os.path.exists(target):
+                try:
+                    os.link(entry.path, target)
+                except OSError:
+                    shutil.copyfile(entry.path, target)
+        variables[name] = info
+        stats["unchanged"] += 1
+
+    stats["removed"] = len(set(previous) - set(variables))
+    tmp = os.path.join(directory, f"{MANIFEST}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"updated": time.time(), "variables": variables}, f)
+    os.replace(tmp, os.path.join(directory, MANIFEST))
+
+    # Files of overwritten or deleted variables are no longer referenced
+    referenced = {info["file"] for info in variables.values() if info.get("file")}
+    for filename in os.listdir(directory):
+        if filename.endswith(".snap") and filename not in referenced:
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                pass
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def restore_namespace(namespace: dict, directory: str, lazy: bool = True) -> int:
+    """Make the variables of a snapshot available in ``namespace`` and return how many.
+
+    With ``lazy`` and a ``LazyNamespace``, values are read on first access; names the
+    namespace already defines are left alone.
+    """
+    variables = load_manifest(directory).get("variables", {})
+    for name, info in variables.items():
+        entry = SnapshotEntry(os.path.abspath(directory), name, info)
+        if lazy and isinstance(namespace, LazyNamespace):
+            namespace.defer(name, entry)
+        elif name not in namespace:
+            try:
+                namespace[name] = entry.load()
+            except Exception as e:
+                print(f"Warning: Could not restore variable '{name}': {e}")
+    return len(variables)
+
+
+def prune_snapshots(root: str, max_age_seconds: float | None):
+    """Delete snapshot directories under ``root`` not updated for ``max_age_seconds``."""
+    if not max_age_seconds or not os.path.isdir(root):
+        return
+    cutoff = time.time() - max_age_seconds
+    for name in os.listdir(root):
+        directory = os.path.join(root, name)
+        try:
+            if os.path.getmtime(os.path.join(directory, MANIFEST)) < cutoff:
+                shutil.rmtree(directory, ignore_errors=True)
+        except OSError:
+            continue
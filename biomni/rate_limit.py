@@ -0,0 +1,293 @@
+"""
+Shared rate limiting and adaptive concurrency for LLM calls.
+
+The agent loop, the resource retriever and the tool helpers that query an LLM
+(e.g. ``database._query_llm_for_api``) all call the same providers. Every client
+built by ``get_llm`` gets the ``RateLimiter`` of its (provider, model), so they
+share the provider's budget:
+
+- a request bucket (requests per minute) and a token bucket (tokens per minute,
+  charged with the tokens each call actually used);
+- a concurrency limit adjusted with AIMD: it grows by about one slot per
+  "window" of successful calls and halves when the provider answers 429 or
+  reports being overloaded. It also pauses admissions for the retry-after time
+  the provider asked for.
+
+Overload responses are seen on every HTTP attempt, including the SDK's own
+jittered retries, through a response hook on the shared HTTP client
+(``observe_http_response``), and on final errors through the limiter's callback
+handler.
+
+Usage:
+    from biomni.rate_limit import rate_limit_metrics
+
+    rate_limit_metrics()  # queueing and throttling statistics per provider/model
+"""
+
+import json
+import random
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+
+# HTTP statuses that mean "slow down": rate limited, overloaded (Anthropic), unavailable
+OVERLOAD_STATUSES = (429, 503, 529)
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Whether an exception raised by a provider SDK signals rate limiting or overload."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status in OVERLOAD_STATUSES:
+        return True
+    name = type(error).__name__
+    text = str(error).lower()
+    return name in ("RateLimitError", "OverloadedError") or "rate limit" in text or "overloaded" in text
+
+
+class _Bucket:
+    """Token bucket refilled continuously at ``per_minute / 60`` per second."""
+
+    def __init__(self, per_minute: float | None):
+        self.per_minute = per_minute
+        self.level = float(per_minute) if per_minute else 0.0
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        if self.per_minute:
+            self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` is available (0 if available now or unlimited)."""
+        if not self.per_minute or self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60 / self.per_minute
+
+
+class RateLimiter(BaseRateLimiter):
+    """Request/token buckets plus an AIMD concurrency limit for one provider and model."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        check_every: float = 0.05,
+    ):
+        """
+        Args:
+            name: Label used in metrics ("<provider>:<model>")
+            requests_per_minute: Request budget; None for unlimited
+            tokens_per_minute: Token budget (input + output); None for unlimited
+            max_concurrency: Upper bound of the adaptive concurrency limit
+            min_concurrency: Lower bound the limit never drops below
+            check_every: Interval at which waiting callers re-check for a free slot
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.check_every = check_every
+        self.concurrency_limit = float(max_concurrency)
+        self.in_flight = 0
+        self._requests = _Bucket(requests_per_minute)
+        self._tokens = _Bucket(tokens_per_minute)
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self.callback = _LimiterCallback(self)
+        self.stats = {
+            "requests": 0,
+            "queued": 0,
+            "queue_seconds_total": 0.0,
+            "queue_seconds_max": 0.0,
+            "throttled": 0,
+            "tokens": 0,
+        }
+
+    def _admission_delay(self, now: float) -> float | None:
+        """Seconds to wait before admitting a request, or None when it can be admitted now."""
+        self._requests.refill(now)
+        self._tokens.refill(now)
+        delays = [
+            self._paused_until - now,
+            self._requests.wait_time(1),
+            # Tokens are charged after the call, so the bucket may be negative; wait until it recovers
+            self._tokens.wait_time(0) if self._tokens.level < 0 else 0.0,
+        ]
+        if self.in_flight >= int(self.concurrency_limit):
+            # Released by a finishing call; re-check periodically in case a release is missed
+            delays.append(self.check_every if self.check_every > 0 else 0.05)
+        delay = max(delays)
+        return delay if delay > 0 else None
+
+    def _admit(self, waited: float | None):
+        if self._requests.per_minute:
+            self._requests.level -= 1
+        self.in_flight += 1
+        self.stats["requests"] += 1
+        if waited is not None:
+            self.stats["queued"] += 1
+            self.stats["queue_seconds_total"] += waited
+            self.stats["queue_seconds_max"] = max(self.stats["queue_seconds_max"], waited)
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        started = time.monotonic()
+        waited = None
+        with self._cond:
+            while True:
+                delay = self._admission_delay(time.monotonic())
+                if delay is None:
+                    self._admit(waited)
+                    return True
+                if not blocking:
+                    return False
+                self._cond.wait(timeout=delay)
+                waited = time.monotonic() - started
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        import asyncio
+
+        started = time.monotonic()
+        waited = None
+        while True:
+            with self._cond:
+                delay = self._admission_delay(time.monotonic())
+                if delay is None:
+                    self._admit(waited)
+                    return True
+            if not blocking:
+                return False
+            await asyncio.sleep(min(delay, max(self.check_every, 0.01)))
+            waited = time.monotonic() - started
+
+    def release(self, tokens: int = 0, success: bool = True):
+        """Free a concurrency slot and charge the tokens used by the finished call."""
+        with self._cond:
+            self.in_flight = max(self.in_flight - 1, 0)
+            if tokens:
+                self.stats["tokens"] += tokens
+                if self._tokens.per_minute:
+                    self._tokens.refill(time.monotonic())
+                    self._tokens.level -= tokens
+            if success and self.concurrency_limit < self.max_concurrency:
+                # Additive increase: about one slot per limit's worth of successful calls
+                self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+            self._cond.notify_all()
+
+    def on_overload(self, retry_after: float | None = None):
+        """Multiplicative decrease after a 429/overload response, and pause new admissions."""
+        now = time.monotonic()
+        with self._cond:
+            self.stats["throttled"] += 1
+            # A burst of rejections from one overload episode counts as a single decrease
+            if now - self._last_decrease > 1.0:
+                self.concurrency_limit = max(float(self.min_concurrency), self.concurrency_limit / 2)
+                self._last_decrease = now
+            # Respect the provider's retry-after, otherwise back off with jitter
+            pause = retry_after if retry_after is not None else random.uniform(0.5, 2.0)
+            self._paused_until = max(self._paused_until, now + pause)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            queued = self.stats["queued"]
+            return {
+                **self.stats,
+                "queue_seconds_total": round(self.stats["queue_seconds_total"], 3),
+                "queue_seconds_mean": round(self.stats["queue_seconds_total"] / queued, 3) if queued else 0.0,
+                "queue_seconds_max": round(self.stats["queue_seconds_max"], 3),
+                "in_flight": self.in_flight,
+                "concurrency_limit": round(self.concurrency_limit, 2),
+                "requests_per_minute": self._requests.per_minute,
+                "tokens_per_minute": self._tokens.per_minute,
+            }
+
+
+class _LimiterCallback(BaseCallbackHandler):
+    """Releases the limiter's slot when a call ends and reports failures caused by overload."""
+
+    run_inline = True
+
+    def __init__(self, limiter: RateLimiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response, **kwargs):
+        tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                tokens += usage.get("total_tokens", 0) or 0
+        if not tokens and response.llm_output:
+            usage = response.llm_output.get("token_usage") or response.llm_output.get("usage") or {}
+            tokens = usage.get("total_tokens", 0) or 0
+        self.limiter.release(tokens=tokens)
+
+    def on_llm_error(self, error, **kwargs):
+        overloaded = is_overload_error(error)
+        if overloaded:
+            self.limiter.on_overload()
+        self.limiter.release(success=not overloaded)
+
+
+_limiters: dict[tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _limits_for(source: str, model: str, config) -> dict:
+    limits = {
+        "requests_per_minute": config.llm_requests_per_minute,
+        "tokens_per_minute": config.llm_tokens_per_minute,
+        "max_concurrency": config.llm_max_concurrency,
+    }
+    # Overrides for the provider, then for the specific model
+    for key in (source, f"{source}:{model}"):
+        limits.update((config.llm_rate_limits or {}).get(key, {}))
+    return limits
+
+
+def get_rate_limiter(source: str, model: str, config=None) -> RateLimiter:
+    """Return the limiter shared by every client of ``source``/``model``."""
+    if config is None:
+        from biomni.config import default_config as config
+    key = (source, model)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(f"{source}:{model}", **_limits_for(source, model, config))
+            _limiters[key] = limiter
+        return limiter
+
+
+def observe_http_response(source: str, response):
+    """httpx response hook: feed 429/overload answers of ``source`` to the matching limiters."""
+    if response.status_code not in OVERLOAD_STATUSES:
+        return
+    retry_after = None
+    try:
+        retry_after = float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        pass
+    model = None
+    try:
+        model = json.loads(response.request.content or b"{}").get("model")
+    except Exception:
+        pass
+    with _limiters_lock:
+        targets = [lim for (src, mdl), lim in _limiters.items() if src == source and (model is None or mdl == model)]
+    for limiter in targets:
+        limiter.on_overload(retry_after)
+
+
+async def aobserve_http_response(source: str, response):
+    """Async httpx response hook, for the pools used by asynchronous calls."""
+    observe_http_response(source, response)
+
+
+def rate_limit_metrics() -> dict:
+    """Return queueing and throttling statistics of every limiter."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.metrics() for limiter in limiters}
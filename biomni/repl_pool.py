@@ -0,0 +1,523 @@
+"""
+Process-isolated Python execution workers for the A1 REPL.
+
+Each worker is a pre-forked child process with the heavy scientific stack already
+imported. A worker is bound to one session (one agent conversation) and owns that
+session's REPL namespace, so sessions never share variables and a runaway cell can
+be hard-killed without touching the parent process or other sessions.
+"""
+
+import contextlib
+import importlib
+import multiprocessing
+import os
+import pickle
+import resource
+import signal
+import threading
+import time
+import traceback
+import types
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+# Modules imported in every worker before it is handed out, so the first <execute>
+# block of a session does not pay their import cost.
+DEFAULT_PRELOAD_MODULES = ["numpy", "pandas", "scanpy", "matplotlib.pyplot"]
+
+
+@dataclass
+class ExecutionResult:
+    """Outcome of a single execution in a worker process."""
+
+    output: str
+    status: str = "ok"  # "ok", "error", "timeout" or "crashed"
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    max_rss_mb: float = 0.0
+    plots: list = field(default_factory=list)
+
+    def metrics(self) -> dict:
+        """Return the resource usage of this execution as a plain dictionary."""
+        return {
+            "status": self.status,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "max_rss_mb": round(self.max_rss_mb, 1),
+        }
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if os.uname().sysname == "Darwin":
+        return rss / (1024 * 1024)
+    return rss / 1024
+
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextlib.contextmanager
+def _soft_memory_limit(memory_limit_mb: int | None):
+    """Lower the soft address-space limit for the duration of one request."""
+    if not memory_limit_mb:
+        yield
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = int(memory_limit_mb) * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+def _worker_main(conn, preload_modules: list[str], memory_limit_mb: int | None):
+    """Entry point of a worker process: serve requests from the parent until shutdown."""
+    # The parent handles Ctrl-C; a worker is only ever stopped by the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if memory_limit_mb:
+        limit = int(memory_limit_mb) * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError) as e:
+            print(f"Warning: Could not set memory limit for REPL worker: {e}")
+
+    for module_name in preload_modules:
+        try:
+            importlib.import_module(module_name)
+        except Exception:
+            # Preloading is an optimization only; missing packages surface when user code imports them
+            pass
+
+    from biomni.tool import support_tools
+
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        kind, payload = message
+        if kind == "shutdown":
+            break
+
+        start_wall = time.perf_counter()
+        start_cpu = _cpu_seconds()
+        status = "ok"
+        plots = []
+
+        if kind == "exec":
+            support_tools.clear_captured_plots()
+            output = support_tools.run_python_repl(payload)
+            plots = support_tools.get_captured_plots()
+            if output.startswith("Error: "):
+                status = "error"
+        elif kind == "inject":
+            support_tools._persistent_namespace.update(payload)
+            output = f"Injected {len(payload)} function(s)"
+        elif kind == "call":
+            # An optional fifth element is a memory limit (MB) applying to this call only
+            module_name, func_name, args, kwargs, *limits = payload
+            try:
+                with _soft_memory_limit(limits[0] if limits else None):
+                    func = getattr(importlib.import_module(module_name), func_name)
+                    output = func(*args, **kwargs)
+            except Exception as e:
+                output = f"Error: {e}\n{traceback.format_exc()}"
+                status = "error"
+        elif kind in ("snapshot", "restore"):
+            from biomni import namespace_snapshot
+
+            try:
+                if kind == "snapshot":
+                    directory, exclude, max_var_mb = payload
+                    output = namespace_snapshot.snapshot_namespace(
+                        support_tools._persistent_namespace, directory, exclude=exclude, max_var_mb=max_var_mb
+                    )
+                else:
+                    output = namespace_snapshot.restore_namespace(support_tools._persistent_namespace, payload)
+            except Exception as e:
+                output = f"Error: {e}\n{traceback.format_exc()}"
+                status = "error"
+        else:
+            output = f"Error: Unknown request type '{kind}'"
+            status = "error"
+
+        result = ExecutionResult(
+            output=output,
+            status=status,
+            wall_seconds=time.perf_counter() - start_wall,
+            cpu_seconds=_cpu_seconds() - start_cpu,
+            max_rss_mb=_max_rss_mb(),
+            plots=plots,
+        )
+        try:
+            conn.send(result)
+        except Exception as e:
+            # The return value of a "call" request may not be picklable
+            conn.send(ExecutionResult(output=f"Error: Could not return result: {e}", status="error"))
+
+
+def _identity(obj) -> tuple:
+    """Identify an injected object; bound methods are created anew on every attribute access."""
+    if isinstance(obj, types.MethodType):
+        return (id(obj.__self__), id(obj.__func__))
+    return (id(obj),)
+
+
+class ReplWorker:
+    """Handle to one worker process."""
+
+    def __init__(self, context, preload_modules: list[str], memory_limit_mb: int | None):
+        self._parent_conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, preload_modules, memory_limit_mb),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.lock = threading.Lock()
+        self.ready = False
+        self.session_id: str | None = None
+        self.last_used = time.time()
+        # Results of requests given up on without killing the worker, still to be read and dropped
+        self._abandoned = 0
+        # Identity of the objects injected into this worker's namespace, with the object itself
+        # (so its id is not reused while recorded), by name
+        self.injected: dict[str, tuple] = {}
+
+    @property
+    def pid(self) -> int | None:
+        return self.process.pid
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Block until the worker has finished preloading modules."""
+        if self.ready:
+            return True
+        if self._parent_conn.poll(timeout):
+            try:
+                self._parent_conn.recv()
+                self.ready = True
+            except (EOFError, OSError):
+                return False
+        return self.ready
+
+    def request(self, kind: str, payload, timeout: float | None, kill_on_timeout: bool = True) -> ExecutionResult:
+        """Send a request and wait up to ``timeout`` seconds (None for no limit) for the result.
+
+        On timeout the worker is killed, unless ``kill_on_timeout`` is False: the request
+        then finishes in the background and its result is dropped by the next request.
+        """
+        self.last_used = time.time()
+        start = time.perf_counter()
+        if not self.wait_ready(timeout):
+            return ExecutionResult(output="Error: REPL worker failed to start", status="crashed")
+        try:
+            self._parent_conn.send((kind, payload))
+        except (BrokenPipeError, OSError, pickle.PicklingError) as e:
+            return ExecutionResult(output=f"Error: Could not send request to REPL worker: {e}", status="crashed")
+
+        try:
+            while True:
+                remaining = None if timeout is None else max(0.0, timeout - (time.perf_counter() - start))
+                if not self._parent_conn.poll(remaining):
+                    if not kill_on_timeout:
+                        self._abandoned += 1
+                        return ExecutionResult(
+                            output=f"Error: '{kind}' request did not finish within {timeout} seconds",
+                            status="timeout",
+                            wall_seconds=time.perf_counter() - start,
+                        )
+                    self.kill()
+                    return ExecutionResult(
+                        output=f"ERROR: Code execution timed out after {timeout} seconds. Please try with simpler inputs or break your task into smaller steps. "
+                        "The Python namespace of this session has been reset.",
+                        status="timeout",
+                        wall_seconds=time.perf_counter() - start,
+                    )
+                result = self._parent_conn.recv()
+                if not self._abandoned:
+                    return result
+                # The worker answers in order; this is the late result of an abandoned request
+                self._abandoned -= 1
+        except (EOFError, OSError):
+            self.process.join(timeout=1)
+            exitcode = self.process.exitcode
+            return ExecutionResult(
+                output=f"Error: REPL worker process died during execution (exit code {exitcode}). "
+                "The Python namespace of this session has been reset.",
+                status="crashed",
+                wall_seconds=time.perf_counter() - start,
+            )
+
+    def kill(self):
+        """Hard-kill the worker process."""
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self._parent_conn.close()
+
+    def shutdown(self):
+        """Ask the worker to exit, falling back to a hard kill."""
+        try:
+            self._parent_conn.send(("shutdown", None))
+            self.process.join(timeout=2)
+        except (BrokenPipeError, OSError):
+            pass
+        self.kill()
+
+
+class ReplWorkerPool:
+    """Pool of pre-forked REPL worker processes, one per active session.
+
+    Idle workers are spawned ahead of time so acquiring a worker for a new session
+    only costs a pipe handshake. When an execution times out the session's worker
+    is killed and a fresh one is assigned on the next request.
+
+    Usage:
+        pool = ReplWorkerPool(size=2)
+        result = pool.execute("x = 1\\nprint(x)", session_id="abc", timeout=60)
+        print(result.output, result.metrics())
+        pool.release("abc")
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        preload_modules: list[str] | None = None,
+        memory_limit_mb: int | None = None,
+        start_method: str | None = None,
+    ):
+        """
+        Args:
+            size: Number of idle, pre-warmed workers to keep ready
+            preload_modules: Modules imported in each worker before it is used
+            memory_limit_mb: Optional address-space limit applied to each worker
+            start_method: multiprocessing start method (defaults to "fork" where available)
+        """
+        if start_method is None:
+            start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        self._context = multiprocessing.get_context(start_method)
+        self.size = max(0, size)
+        self.preload_modules = DEFAULT_PRELOAD_MODULES if preload_modules is None else preload_modules
+        self.memory_limit_mb = memory_limit_mb
+
+        self._lock = threading.Lock()
+        self._idle: list[ReplWorker] = []
+        self._sessions: dict[str, ReplWorker] = {}
+        self._closed = False
+        self.stats = {"executions": 0, "timeouts": 0, "crashes": 0, "respawns": 0}
+
+        self._replenish()
+
+    def _spawn(self) -> ReplWorker:
+        return ReplWorker(self._context, self.preload_modules, self.memory_limit_mb)
+
+    def _replenish(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._idle = [w for w in self._idle if w.is_alive()]
+            while len(self._idle) < self.size:
+                self._idle.append(self._spawn())
+
+    def _acquire(self, session_id: str) -> ReplWorker:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ReplWorkerPool has been shut down")
+            worker = self._sessions.get(session_id)
+            if worker is not None and worker.is_alive():
+                return worker
+            if worker is not None:
+                self.stats["respawns"] += 1
+            while self._idle:
+                worker = self._idle.pop(0)
+                if worker.is_alive():
+                    break
+            else:
+                worker = self._spawn()
+            worker.session_id = session_id
+            self._sessions[session_id] = worker
+
+        # Top the idle pool back up without blocking the caller
+        threading.Thread(target=self._replenish, daemon=True).start()
+        return worker
+
+    def _run(
+        self, session_id: str, kind: str, payload, timeout: float | None, kill_on_timeout: bool = True
+    ) -> ExecutionResult:
+        worker = self._acquire(session_id)
+        with worker.lock:
+            result = worker.request(kind, payload, timeout, kill_on_timeout)
+        self._record(worker, result)
+        return result
+
+    def _record(self, worker: ReplWorker, result: ExecutionResult):
+        with self._lock:
+            self.stats["executions"] += 1
+            if result.status == "timeout":
+                self.stats["timeouts"] += 1
+            elif result.status == "crashed":
+                self.stats["crashes"] += 1
+        if result.status == "crashed":
+            worker.kill()
+
+    def execute(self, code: str, session_id: str = "default", timeout: float = 600) -> ExecutionResult:
+        """Execute Python code in the namespace owned by ``session_id``."""
+        return self._run(session_id, "exec", code, timeout)
+
+    def call(
+        self,
+        module_name: str,
+        func_name: str,
+        args: tuple = (),
+        kwargs: dict | None = None,
+        session_id: str = "default",
+        timeout: float | None = 600,
+        memory_limit_mb: int | None = None,
+    ) -> ExecutionResult:
+        """Call ``module_name.func_name`` in the session's worker; the module is imported there on first use.
+
+        ``memory_limit_mb`` caps the worker's address space during this call only. The
+        return value must be picklable and is returned in ``ExecutionResult.output``.
+        """
+        return self._run(session_id, "call", (module_name, func_name, args, kwargs or {}, memory_limit_mb), timeout)
+
+    def snapshot(
+        self, session_id: str, directory: str, exclude=(), max_var_mb: float | None = None, timeout: float = 600
+    ) -> ExecutionResult:
+        """Write the changed variables of a session's namespace to a snapshot directory.
+
+        See ``biomni.namespace_snapshot``; ``ExecutionResult.output`` holds the snapshot statistics.
+        A snapshot exceeding ``timeout`` does not kill the worker (and so keeps the namespace);
+        it finishes in the background before the session's next request runs.
+        """
+        return self._run(session_id, "snapshot", (directory, list(exclude), max_var_mb), timeout, kill_on_timeout=False)
+
+    def restore(self, session_id: str, directory: str, timeout: float = 60) -> ExecutionResult:
+        """Make the variables of a snapshot directory available (lazily) in a session's namespace."""
+        return self._run(session_id, "restore", directory, timeout)
+
+    def cancel(self, session_id: str) -> bool:
+        """Hard-kill the worker of a session to abort its running request.
+
+        The interrupted request returns with status "crashed" and the session gets a
+        fresh worker on its next request.
+        """
+        with self._lock:
+            worker = self._sessions.get(session_id)
+        if worker is None or not worker.is_alive():
+            return False
+        worker.process.kill()
+        return True
+
+    def warm(self, session_id: str, timeout: float = 60) -> bool:
+        """Bind a ready worker to ``session_id`` ahead of its first request."""
+        return self._acquire(session_id).wait_ready(timeout)
+
+    def inject(self, session_id: str, functions: dict, timeout: float = 60) -> ExecutionResult:
+        """Make callables available in a session's namespace.
+
+        Only objects the session's worker does not hold yet (new names, or names bound to
+        another object) are sent, so injecting the same set before every execution is cheap.
+        Functions that cannot be pickled (lambdas, closures) are skipped with a warning.
+        """
+        worker = self._acquire(session_id)
+        with worker.lock:
+            keys = {name: (_identity(func), func) for name, func in functions.items()}
+            picklable = {}
+            for name, func in functions.items():
+                if name in worker.injected and worker.injected[name][0] == keys[name][0]:
+                    continue
+                try:
+                    pickle.dumps(func)
+                    picklable[name] = func
+                except Exception:
+                    print(f"Warning: Custom function '{name}' cannot be sent to a REPL worker process and was skipped")
+                    # Warn once; the same object is not retried
+                    worker.injected[name] = keys[name]
+            if not picklable:
+                return ExecutionResult(output="Injected 0 function(s)")
+            result = worker.request("inject", picklable, timeout)
+            if result.status == "ok":
+                worker.injected.update({name: keys[name] for name in picklable})
+        self._record(worker, result)
+        return result
+
+    def release(self, session_id: str):
+        """Terminate the worker bound to a session, discarding its namespace."""
+        with self._lock:
+            worker = self._sessions.pop(session_id, None)
+        if worker is not None:
+            worker.shutdown()
+
+    def sessions(self) -> dict[str, int | None]:
+        """Return the mapping of active session ids to worker pids."""
+        with self._lock:
+            return {sid: w.pid for sid, w in self._sessions.items() if w.is_alive()}
+
+    def shutdown(self):
+        """Stop all workers."""
+        with self._lock:
+            self._closed = True
+            workers = self._idle + list(self._sessions.values())
+            self._idle = []
+            self._sessions = {}
+        for worker in workers:
+            worker.shutdown()
+
+
+_default_pool: ReplWorkerPool | None = None
+_default_pool_lock = threading.Lock()
+
+
+def get_repl_pool(config=None) -> ReplWorkerPool:
+    """Return the process-wide REPL worker pool, creating it on first use."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            if config is None:
+                from biomni.config import default_config as config
+            _default_pool = ReplWorkerPool(
+                size=config.repl_pool_size,
+                memory_limit_mb=config.repl_memory_limit_mb,
+            )
+        return _default_pool
+
+
+_execution_executor: ThreadPoolExecutor | None = None
+
+
+def get_execution_executor(config=None) -> ThreadPoolExecutor:
+    """Return the thread pool on which asynchronous agents run code blocks.
+
+    In process mode the threads only wait on worker processes; in thread mode they
+    run the code themselves. The pool size bounds how many code blocks run at once.
+    """
+    global _execution_executor
+    with _default_pool_lock:
+        if _execution_executor is None:
+            if config is None:
+                from biomni.config import default_config as config
+            _execution_executor = ThreadPoolExecutor(
+                max_workers=config.async_execution_workers, thread_name_prefix="biomni-exec"
+            )
+        return _execution_executor
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
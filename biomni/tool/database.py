@@ -1,6 +1,5 @@
 import json
 import os
-import pickle
 import time
 from typing import Any
 
@@ -9,7 +8,9 @@ from Bio.Blast import NCBIWWW, NCBIXML
 from Bio.Seq import Seq
 from langchain_core.messages import HumanMessage, SystemMessage
 
+from biomni.data_cache import cached_pickle, get_data_cache
 from biomni.llm import get_llm
+from biomni.llm_cache import get_llm_cache, llm_cache_key
 from biomni.utils import parse_hpo_obo
 
 
@@ -24,7 +25,7 @@ def get_hpo_names(hpo_terms: list[str], data_lake_path: str) -> list[str]:
         List[str]: A list of corresponding HPO term names.
 
     """
-    hp_dict = parse_hpo_obo(data_lake_path + "/hp.obo")
+    hp_dict = get_data_cache().get(data_lake_path + "/hp.obo", parse_hpo_obo)
 
     hpo_names = []
     for term in hpo_terms:
@@ -37,6 +38,8 @@ def _query_llm_for_api(prompt, schema, system_template):
     """Helper function to query LLMs for generating API calls based on natural language prompts.
 
     Supports multiple model providers including Claude, Gemini, GPT, and others via the unified get_llm interface.
+    Responses that parse are kept in the persistent LLM response cache (see ``biomni.llm_cache``),
+    so repeating a query does not cost another LLM call.
 
     Parameters
     ----------
@@ -81,9 +84,14 @@ def _query_llm_for_api(prompt, schema, system_template):
             HumanMessage(content=prompt),
         ]
 
-        # Query the LLM
-        response = llm.invoke(messages)
-        llm_text = response.content.strip()
+        # Query the LLM, unless the same request was answered before
+        cache = get_llm_cache()
+        cache_key = llm_cache_key(llm, messages) if cache is not None else None
+        llm_text = cache.get(cache_key) if cache is not None else None
+        from_cache = llm_text is not None
+        if not from_cache:
+            response = llm.invoke(messages)
+            llm_text = response.content.strip()
 
         # Find JSON boundaries (in case LLM adds explanations)
         json_start = llm_text.find("{")
@@ -96,6 +104,8 @@ def _query_llm_for_api(prompt, schema, system_template):
             # If no JSON found, try the whole response
             result = json.loads(llm_text)
 
+        if cache is not None and not from_cache:
+            cache.put(cache_key, llm_text)
         return {"success": True, "data": result, "raw_response": llm_text}
 
     except (json.JSONDecodeError, KeyError, IndexError) as e:
@@ -490,8 +500,7 @@ def query_uniprot(
     if prompt:
         # Load UniProt schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "uniprot.pkl")
-        with open(schema_path, "rb") as f:
-            uniprot_schema = pickle.load(f)
+        uniprot_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -738,8 +747,7 @@ def query_interpro(
     if prompt:
         # Load InterPro schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "interpro.pkl")
-        with open(schema_path, "rb") as f:
-            interpro_schema = pickle.load(f)
+        interpro_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -840,8 +848,7 @@ def query_pdb(
         # Load schema from pickle file
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "pdb.pkl")
 
-        with open(schema_path, "rb") as f:
-            schema = pickle.load(f)
+        schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -1059,8 +1066,7 @@ def query_kegg(prompt, endpoint=None, verbose=True):
     if prompt:
         # Load schema from pickle file
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "kegg.pkl")
-        with open(schema_path, "rb") as f:
-            kegg_schema = pickle.load(f)
+        kegg_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -1163,8 +1169,7 @@ def query_stringdb(
     if prompt:
         # Load STRING schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "stringdb.pkl")
-        with open(schema_path, "rb") as f:
-            stringdb_schema = pickle.load(f)
+        stringdb_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -1333,8 +1338,7 @@ def query_iucn(
     if prompt:
         # Load IUCN schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "iucn.pkl")
-        with open(schema_path, "rb") as f:
-            iucn_schema = pickle.load(f)
+        iucn_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -1434,8 +1438,7 @@ def query_paleobiology(
     if prompt:
         # Load PBDB schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "pbdb.pkl")
-        with open(schema_path, "rb") as f:
-            pbdb_schema = pickle.load(f)
+        pbdb_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -1562,8 +1565,7 @@ def query_jaspar(
     if prompt:
         # Load JASPAR schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "jaspar.pkl")
-        with open(schema_path, "rb") as f:
-            jaspar_schema = pickle.load(f)
+        jaspar_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -1666,8 +1668,7 @@ def query_worms(
     if prompt:
         # Load WoRMS schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "worms.pkl")
-        with open(schema_path, "rb") as f:
-            worms_schema = pickle.load(f)
+        worms_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -1763,8 +1764,7 @@ def query_cbioportal(
     if prompt:
         # Load cBioPortal schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "cbioportal.pkl")
-        with open(schema_path, "rb") as f:
-            cbioportal_schema = pickle.load(f)
+        cbioportal_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -1855,8 +1855,7 @@ def query_clinvar(
     if prompt:
         # Load ClinVar schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "clinvar.pkl")
-        with open(schema_path, "rb") as f:
-            clinvar_schema = pickle.load(f)
+        clinvar_schema = cached_pickle(schema_path)
 
         # ClinVar system prompt template
         system_prompt_template = """
@@ -1945,8 +1944,7 @@ def query_geo(
     if prompt:
         # Load GEO schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "geo.pkl")
-        with open(schema_path, "rb") as f:
-            geo_schema = pickle.load(f)
+        geo_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -2041,8 +2039,7 @@ def query_dbsnp(
     if prompt:
         # Load dbSNP schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "dbsnp.pkl")
-        with open(schema_path, "rb") as f:
-            dbsnp_schema = pickle.load(f)
+        dbsnp_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -2134,8 +2131,7 @@ def query_ucsc(
     if prompt:
         # Load UCSC schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "ucsc.pkl")
-        with open(schema_path, "rb") as f:
-            ucsc_schema = pickle.load(f)
+        ucsc_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -2236,8 +2232,7 @@ def query_ensembl(
     if prompt:
         # Load Ensembl schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "ensembl.pkl")
-        with open(schema_path, "rb") as f:
-            ensembl_schema = pickle.load(f)
+        ensembl_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -2359,8 +2354,7 @@ def query_opentarget(
     if prompt:
         # Load OpenTargets schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "opentarget.pkl")
-        with open(schema_path, "rb") as f:
-            opentarget_schema = pickle.load(f)
+        opentarget_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -2457,8 +2451,7 @@ def query_monarch(
     if prompt:
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "monarch.pkl")
         if os.path.exists(schema_path):
-            with open(schema_path, "rb") as f:
-                monarch_schema = pickle.load(f)
+            monarch_schema = cached_pickle(schema_path)
         else:
             monarch_schema = None
 
@@ -2569,8 +2562,7 @@ def query_openfda(
     if prompt:
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "openfda.pkl")
         if os.path.exists(schema_path):
-            with open(schema_path, "rb") as f:
-                openfda_schema = pickle.load(f)
+            openfda_schema = cached_pickle(schema_path)
         else:
             openfda_schema = None
 
@@ -2789,8 +2781,7 @@ def query_gwas_catalog(
     if prompt:
         # Load GWAS Catalog schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "gwas_catalog.pkl")
-        with open(schema_path, "rb") as f:
-            gwas_schema = pickle.load(f)
+        gwas_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -2890,8 +2881,7 @@ def query_gnomad(
     if prompt and not gene_symbol:
         # Load gnomAD schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "gnomad.pkl")
-        with open(schema_path, "rb") as f:
-            gnomad_schema = pickle.load(f)
+        gnomad_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -3100,8 +3090,7 @@ def query_reactome(
     if prompt:
         # Load Reactome schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "reactome.pkl")
-        with open(schema_path, "rb") as f:
-            reactome_schema = pickle.load(f)
+        reactome_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -3338,8 +3327,7 @@ def query_pride(
     if prompt:
         # Load PRIDE schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "pride.pkl")
-        with open(schema_path, "rb") as f:
-            pride_schema = pickle.load(f)
+        pride_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -3437,8 +3425,7 @@ def query_gtopdb(
     if prompt:
         # Load GtoPdb schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "gtopdb.pkl")
-        with open(schema_path, "rb") as f:
-            gtopdb_schema = pickle.load(f)
+        gtopdb_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = r"""
@@ -3705,8 +3692,7 @@ def query_remap(
     if prompt:
         # Load ReMap schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "remap.pkl")
-        with open(schema_path, "rb") as f:
-            remap_schema = pickle.load(f)
+        remap_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -3806,8 +3792,7 @@ def query_mpd(
     if prompt:
         # Load MPD schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "mpd.pkl")
-        with open(schema_path, "rb") as f:
-            mpd_schema = pickle.load(f)
+        mpd_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -3907,8 +3892,7 @@ def query_emdb(
     if prompt:
         # Load EMDB schema
         schema_path = os.path.join(os.path.dirname(__file__), "schema_db", "emdb.pkl")
-        with open(schema_path, "rb") as f:
-            emdb_schema = pickle.load(f)
+        emdb_schema = cached_pickle(schema_path)
 
         # Create system prompt template
         system_template = """
@@ -12,6 +12,7 @@ import torch
 from pybiomart import Dataset
 from tqdm import tqdm
 
+from biomni.data_cache import cached_read_parquet
 from biomni.llm import get_llm
 
 
@@ -522,9 +523,8 @@ def annotate_celltype_scRNA(
         gene_scores = scores.iloc[:, i].tolist()
         markers[i] = list(np.array(gene_names)[np.array(gene_scores) > 0])
 
-    # TODO: this can be optimized
     czi_celltype_path = data_lake_path + "/czi_census_datasets_v4.parquet"
-    df = pd.read_parquet(czi_celltype_path)
+    df = cached_read_parquet(czi_celltype_path, columns=["cell_type"])
     czi_celltype_set = {cell_type.strip() for cell_types in df["cell_type"] for cell_type in str(cell_types).split(";")}
     czi_celltype = ", ".join(sorted(czi_celltype_set))
 
@@ -11,6 +11,9 @@ from Bio.Seq import Seq
 from Bio.SeqUtils import MeltingTemp as mt
 from bs4 import BeautifulSoup
 
+from biomni.data_cache import cached_read_csv
+from biomni.data_sync import ensure_data_lake_file
+
 
 def annotate_open_reading_frames(sequence, min_length, search_reverse=False, filter_subsets=False):
     """Find all Open Reading Frames (ORFs) in a DNA sequence using Biopython.
@@ -903,13 +906,13 @@ def design_knockout_sgrna(
     # Use fixed library pathAdd commentMore actions
     library_path = DEFAULT_LIBRARIES[species.lower()]
 
-    # Check if library file exists
-    if not os.path.exists(library_path):
+    # Check if library file exists (downloading it first from a lazy data lake)
+    if not os.path.exists(ensure_data_lake_file(library_path)):
         raise FileNotFoundError(f"Library file for {species} not found at path: {library_path}")
 
     # Load sgRNA library from S3
     try:
-        df = pd.read_csv(library_path, delimiter="\t")
+        df = cached_read_csv(library_path, delimiter="\t")
     except Exception as e:
         raise RuntimeError(f"Failed to load sgRNA library: {str(e)}") from None
 
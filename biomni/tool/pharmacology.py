@@ -1,5 +1,4 @@
 import os
-import pickle
 import re
 import subprocess
 import sys
@@ -9,6 +8,9 @@ from difflib import get_close_matches
 import numpy as np
 import pandas as pd
 
+from biomni.data_cache import cached_pickle
+from biomni.data_sync import ensure_data_lake_file
+
 
 def run_diffdock_with_smiles(pdb_path, smiles_string, local_output_dir, gpu_device=0, use_gpu=True):
     try:
@@ -203,11 +205,8 @@ def retrieve_topk_repurposing_drugs_from_disease_txgnn(disease_name, data_lake_p
     name_mapping_path = data_lake_path + "/txgnn_name_mapping.pkl"
     result_path = data_lake_path + "/txgnn_prediction.pkl"
 
-    with open(name_mapping_path, "rb") as f:
-        mapping = pickle.load(f)
-
-    with open(result_path, "rb") as f:
-        result = pickle.load(f)
+    mapping = cached_pickle(name_mapping_path)
+    result = cached_pickle(result_path)
 
     # Step 2: Fuzzy match the disease name to find the closest match
     possible_diseases = result.keys()
@@ -1982,7 +1981,6 @@ def _load_ddinter_data(data_lake_path):
         (drug_info, interaction_matrix, name_mapping) dictionaries
     """
     import os
-    import pickle
 
     # Define schema directory (following established pattern)
     schema_dir = os.path.join(os.path.dirname(__file__), "schema_db")
@@ -1997,16 +1995,11 @@ def _load_ddinter_data(data_lake_path):
     if not all(os.path.exists(f) for f in pkl_files):
         _process_ddinter_data_inline(data_lake_path, schema_dir)
 
-    # Load data
+    # Load data (parsed once per process and shared; callers must not modify it)
     try:
-        with open(drug_info_path, "rb") as f:
-            drug_info = pickle.load(f)
-
-        with open(interaction_path, "rb") as f:
-            interaction_matrix = pickle.load(f)
-
-        with open(mapping_path, "rb") as f:
-            name_mapping = pickle.load(f)
+        drug_info = cached_pickle(drug_info_path)
+        interaction_matrix = cached_pickle(interaction_path)
+        name_mapping = cached_pickle(mapping_path)
 
         return drug_info, interaction_matrix, name_mapping
 
@@ -2052,7 +2045,7 @@ def _process_ddinter_data_inline(data_lake_path, output_dir):
     # Load and combine all CSV files
     dataframes = []
     for csv_file in csv_files:
-        file_path = os.path.join(data_lake_path, csv_file)
+        file_path = ensure_data_lake_file(os.path.join(data_lake_path, csv_file))
         if os.path.exists(file_path):
             df = pd.read_csv(file_path)
             # Add source category
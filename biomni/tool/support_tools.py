@@ -3,8 +3,11 @@ import io
 import sys
 from io import StringIO
 
-# Create a persistent namespace that will be shared across all executions
-_persistent_namespace = {}
+from biomni.namespace_snapshot import LazyNamespace
+
+# Create a persistent namespace that will be shared across all executions.
+# Variables restored from a snapshot are loaded when code first refers to them.
+_persistent_namespace = LazyNamespace()
 
 # Global list to store captured plots
 _captured_plots = []
@@ -1,84 +1,185 @@
+import json
 import pickle
 
 import pandas as pd
 
+# Keys holding runtime objects that cannot be written to a registry file
+_UNSERIALIZABLE_KEYS = ("fn",)
+
 
 class ToolRegistry:
+    """Registry of tool schemas with constant-time lookups by id, name and module.
+
+    Tools keep the id they were registered with; registering a tool whose name is
+    already known replaces the existing schema in place and keeps its id. The
+    retrieval document store (``document_df``) follows every change, and ``version``
+    increases with each change so derived indexes can tell when to refresh.
+    """
+
     def __init__(self, tools):
-        self.tools = []
         self.next_id = 0
+        self.version = 0
+        self._by_id: dict[int, dict] = {}
+        self._by_name: dict[str, dict] = {}
+        self._by_module: dict[str, dict[int, dict]] = {}
+        self._module_of: dict[int, str] = {}
+        self._document_df = None
 
-        for j in tools.values():
-            for tool in j:
-                self.register_tool(tool)
-
-        docs = []
-        for tool_id in range(len(self.tools)):
-            docs.append([int(tool_id), self.get_tool_by_id(int(tool_id))])
-        self.document_df = pd.DataFrame(docs, columns=["docid", "document_content"])
+        for module, api_list in tools.items():
+            self.register_tools(api_list, module=module)
 
         # self.langchain_tools = {}
         # for module, api_list in tools.items():
         #    self.langchain_tools.update({self.get_id_by_name(api['name']): api_schema_to_langchain_tool(api, mode = 'custom_tool', module_name = module) for api in api_list})
 
-    def register_tool(self, tool):
-        if self.validate_tool(tool):
+    def __setstate__(self, state):
+        if "_by_id" in state:
+            self.__dict__.update(state)
+            return
+        # Registries pickled by older versions only stored the tool list
+        self.__init__({})
+        for tool in state.get("tools", []):
+            self._index(tool)
+        self.next_id = max(state.get("next_id", 0), max(self._by_id, default=-1) + 1)
+        self._changed()
+
+    @property
+    def tools(self) -> list[dict]:
+        """Registered tool schemas in registration order."""
+        return list(self._by_id.values())
+
+    @property
+    def document_df(self) -> pd.DataFrame:
+        """Retrieval documents as a DataFrame with ``docid`` and ``document_content`` columns."""
+        if self._document_df is None:
+            self._document_df = pd.DataFrame(
+                [[tool_id, tool] for tool_id, tool in self._by_id.items()], columns=["docid", "document_content"]
+            )
+        return self._document_df
+
+    def _changed(self):
+        self.version += 1
+        self._document_df = None
+
+    def _index(self, tool, module=None):
+        module = tool.get("module", module)
+        self._by_id[tool["id"]] = tool
+        self._by_name[tool["name"]] = tool
+        if module is not None:
+            self._by_module.setdefault(module, {})[tool["id"]] = tool
+            self._module_of[tool["id"]] = module
+
+    def _unindex(self, tool, keep_position=False):
+        if not keep_position:
+            self._by_id.pop(tool["id"], None)
+        if self._by_name.get(tool["name"]) is tool:
+            del self._by_name[tool["name"]]
+        module = self._module_of.pop(tool["id"], None)
+        if module is not None:
+            module_tools = self._by_module[module]
+            module_tools.pop(tool["id"], None)
+            if not module_tools:
+                del self._by_module[module]
+
+    def _register(self, tool, module=None):
+        if not self.validate_tool(tool):
+            raise ValueError("Invalid tool format")
+        existing = self._by_name.get(tool["name"])
+        if existing is not None:
+            # Re-registering a name replaces the schema but keeps its id, position and, unless
+            # another one is given, its module
+            module = tool.get("module", module) or self._module_of.get(existing["id"])
+            self._unindex(existing, keep_position=True)
+            tool["id"] = existing["id"]
+        else:
             tool["id"] = self.next_id
-            self.tools.append(tool)
             self.next_id += 1
-        else:
-            raise ValueError("Invalid tool format")
+        self._index(tool, module)
+
+    def register_tool(self, tool, module=None):
+        self._register(tool, module)
+        self._changed()
+
+    def register_tools(self, tools, module=None):
+        """Register many tools at once, refreshing derived state a single time."""
+        for tool in tools:
+            self._register(tool, module)
+        self._changed()
 
     def validate_tool(self, tool):
         required_keys = ["name", "description", "required_parameters"]
         return all(key in tool for key in required_keys)
 
     def get_tool_by_name(self, name):
-        for tool in self.tools:
-            if tool["name"] == name:
-                return tool
-        return None
+        return self._by_name.get(name)
 
     def get_tool_by_id(self, tool_id):
-        for tool in self.tools:
-            if tool["id"] == tool_id:
-                return tool
-        return None
+        return self._by_id.get(tool_id)
 
     def get_id_by_name(self, name):
-        for tool in self.tools:
-            if tool["name"] == name:
-                return tool["id"]
-        return None
+        tool = self._by_name.get(name)
+        return tool["id"] if tool is not None else None
 
     def get_name_by_id(self, tool_id):
-        for tool in self.tools:
-            if tool["id"] == tool_id:
-                return tool["name"]
-        return None
+        tool = self._by_id.get(tool_id)
+        return tool["name"] if tool is not None else None
+
+    def get_module_by_name(self, name):
+        tool = self._by_name.get(name)
+        return self._module_of.get(tool["id"]) if tool is not None else None
+
+    def get_tools_by_module(self, module):
+        return list(self._by_module.get(module, {}).values())
+
+    def list_modules(self):
+        return list(self._by_module)
 
     def list_tools(self):
-        return [{"name": tool["name"], "id": tool["id"]} for tool in self.tools]
+        return [{"name": tool["name"], "id": tool["id"]} for tool in self._by_id.values()]
 
     def remove_tool_by_id(self, tool_id):
         # Remove the tool with the given id
-        tool = self.get_tool_by_id(tool_id)
+        tool = self._by_id.get(tool_id)
         if tool:
-            self.tools = [t for t in self.tools if t["id"] != tool_id]
+            self._unindex(tool)
+            self._changed()
             return True
         return False
 
     def remove_tool_by_name(self, name):
         # Remove the tool with the given name
-        tool = self.get_tool_by_name(name)
+        tool = self._by_name.get(name)
         if tool:
-            self.tools = [t for t in self.tools if t["name"] != name]
+            self._unindex(tool)
+            self._changed()
             return True
         return False
 
+    def to_dict(self):
+        """Return a JSON-serializable representation (callables attached to tools are dropped)."""
+        return {
+            "next_id": self.next_id,
+            "tools": [
+                {
+                    **{k: v for k, v in tool.items() if k not in _UNSERIALIZABLE_KEYS},
+                    "module": self._module_of.get(tool["id"]),
+                }
+                for tool in self._by_id.values()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        registry = cls({})
+        for tool in data["tools"]:
+            registry._index(tool)
+        registry.next_id = max(data.get("next_id", 0), max(registry._by_id, default=-1) + 1)
+        registry._changed()
+        return registry
+
     def save_registry(self, filename):
-        with open(filename, "wb") as file:
-            pickle.dump(self, file)
+        with open(filename, "w") as file:
+            json.dump(self.to_dict(), file, default=str)
 
     # def get_langchain_tool_by_id(self, id):
     #     return self.langchain_tools[id]
@@ -86,4 +187,8 @@ class ToolRegistry:
     @staticmethod
     def load_registry(filename):
         with open(filename, "rb") as file:
-            return pickle.load(file)
+            content = file.read()
+        if content[:1] == b"\x80":
+            # Registries saved by older versions were pickled
+            return pickle.loads(content)
+        return ToolRegistry.from_dict(json.loads(content))
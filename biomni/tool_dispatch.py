@@ -0,0 +1,222 @@
+"""
+Concurrent, isolated execution of Biomni tools for the MCP server.
+
+``A1.create_mcp_server(concurrent=True)`` registers every tool as an async MCP
+handler that hands the call to a ``ToolDispatcher`` instead of running it on the
+server's event loop, so one slow tool no longer blocks every other client. Tools
+are dispatched by class:
+
+- "io": API and literature tools that mostly wait on the network run on a bounded
+  thread pool. Their timeout is reported to the caller, but the thread finishes
+  the call in the background (a thread cannot be killed).
+- "cpu": analysis tools (BLAST, segmentation, docking, ...) run in ``ReplWorkerPool``
+  worker processes, one call per worker at a time. A call that exceeds its timeout
+  or is cancelled by the client has its worker killed, and a per-call memory limit
+  turns runaway allocations into a ``MemoryError`` instead of taking the server down.
+
+Tool modules are imported on the first call of one of their tools (in the server
+process for "io" tools, in each worker for "cpu" tools), so starting a server that
+exposes every module is fast.
+
+Usage:
+    dispatcher = ToolDispatcher(io_workers=32, cpu_workers=4, timeouts={"run_docking": 3600})
+    result = await dispatcher.acall("biomni.tool.database", "query_uniprot", {"prompt": "TP53"})
+    dispatcher.metrics()
+"""
+
+import asyncio
+import importlib
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from biomni.repl_pool import ReplWorkerPool
+
+# Modules whose tools wait on remote services rather than compute
+IO_BOUND_MODULES = ("biomni.tool.database", "biomni.tool.literature")
+
+
+class ToolTimeoutError(TimeoutError):
+    """Raised when a tool call exceeds its timeout."""
+
+
+class ToolDispatcher:
+    """Runs tool calls on a thread pool ("io") or in worker processes ("cpu")."""
+
+    def __init__(
+        self,
+        io_workers: int = 32,
+        cpu_workers: int = 4,
+        default_timeout: float | None = 600,
+        timeouts: dict[str, float] | None = None,
+        memory_limit_mb: int | None = None,
+        memory_limits: dict[str, int] | None = None,
+        tool_classes: dict[str, str] | None = None,
+        io_modules: tuple[str, ...] = IO_BOUND_MODULES,
+    ):
+        """
+        Args:
+            io_workers: Threads running "io" tools; further calls queue
+            cpu_workers: Worker processes running "cpu" tools; further calls queue
+            default_timeout: Seconds a call may run (None for no limit)
+            timeouts: Per-tool timeouts overriding ``default_timeout``
+            memory_limit_mb: Address-space limit of a "cpu" call (None for no limit)
+            memory_limits: Per-tool memory limits overriding ``memory_limit_mb``
+            tool_classes: "io" or "cpu" per tool name or module name, overriding the default
+            io_modules: Modules whose tools default to "io"; every other module defaults to "cpu"
+        """
+        self.default_timeout = default_timeout
+        self.timeouts = dict(timeouts or {})
+        self.memory_limit_mb = memory_limit_mb
+        self.memory_limits = dict(memory_limits or {})
+        self.tool_classes = dict(tool_classes or {})
+        self.io_modules = tuple(io_modules)
+
+        self._io_executor = ThreadPoolExecutor(max_workers=max(1, io_workers), thread_name_prefix="biomni-mcp-io")
+        self._cpu_workers = max(1, cpu_workers)
+        self._cpu_executor = ThreadPoolExecutor(max_workers=self._cpu_workers, thread_name_prefix="biomni-mcp-cpu")
+        # Created on the first "cpu" call; one spare worker is kept warm to replace killed ones
+        self._process_pool: ReplWorkerPool | None = None
+        self._slots: queue.Queue[str] = queue.Queue()
+        for i in range(self._cpu_workers):
+            self._slots.put(f"mcp-cpu-{i}")
+        self._running: dict[int, str] = {}
+        self._call_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._modules: dict[str, object] = {}
+        self.stats = {
+            name: {"calls": 0, "errors": 0, "timeouts": 0, "cancelled": 0, "in_flight": 0, "seconds_total": 0.0}
+            for name in ("io", "cpu")
+        }
+
+    def tool_class(self, module_name: str | None, tool_name: str) -> str:
+        """Return "io" or "cpu" for a tool; tools without an importable module always run on threads."""
+        if module_name is None:
+            return "io"
+        for key in (tool_name, module_name):
+            if key in self.tool_classes:
+                return self.tool_classes[key]
+        return "io" if module_name in self.io_modules else "cpu"
+
+    def _pool(self) -> ReplWorkerPool:
+        with self._lock:
+            if self._process_pool is None:
+                # Tool modules are imported by the "call" request itself, on first use
+                self._process_pool = ReplWorkerPool(size=1, preload_modules=[])
+            return self._process_pool
+
+    def _resolve(self, module_name: str, tool_name: str):
+        module = self._modules.get(module_name)
+        if module is None:
+            module = self._modules[module_name] = importlib.import_module(module_name)
+        return getattr(module, tool_name)
+
+    def _run_io(self, func, module_name, tool_name, kwargs):
+        if func is None:
+            func = self._resolve(module_name, tool_name)
+        return func(**kwargs)
+
+    def _run_cpu(self, call_id, module_name, tool_name, kwargs, timeout, memory_limit_mb):
+        pool = self._pool()
+        slot = self._slots.get()
+        with self._lock:
+            self._running[call_id] = slot
+        try:
+            # Starting a replacement worker does not count against the tool's timeout
+            pool.warm(slot)
+            result = pool.call(
+                module_name,
+                tool_name,
+                kwargs=kwargs,
+                session_id=slot,
+                timeout=timeout,
+                memory_limit_mb=memory_limit_mb,
+            )
+        finally:
+            with self._lock:
+                self._running.pop(call_id, None)
+            self._slots.put(slot)
+        if result.status == "timeout":
+            raise ToolTimeoutError(f"Tool '{tool_name}' timed out after {timeout} seconds")
+        if result.status != "ok":
+            # The first line holds the error message; exceptions without one (MemoryError) end the traceback
+            lines = str(result.output).strip().splitlines() or [""]
+            raise RuntimeError(lines[0].removeprefix("Error: ").strip() or lines[-1])
+        return result.output
+
+    def _cancel_cpu(self, call_id: int):
+        # Killing the worker makes the waiting thread return; the slot gets a fresh worker
+        with self._lock:
+            slot = self._running.get(call_id)
+            if slot is not None and self._process_pool is not None:
+                self._process_pool.cancel(slot)
+
+    async def acall(self, module_name: str | None, tool_name: str, kwargs: dict, func=None):
+        """Run a tool without blocking the event loop and return its result.
+
+        Raises ``ToolTimeoutError`` when the call exceeds its timeout, and the tool's own
+        error otherwise. Cancelling the awaiting task cancels a queued call and kills the
+        worker of a running "cpu" call.
+        """
+        kind = "io" if func is not None else self.tool_class(module_name, tool_name)
+        timeout = self.timeouts.get(tool_name, self.default_timeout)
+        stats = self.stats[kind]
+        stats["calls"] += 1
+        stats["in_flight"] += 1
+        started = time.perf_counter()
+        call_id = next(self._call_ids)
+        loop = asyncio.get_running_loop()
+        if kind == "io":
+            future = self._io_executor.submit(self._run_io, func, module_name, tool_name, kwargs)
+        else:
+            memory_limit = self.memory_limits.get(tool_name, self.memory_limit_mb)
+            future = self._cpu_executor.submit(
+                self._run_cpu, call_id, module_name, tool_name, kwargs, timeout, memory_limit
+            )
+        try:
+            if kind == "io":
+                try:
+                    return await asyncio.wait_for(asyncio.wrap_future(future, loop=loop), timeout)
+                except TimeoutError:
+                    future.cancel()
+                    raise ToolTimeoutError(f"Tool '{tool_name}' timed out after {timeout} seconds") from None
+            # "cpu" timeouts are enforced by the worker pool, which kills the worker
+            return await asyncio.wrap_future(future, loop=loop)
+        except asyncio.CancelledError:
+            stats["cancelled"] += 1
+            if not future.cancel() and kind == "cpu":
+                self._cancel_cpu(call_id)
+            raise
+        except ToolTimeoutError:
+            stats["timeouts"] += 1
+            raise
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            stats["in_flight"] -= 1
+            stats["seconds_total"] += time.perf_counter() - started
+
+    def metrics(self) -> dict:
+        """Return call counts, timeouts, cancellations and mean duration per tool class."""
+        metrics = {}
+        for kind, stats in self.stats.items():
+            calls = stats["calls"]
+            metrics[kind] = {
+                **stats,
+                "seconds_total": round(stats["seconds_total"], 3),
+                "seconds_mean": round(stats["seconds_total"] / calls, 3) if calls else 0.0,
+            }
+        metrics["cpu"]["workers"] = self._process_pool.sessions() if self._process_pool is not None else {}
+        return metrics
+
+    def shutdown(self):
+        """Stop the worker processes and threads; running "io" calls finish in the background."""
+        self._io_executor.shutdown(wait=False, cancel_futures=True)
+        self._cpu_executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            pool, self._process_pool = self._process_pool, None
+        if pool is not None:
+            pool.shutdown()
@@ -997,22 +997,11 @@ def check_and_download_s3_files(
 
         return download_results
 
-    # Handle data_lake folder (download individual files)
-    for filename in expected_files:
-        local_file_path = os.path.join(local_data_lake_path, filename)
+    # Handle data_lake folder (download individual files concurrently, with resume and verification)
+    from biomni.data_sync import DataLakeSynchronizer
 
-        if os.path.exists(local_file_path):
-            download_results[filename] = True
-            continue
-
-        s3_file_url = urljoin(s3_bucket_url + "/" + folder + "/", filename)
-        print(f"Downloading {filename} from {folder}...")
-
-        if download_with_progress(s3_file_url, local_file_path, filename):
-            print(f"✓ Successfully downloaded: {filename}")
-            download_results[filename] = True
-        else:
-            download_results[filename] = False
+    synchronizer = DataLakeSynchronizer(local_data_lake_path, s3_bucket_url=s3_bucket_url, folder=folder)
+    download_results.update(synchronizer.sync(expected_files))
 
     return download_results
 
@@ -0,0 +1,140 @@
+"""
+Concurrent-session benchmark for the A1 streaming paths.
+
+Runs N agent conversations at the same time on one event loop, the way the server
+handles N concurrent /agent/stream requests, and compares:
+
+- blocking: each request iterates the synchronous ``go_stream`` inside an async
+  generator (how the server used to work), so one run holds the event loop and
+  the others wait;
+- async: each request iterates ``astream``, with LLM calls awaited and code run
+  on the execution pool.
+
+The LLM is simulated with a fixed latency per call so the benchmark measures the
+agent's scheduling, not a provider. Every conversation makes ``--steps`` code
+executions, each sleeping ``--code-seconds``, then answers.
+
+Usage:
+    python server/benchmark.py --sessions 8 --llm-latency 0.5 --steps 2
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from biomni.agent.a1 import A1
+
+
+class SimulatedLLM(BaseChatModel):
+    """Chat model answering with scripted responses after a fixed latency."""
+
+    latency: float = 0.5
+    steps: int = 2
+    code_seconds: float = 0.2
+
+    @property
+    def _llm_type(self) -> str:
+        return "simulated"
+
+    def _response(self, messages) -> str:
+        executed = sum(1 for m in messages if "<observation>" in str(m.content))
+        if executed < self.steps:
+            code = f"import time\ntime.sleep({self.code_seconds})\nprint({executed})"
+            return f"<think>step {executed + 1}</think>\n<execute>\n{code}\n</execute>"
+        return "<solution>done</solution>"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._response(messages)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._response(messages)))])
+
+
+async def blocking_session(agent, query, thread_id, t0):
+    first_step = None
+    for i, _ in enumerate(agent.go_stream(query, thread_id=thread_id)):
+        # Step 0 echoes the query; step 1 is the first LLM response
+        if i == 1:
+            first_step = time.perf_counter() - t0
+        # The server yielded to the event loop between SSE messages
+        await asyncio.sleep(0)
+    return first_step, time.perf_counter() - t0
+
+
+async def async_session(agent, query, thread_id, t0):
+    first_step = None
+    i = 0
+    async for _ in agent.astream(query, thread_id=thread_id):
+        if i == 1:
+            first_step = time.perf_counter() - t0
+        i += 1
+    return first_step, time.perf_counter() - t0
+
+
+async def run(mode, agents, query):
+    session = blocking_session if mode == "blocking" else async_session
+    started = time.perf_counter()
+    # Agents print every step; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = await asyncio.gather(*[session(agent, query, i, started) for i, agent in enumerate(agents)])
+    wall = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "sessions": len(agents),
+        "wall_seconds": round(wall, 2),
+        "sessions_per_minute": round(60 * len(agents) / wall, 1),
+        # Measured from the moment all requests arrived
+        "mean_first_response_seconds": round(statistics.mean(r[0] for r in results), 2),
+        "mean_completion_seconds": round(statistics.mean(r[1] for r in results), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent conversations")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per simulated LLM call")
+    parser.add_argument("--steps", type=int, default=2, help="Code executions per conversation")
+    parser.add_argument("--code-seconds", type=float, default=0.2, help="Seconds each code block runs")
+    parser.add_argument("--repl-mode", default="process", choices=["thread", "process"])
+    parser.add_argument("--path", default="./data", help="Biomni data path")
+    args = parser.parse_args()
+
+    agents = []
+    for _ in range(args.sessions):
+        agent = A1(
+            path=args.path,
+            llm="gpt-4.1-mini",
+            use_tool_retriever=False,
+            expected_data_lake_files=[],
+            repl_mode=args.repl_mode,
+        )
+        agent.llm = SimulatedLLM(latency=args.llm_latency, steps=args.steps, code_seconds=args.code_seconds)
+        agents.append(agent)
+
+    rows = [asyncio.run(run(mode, agents, "benchmark query")) for mode in ("blocking", "async")]
+    for agent in agents:
+        agent.close()
+
+    print()
+    header = list(rows[0])
+    print(" | ".join(header))
+    for row in rows:
+        print(" | ".join(str(row[k]) for k in header))
+    print(f"speedup: {rows[0]['wall_seconds'] / rows[1]['wall_seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ This server provides a REST API to interact with the Biomni agent,
 allowing configuration of LLM parameters and streaming of agent execution steps.
 """
 
+import asyncio
 import os
 import re
 import json
@@ -18,8 +19,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-from biomni.agent import A1
+from biomni.agent.session_manager import A1SessionManager
 from biomni.config import BiomniConfig, default_config
+from biomni.data_cache import get_data_cache
+from biomni.llm import close_llm_clients, llm_client_metrics, prompt_cache_metrics
+from biomni.llm_cache import llm_cache_metrics
+from biomni.mcp_client import close_mcp_sessions, get_mcp_manager
+from biomni.model.retriever import retrieval_cache_metrics
+from biomni.rate_limit import rate_limit_metrics
 
 # --- ADDED THIS BLOCK to dynamically define data path ---
 # Get the absolute path to this file (main.py)
@@ -44,14 +51,14 @@ DATA_DIR = BASE_DIR / "data"
 if os.path.exists(".env"):
     load_dotenv(".env")
 
-# Global agent instance (initialized on startup)
-agent: Optional[A1] = None
+# Pool of warm agents shared by all requests (initialized on startup)
+session_manager: Optional[A1SessionManager] = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize the agent on startup."""
-    global agent
+    """Initialize the agent session pool on startup."""
+    global session_manager
     print("Initializing Biomni agent...")
 
     # --- MODIFIED THIS BLOCK to use dynamic path AND environment variable for LLM ---
@@ -65,13 +72,21 @@ async def lifespan(app: FastAPI):
     # Initialize with default config on startup
     default_config.path = data_path_str
     default_config.llm = default_llm  # <-- CHANGED to use variable
-    agent = A1(path=data_path_str)
     # --- END OF MODIFIED BLOCK ---
 
+    session_manager = A1SessionManager(
+        max_idle_per_key=int(os.environ.get("BIOMNI_MAX_IDLE_AGENTS", "4")),
+        idle_timeout=float(os.environ.get("BIOMNI_AGENT_IDLE_TIMEOUT", "900")),
+    )
+    # Build one agent for the default configuration so the first request starts warm
+    session_manager.prewarm(path=data_path_str)
+
     print("Biomni agent initialized successfully")
     yield
-    # Cleanup if needed
     print("Shutting down Biomni server...")
+    session_manager.shutdown()
+    close_llm_clients()
+    close_mcp_sessions()
 
 
 app = FastAPI(
@@ -103,6 +118,9 @@ class AgentRequest(BaseModel):
     use_tool_retriever: Optional[bool] = Field(None, description="Whether to use tool retriever")
     commercial_mode: Optional[bool] = Field(None, description="Whether to use commercial mode (licensed datasets only)")
     data_path: Optional[str] = Field(None, description="Path to data directory")
+    stream_tokens: bool = Field(
+        False, description="Also stream LLM tokens as they are generated (only used by /agent/stream)"
+    )
 
 
 class StepResponse(BaseModel):
@@ -178,7 +196,40 @@ async def health_check():
     }
 
 
-async def step_generator(query: str, config: dict):
+@app.get("/sessions")
+async def session_status():
+    """Report warm agent pool occupancy, cache hit rates and LLM token usage."""
+    return {
+        **session_manager.status(),
+        "data_cache": get_data_cache().metrics(),
+        "retrieval_cache": retrieval_cache_metrics(),
+        "token_usage": prompt_cache_metrics(),
+        "llm_clients": llm_client_metrics(),
+        "rate_limits": rate_limit_metrics(),
+        "llm_response_cache": llm_cache_metrics(),
+        "mcp_servers": get_mcp_manager().metrics(),
+    }
+
+
+def build_agent_config(request: AgentRequest) -> dict:
+    """Translate request fields into session manager settings."""
+    config = {}
+    if request.data_path:
+        config["path"] = request.data_path
+    if request.llm:
+        config["llm"] = request.llm
+    if request.timeout_seconds:
+        config["timeout_seconds"] = request.timeout_seconds
+    if request.use_tool_retriever is not None:
+        config["use_tool_retriever"] = request.use_tool_retriever
+    if request.commercial_mode is not None:
+        config["commercial_mode"] = request.commercial_mode
+    if request.temperature is not None:
+        config["temperature"] = request.temperature
+    return config
+
+
+async def step_generator(query: str, config: dict, stream_tokens: bool = False):
     """
     Generator function that yields parsed steps from the agent execution.
     It ignores human messages and structures AI messages into a JSON object.
@@ -186,35 +237,34 @@ async def step_generator(query: str, config: dict):
     Args:
         query: The biomedical query to process.
         config: Configuration dictionary for the agent.
+        stream_tokens: Whether to also send token deltas while the LLM is generating.
     """
     try:
-        # Create a new agent instance with the provided configuration
+        # Borrow a warm agent with its own conversation for the duration of the stream
         agent_config = {k: v for k, v in config.items() if v is not None}
-        custom_agent = A1(**agent_config)
-
-        # Define message headers to look for
-        human_header = "================================ Human Message ================================="
-        ai_header = "================================== Ai Message =================================="
-
-        # Stream the agent execution
-        for step in custom_agent.go_stream(query):
-            raw_output = step.get("output", "")
+        # Building a new agent is slow; do it off the event loop
+        custom_agent, thread_id = await asyncio.to_thread(session_manager.checkout, **agent_config)
+    except Exception as e:
+        error_msg = {"output": f"Error: {str(e)}", "status": "error"}
+        yield f"data: {json.dumps(error_msg)}\n\n"
+        return
 
-            # 1. Ignore Human Messages
-            if human_header in raw_output:
+    try:
+        # Stream the agent execution without blocking the event loop for other sessions
+        async for step in custom_agent.astream(query, thread_id=thread_id, stream_tokens=True):
+            # 1. Token deltas, tagged with the section they belong to (think/execute/solution/text)
+            if step["type"] == "token":
+                if stream_tokens:
+                    yield f"data: {json.dumps({'type': 'delta', **{k: v for k, v in step.items() if k != 'type'}})}\n\n"
                 continue
 
-            # 2. Parse AI Messages
-            elif ai_header in raw_output:
-                # Extract content after the header
-                content = raw_output.split(ai_header, 1)[1]
-                parsed_json = parse_ai_message(content)
-                
+            # 2. Ignore Human Messages and parse complete AI Messages
+            if step["role"] == "ai":
+                parsed_json = parse_ai_message(str(step["content"]))
+
                 # Only yield if there's content to send
                 if any(parsed_json.values()):
                     yield f"data: {json.dumps(parsed_json)}\n\n"
-            
-            # Note: Other message types or raw output without headers will be ignored.
 
         # Send a final message to indicate completion
         yield f"data: {json.dumps({'output': '[DONE]', 'status': 'completed'})}\n\n"
@@ -223,6 +273,8 @@ async def step_generator(query: str, config: dict):
         # Send error as the final message
         error_msg = {"output": f"Error: {str(e)}", "status": "error"}
         yield f"data: {json.dumps(error_msg)}\n\n"
+    finally:
+        await asyncio.to_thread(session_manager.checkin, custom_agent)
 
 
 @app.post("/agent/stream")
@@ -242,28 +294,10 @@ async def run_agent_stream(request: AgentRequest):
              -d '{"query": "Predict ADMET properties for CC(C)CC1=CC=C(C=C1)C(C)C(=O)O", "llm": "gpt-4.1-mini"}'
     """
     try:
-        # Build configuration dictionary from request
-        config = {}
-
-        if request.data_path:
-            config["path"] = request.data_path
-        if request.llm:
-            config["llm"] = request.llm
-        if request.timeout_seconds:
-            config["timeout_seconds"] = request.timeout_seconds
-        if request.use_tool_retriever is not None:
-            config["use_tool_retriever"] = request.use_tool_retriever
-        if request.commercial_mode is not None:
-            config["commercial_mode"] = request.commercial_mode
-
-        # Note: temperature is a default_config parameter, so we need to set it differently
-        if request.temperature is not None:
-            from biomni.config import default_config
-
-            default_config.temperature = request.temperature
+        config = build_agent_config(request)
 
         return StreamingResponse(
-            step_generator(request.query, config),
+            step_generator(request.query, config, stream_tokens=request.stream_tokens),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
@@ -289,36 +323,16 @@ async def run_agent(request: AgentRequest):
              -d '{"query": "Predict ADMET properties for CC(C)CC1=CC=C(C=C1)C(C)C(=O)O", "llm": "gpt-4.1-mini"}'
     """
     try:
-        # Build configuration dictionary from request
-        config = {}
-
-        if request.data_path:
-            config["path"] = request.data_path
-        if request.llm:
-            config["llm"] = request.llm
-        if request.timeout_seconds:
-            config["timeout_seconds"] = request.timeout_seconds
-        if request.use_tool_retriever is not None:
-            config["use_tool_retriever"] = request.use_tool_retriever
-        if request.commercial_mode is not None:
-            config["commercial_mode"] = request.commercial_mode
-
-        # Note: temperature is a default_config parameter
-        if request.temperature is not None:
-            from biomni.config import default_config
-
-            default_config.temperature = request.temperature
-
-        # Filter out None values from config
-        agent_config = {k: v for k, v in config.items() if v is not None}
-
-        # Create agent with custom configuration
-        custom_agent = A1(**agent_config)
+        agent_config = build_agent_config(request)
 
-        # Run the agent and collect all steps
+        # Run the agent on a warm pooled instance and collect all steps
         steps = []
-        for step in custom_agent.go_stream(request.query):
-            steps.append(step)
+        custom_agent, thread_id = await asyncio.to_thread(session_manager.checkout, **agent_config)
+        try:
+            async for step in custom_agent.astream(request.query, thread_id=thread_id):
+                steps.append(step)
+        finally:
+            await asyncio.to_thread(session_manager.checkin, custom_agent)
 
         return {
             "status": "completed",
@@ -3,8 +3,8 @@ from biomni.agent.a1 import A1
 # Create the agent
 agent = A1()
 
-# Create the MCP server
-mcp = agent.create_mcp_server(tool_modules=["biomni.tool.database"])
+# Create the MCP server; concurrent mode runs tool calls off the event loop so many clients can be served at once
+mcp = agent.create_mcp_server(tool_modules=["biomni.tool.database"], concurrent=True)
 
 if __name__ == "__main__":
     # Run the server